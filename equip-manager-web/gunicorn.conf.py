@@ -0,0 +1,55 @@
+"""Configuração do gunicorn (lida automaticamente ao rodar `gunicorn src.wsgi:app`
+a partir deste diretório). Todos os valores podem ser ajustados pelo ambiente.
+
+Workers gthread: as rotas passam boa parte do tempo no SQLite, então threads
+por processo atendem mais clientes que processos síncronos com a mesma
+memória. O canal de eventos (SSE) mantém uma conexão aberta por navegador e
+não passa pelos workers: o master sobe o servidor asyncio de
+src/servidor_eventos.py (porta EVENTOS_PORTA; EVENTOS_PROCESSO=0 desliga,
+para rodá-lo em outro lugar) e a rota /api/eventos/stream redireciona para ele.
+Com preload_app a aplicação é importada uma vez no master e compartilhada
+com os workers via fork (copy-on-write).
+"""
+import multiprocessing
+import os
+import subprocess
+import sys
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:' + os.environ.get('PORT', '5000'))
+workers = int(os.environ.get('WEB_CONCURRENCY', min(multiprocessing.cpu_count() + 1, 4)))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', '8'))
+preload_app = True
+
+# Importações síncronas de planilhas grandes podem levar mais que o padrão de 30 s
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '120'))
+graceful_timeout = 30
+keepalive = 5
+
+# Reciclar workers periodicamente (0 = desligado)
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', '0'))
+max_requests_jitter = max_requests // 10
+
+accesslog = os.environ.get('GUNICORN_ACCESSLOG', '-')
+
+_servidor_eventos = None
+
+def on_starting(server):
+    """Subir o servidor do canal de eventos junto com o master"""
+    global _servidor_eventos
+    if os.environ.get('EVENTOS_PROCESSO', '1').lower() in ('1', 'true'):
+        _servidor_eventos = subprocess.Popen([sys.executable, '-m', 'src.servidor_eventos'])
+
+def on_exit(server):
+    """Encerrar o servidor do canal de eventos com o master"""
+    if _servidor_eventos is not None:
+        _servidor_eventos.terminate()
+        _servidor_eventos.wait(timeout=graceful_timeout)
+
+def post_fork(server, worker):
+    """Descartar as conexões herdadas do master: cada worker abre as suas"""
+    from src.wsgi import app
+    from src.models.database import db
+    
+    with app.app_context():
+        db.engine.dispose(close=False)
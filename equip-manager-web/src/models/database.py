@@ -1,10 +1,63 @@
 from flask_sqlalchemy import SQLAlchemy
-from datetime import datetime
-from sqlalchemy import Column, Integer, String, Float, Text, Boolean, ForeignKey, DateTime, UniqueConstraint
+from datetime import datetime, date
+from sqlalchemy import (
+    Column, Integer, String, Float, Text, Boolean, ForeignKey, DateTime, Date,
+    UniqueConstraint, Index, event, exists, inspect, or_, select, text
+)
 from sqlalchemy.orm import relationship
+from sqlalchemy.schema import CreateColumn
+from sqlalchemy.types import TypeDecorator
 
 db = SQLAlchemy()
 
+# Formatos aceitos na entrada de datas (o primeiro é o canônico)
+FORMATOS_DATA = ('%Y-%m-%d', '%d/%m/%Y', '%Y/%m/%d', '%d-%m-%Y')
+
+def converter_data(valor):
+    """Converter date, datetime ou texto em date; texto vazio vira None.
+    
+    Levanta ValueError para textos que não estão em nenhum formato aceito.
+    """
+    if valor is None or (isinstance(valor, date) and not isinstance(valor, datetime)):
+        return valor
+    if isinstance(valor, datetime):
+        return valor.date()
+    
+    texto = str(valor).strip()
+    if not texto:
+        return None
+    
+    # Datas vindas do pandas/Excel podem trazer horário ('2024-01-15 00:00:00')
+    texto = texto.split(' ')[0].split('T')[0]
+    for formato in FORMATOS_DATA:
+        try:
+            return datetime.strptime(texto, formato).date()
+        except ValueError:
+            continue
+    
+    raise ValueError(f'Data inválida: {valor}')
+
+def normalizar_datas(dados, campos):
+    """Converter em date os campos de data presentes em dados (no próprio dicionário).
+    
+    Retorna a mensagem de erro do primeiro campo inválido, ou None.
+    """
+    for campo in campos:
+        if campo in dados:
+            try:
+                dados[campo] = converter_data(dados[campo])
+            except ValueError:
+                return f'Data inválida em {campo}: {dados[campo]}'
+    return None
+
+class Data(TypeDecorator):
+    """Coluna DATE que também aceita textos nos formatos de FORMATOS_DATA"""
+    impl = Date
+    cache_ok = True
+    
+    def process_bind_param(self, value, dialect):
+        return converter_data(value)
+
 # Tabelas de Configuração (Listas)
 class Fabricante(db.Model):
     __tablename__ = 'fabricantes'
@@ -20,7 +73,7 @@ class Modelo(db.Model):
     __tablename__ = 'modelos'
     id = Column(Integer, primary_key=True)
     nome = Column(String(255), unique=True, nullable=False)
-    fabricante_id = Column(Integer, ForeignKey('fabricantes.id'))
+    fabricante_id = Column(Integer, ForeignKey('fabricantes.id'), index=True)
     
     # Relacionamentos
     fabricante = relationship('Fabricante')
@@ -47,7 +100,7 @@ class Instalacao(db.Model):
     __tablename__ = 'instalacoes'
     id = Column(Integer, primary_key=True)
     nome = Column(String(255), unique=True, nullable=False)
-    polo_id = Column(Integer, ForeignKey('polos.id'))
+    polo_id = Column(Integer, ForeignKey('polos.id'), index=True)
     
     # Relacionamentos
     polo = relationship('Polo', back_populates='instalacoes')
@@ -113,11 +166,11 @@ class Equipamento(db.Model):
     __tablename__ = 'equipamentos'
     numero_serie = Column(String(255), primary_key=True)  # Chave primária unívoca
     tag_equipamento = Column(String(255), unique=True)  # Pode ser usado como identificador alternativo
-    fabricante_id = Column(Integer, ForeignKey('fabricantes.id'))
-    modelo_id = Column(Integer, ForeignKey('modelos.id'))
+    fabricante_id = Column(Integer, ForeignKey('fabricantes.id'), index=True)
+    modelo_id = Column(Integer, ForeignKey('modelos.id'), index=True)
     nome_equipamento = Column(String(255), nullable=False)
-    tipo_equipamento_id = Column(Integer, ForeignKey('tipos_equipamento.id'))
-    unidade_id = Column(Integer, ForeignKey('unidades.id'))
+    tipo_equipamento_id = Column(Integer, ForeignKey('tipos_equipamento.id'), index=True)
+    unidade_id = Column(Integer, ForeignKey('unidades.id'), index=True)
     resolucao = Column(Float)
     faixa_minima_equipamento = Column(Float)
     faixa_maxima_equipamento = Column(Float)
@@ -127,7 +180,7 @@ class Equipamento(db.Model):
     faixa_maxima_calibrada = Column(Float)
     condicoes_ambientais = Column(Text)
     erro_maximo_admissivel = Column(Float)
-    criterio_aceitacao_id = Column(Integer, ForeignKey('criterios_aceitacao.id'))
+    criterio_aceitacao_id = Column(Integer, ForeignKey('criterios_aceitacao.id'), index=True)
     software_versao = Column(String(255))
     
     # Relacionamentos
@@ -145,19 +198,20 @@ class Equipamento(db.Model):
 class PontoMedicao(db.Model):
     __tablename__ = 'pontos_medicao'
     id = Column(Integer, primary_key=True, autoincrement=True)
-    polo_id = Column(Integer, ForeignKey('polos.id'))
+    polo_id = Column(Integer, ForeignKey('polos.id'), index=True)
     nome_ponto_medicao = Column(String(255), nullable=False)
     tag_ponto_medicao = Column(String(255), unique=True, nullable=False)
-    classificacao_id = Column(Integer, ForeignKey('classificacoes_ponto_medicao.id'))
-    numero_serie_equipamento = Column(String(255), ForeignKey('equipamentos.numero_serie'))
+    classificacao_id = Column(Integer, ForeignKey('classificacoes_ponto_medicao.id'), index=True)
+    numero_serie_equipamento = Column(String(255), ForeignKey('equipamentos.numero_serie'), index=True)
     certificado_calibracao_vigente = Column(String(255))
-    data_ultima_calibracao = Column(String(10))  # Formato YYYY-MM-DD
-    data_proxima_calibracao = Column(String(10))  # Formato YYYY-MM-DD
+    data_ultima_calibracao = Column(Data)
+    data_proxima_calibracao = Column(Data, index=True)
     frequencia_calibracao_anp = Column(Integer)  # Em dias
-    data_retirada = Column(String(10))  # Formato YYYY-MM-DD
-    data_recebimento_uso = Column(String(10))  # Formato YYYY-MM-DD
+    data_retirada = Column(Data)
+    data_recebimento_uso = Column(Data)
     controle_vencimento = Column(Text)
     solicitacao_calibracao = Column(Text)
+    versao = Column(Integer, nullable=False, default=1, server_default='1')  # Incrementada a cada alteração
     
     # Relacionamentos
     polo = relationship('Polo', back_populates='pontos_medicao')
@@ -174,11 +228,15 @@ class Certificado(db.Model):
     numero_serie_equipamento = Column(String(255), ForeignKey('equipamentos.numero_serie'), nullable=False)
     numero_certificado = Column(String(255), nullable=False)
     revisao_certificado = Column(String(50))
-    data_certificado = Column(String(10), nullable=False)  # Formato YYYY-MM-DD
-    status_certificado_id = Column(Integer, ForeignKey('status_certificado_incerteza.id'))
+    data_certificado = Column(Data, nullable=False)
+    status_certificado_id = Column(Integer, ForeignKey('status_certificado_incerteza.id'), index=True)
     caminho_arquivo = Column(String(500))  # Caminho para o arquivo PDF/etc. anexado
     
-    __table_args__ = (UniqueConstraint('numero_serie_equipamento', 'numero_certificado', 'revisao_certificado'),)
+    __table_args__ = (
+        UniqueConstraint('numero_serie_equipamento', 'numero_certificado', 'revisao_certificado'),
+        Index('ix_certificados_equipamento_data', 'numero_serie_equipamento', 'data_certificado'),
+        Index('ix_certificados_data_id', 'data_certificado', 'id'),
+    )
     
     # Relacionamentos
     equipamento = relationship('Equipamento', back_populates='certificados')
@@ -190,7 +248,7 @@ class PlacaOrificio(db.Model):
     id = Column(Integer, primary_key=True, autoincrement=True)
     numero_serie_equipamento = Column(String(255), ForeignKey('equipamentos.numero_serie'), unique=True, nullable=False)
     numero_serie_standby = Column(String(255))
-    fabricante_id = Column(Integer, ForeignKey('fabricantes.id'))
+    fabricante_id = Column(Integer, ForeignKey('fabricantes.id'), index=True)
     material = Column(String(255))
     diametro_externo = Column(Float)
     diametro_orificio_20c = Column(Float)
@@ -200,11 +258,11 @@ class PlacaOrificio(db.Model):
     diametro_interno_medio_dm = Column(Float)
     diametro_interno_medio_20c_dr = Column(Float)
     norma = Column(String(255))
-    data_inspecao = Column(String(10))  # Formato YYYY-MM-DD
-    data_instalacao = Column(String(10))  # Formato YYYY-MM-DD
+    data_inspecao = Column(Data)
+    data_instalacao = Column(Data)
     carta_numero = Column(String(255))
-    data_maxima = Column(String(10))  # Formato YYYY-MM-DD
-    data_prevista_calibracao = Column(String(10))  # Formato YYYY-MM-DD
+    data_maxima = Column(Data)
+    data_prevista_calibracao = Column(Data)
     observacao = Column(Text)
     
     # Relacionamentos
@@ -216,7 +274,7 @@ class TrechoReto(db.Model):
     __tablename__ = 'trechos_retos'
     id = Column(Integer, primary_key=True, autoincrement=True)
     numero_serie_equipamento = Column(String(255), ForeignKey('equipamentos.numero_serie'), unique=True, nullable=False)
-    fabricante_id = Column(Integer, ForeignKey('fabricantes.id'))
+    fabricante_id = Column(Integer, ForeignKey('fabricantes.id'), index=True)
     material_confeccao = Column(String(255))
     diametro_nominal_dn = Column(String(255))
     classe_pressao = Column(String(255))
@@ -228,10 +286,10 @@ class TrechoReto(db.Model):
     envio_retificador_poco = Column(Boolean)
     envio_junta_anel = Column(Boolean)
     norma = Column(String(255))
-    data_instalacao = Column(String(10))  # Formato YYYY-MM-DD
+    data_instalacao = Column(Data)
     carta_numero = Column(String(255))
-    data_maxima = Column(String(10))  # Formato YYYY-MM-DD
-    data_prevista_calibracao = Column(String(10))  # Formato YYYY-MM-DD
+    data_maxima = Column(Data)
+    data_prevista_calibracao = Column(Data)
     observacao = Column(Text)
     
     # Relacionamentos
@@ -242,7 +300,7 @@ class TrechoReto(db.Model):
 class RequisitoMetrologico(db.Model):
     __tablename__ = 'requisitos_metrologicos'
     id = Column(Integer, primary_key=True, autoincrement=True)
-    natureza_id = Column(Integer, ForeignKey('naturezas_teste_analise.id'))
+    natureza_id = Column(Integer, ForeignKey('naturezas_teste_analise.id'), index=True)
     equipamento_medicao = Column(String(255))
     criterio = Column(Text, nullable=False)
     
@@ -253,20 +311,20 @@ class RequisitoMetrologico(db.Model):
 class TestePoco(db.Model):
     __tablename__ = 'testes_pocos'
     id = Column(Integer, primary_key=True, autoincrement=True)
-    instalacao_id = Column(Integer, ForeignKey('instalacoes.id'))
+    instalacao_id = Column(Integer, ForeignKey('instalacoes.id'), index=True)
     poco = Column(String(255), nullable=False)
-    natureza_id = Column(Integer, ForeignKey('naturezas_teste_analise.id'))
-    data_teste = Column(String(10), nullable=False)  # Formato YYYY-MM-DD
+    natureza_id = Column(Integer, ForeignKey('naturezas_teste_analise.id'), index=True)
+    data_teste = Column(Data, nullable=False)
     numero_btp = Column(String(255), unique=True)
     tag_medidor_oleo = Column(String(255))
     rt = Column(String(255))
-    data_rt = Column(String(10))  # Formato YYYY-MM-DD
-    data_desembarque = Column(String(10))  # Formato YYYY-MM-DD
-    data_recebimento_btp = Column(String(10))  # Formato YYYY-MM-DD
+    data_rt = Column(Data)
+    data_desembarque = Column(Data)
+    data_recebimento_btp = Column(Data)
     envio_resultado = Column(Boolean)
     bra = Column(String(255))
     validacao = Column(Boolean)
-    atualizacao_potencial = Column(String(10))  # Formato YYYY-MM-DD
+    atualizacao_potencial = Column(Data)
     observacao = Column(Text)
     
     # Relacionamentos
@@ -278,14 +336,14 @@ class TestePoco(db.Model):
 class EventoCronogramaTeste(db.Model):
     __tablename__ = 'eventos_cronograma_testes'
     id = Column(Integer, primary_key=True, autoincrement=True)
-    instalacao_id = Column(Integer, ForeignKey('instalacoes.id'), nullable=False)
-    tag_ponto_medicao = Column(String(255), ForeignKey('pontos_medicao.tag_ponto_medicao'), nullable=False)
+    instalacao_id = Column(Integer, ForeignKey('instalacoes.id'), nullable=False, index=True)
+    tag_ponto_medicao = Column(String(255), ForeignKey('pontos_medicao.tag_ponto_medicao'), nullable=False, index=True)
     poco = Column(String(255), nullable=False)
     ano = Column(Integer, nullable=False)
     mes = Column(Integer, nullable=False)  # 1 a 12
     status = Column(String(255))  # Ex: 'Planejado', 'Realizado', 'Atrasado'
-    data_realizacao = Column(String(10))  # Formato YYYY-MM-DD
-    teste_poco_id = Column(Integer, ForeignKey('testes_pocos.id'))
+    data_realizacao = Column(Data)
+    teste_poco_id = Column(Integer, ForeignKey('testes_pocos.id'), index=True)
     
     # Relacionamentos
     instalacao = relationship('Instalacao', back_populates='eventos_cronograma_testes')
@@ -296,21 +354,21 @@ class EventoCronogramaTeste(db.Model):
 class AnaliseQuimica(db.Model):
     __tablename__ = 'analises_quimicas'
     id = Column(Integer, primary_key=True, autoincrement=True)
-    instalacao_id = Column(Integer, ForeignKey('instalacoes.id'))
-    tag_ponto_medicao = Column(String(255), ForeignKey('pontos_medicao.tag_ponto_medicao'))
+    instalacao_id = Column(Integer, ForeignKey('instalacoes.id'), index=True)
+    tag_ponto_medicao = Column(String(255), ForeignKey('pontos_medicao.tag_ponto_medicao'), index=True)
     poco = Column(String(255), nullable=False)
-    natureza_id = Column(Integer, ForeignKey('naturezas_teste_analise.id'))
-    data_coleta = Column(String(10), nullable=False)  # Formato YYYY-MM-DD
+    natureza_id = Column(Integer, ForeignKey('naturezas_teste_analise.id'), index=True)
+    data_coleta = Column(Data, nullable=False)
     sot = Column(String(255))
     cilindro = Column(String(255))
     rt = Column(String(255))
-    data_rt = Column(String(10))  # Formato YYYY-MM-DD
-    data_desembarque = Column(String(10))  # Formato YYYY-MM-DD
-    data_recebimento_lab = Column(String(10))  # Formato YYYY-MM-DD
+    data_rt = Column(Data)
+    data_desembarque = Column(Data)
+    data_recebimento_lab = Column(Data)
     resultado = Column(Text)
     bra = Column(String(255))
     validacao = Column(Boolean)
-    data_atualizacao_cv = Column(String(10))  # Formato YYYY-MM-DD
+    data_atualizacao_cv = Column(Data)
     observacao = Column(Text)
     
     # Relacionamentos
@@ -323,14 +381,14 @@ class AnaliseQuimica(db.Model):
 class EventoCronogramaAnalise(db.Model):
     __tablename__ = 'eventos_cronograma_analises'
     id = Column(Integer, primary_key=True, autoincrement=True)
-    instalacao_id = Column(Integer, ForeignKey('instalacoes.id'), nullable=False)
-    tag_ponto_medicao = Column(String(255), ForeignKey('pontos_medicao.tag_ponto_medicao'), nullable=False)
+    instalacao_id = Column(Integer, ForeignKey('instalacoes.id'), nullable=False, index=True)
+    tag_ponto_medicao = Column(String(255), ForeignKey('pontos_medicao.tag_ponto_medicao'), nullable=False, index=True)
     poco = Column(String(255), nullable=False)
     ano = Column(Integer, nullable=False)
     mes = Column(Integer, nullable=False)  # 1 a 12
     status = Column(String(255))  # Ex: 'Planejado', 'Realizado', 'Atrasado'
-    data_realizacao = Column(String(10))  # Formato YYYY-MM-DD
-    analise_quimica_id = Column(Integer, ForeignKey('analises_quimicas.id'))
+    data_realizacao = Column(Data)
+    analise_quimica_id = Column(Integer, ForeignKey('analises_quimicas.id'), index=True)
     
     # Relacionamentos
     instalacao = relationship('Instalacao', back_populates='eventos_cronograma_analises')
@@ -343,12 +401,12 @@ class Incerteza(db.Model):
     id = Column(Integer, primary_key=True, autoincrement=True)
     sistema_medicao = Column(String(255), nullable=False)
     numero_relatorio = Column(String(255), unique=True, nullable=False)
-    data_relatorio = Column(String(10), nullable=False)  # Formato YYYY-MM-DD
+    data_relatorio = Column(Data, nullable=False)
     incerteza_expandida = Column(Float)
-    status_limite_id = Column(Integer, ForeignKey('status_certificado_incerteza.id'))
-    status_emissao_id = Column(Integer, ForeignKey('status_certificado_incerteza.id'))
+    status_limite_id = Column(Integer, ForeignKey('status_certificado_incerteza.id'), index=True)
+    status_emissao_id = Column(Integer, ForeignKey('status_certificado_incerteza.id'), index=True)
     estacao = Column(String(255))
-    servico_id = Column(Integer, ForeignKey('servicos_incerteza.id'))
+    servico_id = Column(Integer, ForeignKey('servicos_incerteza.id'), index=True)
     motivo = Column(Text)
     limite_inferior = Column(Float)
     limite_superior = Column(Float)
@@ -358,3 +416,284 @@ class Incerteza(db.Model):
     status_emissao = relationship('StatusCertificadoIncerteza', foreign_keys=[status_emissao_id], back_populates='incertezas_emissao')
     servico = relationship('ServicoIncerteza', back_populates='incertezas')
 
+# Tabela: Contadores agregados (mantidos por gatilhos do banco)
+class Contador(db.Model):
+    __tablename__ = 'contadores'
+    chave = Column(String(100), primary_key=True)  # Ex: 'equipamentos', 'pontos_medicao', 'certificados'
+    valor = Column(Integer, nullable=False, default=0)
+
+# Tabela: Eventos de alteração (outbox preenchida por gatilhos, lida pelo canal SSE)
+class Evento(db.Model):
+    __tablename__ = 'eventos'
+    id = Column(Integer, primary_key=True)
+    entidade = Column(String(50), nullable=False)  # Tabela alterada
+    chave = Column(String(255))  # Chave do registro (numero_serie ou id)
+    operacao = Column(String(10), nullable=False)  # insert, update, delete
+    criado_em = Column(DateTime, server_default=text('CURRENT_TIMESTAMP'))
+
+# Tabela: Jobs de importação executados em segundo plano
+class JobImportacao(db.Model):
+    __tablename__ = 'jobs_importacao'
+    id = Column(String(32), primary_key=True)  # uuid4 em hexadecimal
+    tipo = Column(String(50), nullable=False)  # 'equipamentos' ou 'pontos_medicao'
+    modo = Column(String(10), nullable=False, default='insert', server_default='insert')  # insert, skip, upsert
+    arquivo = Column(String(255))
+    status = Column(String(20), nullable=False, default='pendente')  # pendente, processando, concluido, erro
+    total_linhas = Column(Integer)
+    linhas_processadas = Column(Integer, nullable=False, default=0)
+    linhas_confirmadas = Column(Integer, nullable=False, default=0, server_default='0')  # Checkpoint: linhas já gravadas com commit
+    linhas_no_inicio = Column(Integer, nullable=False, default=0, server_default='0')  # Checkpoint quando a execução atual começou
+    caminho = Column(String(500))  # Arquivo salvo, mantido até o job concluir (para retomar após erro)
+    hash = Column(String(64))  # SHA-256 do arquivo enviado, para guardar o resultado (ver arquivos_importados)
+    importados = Column(Integer, nullable=False, default=0)  # Inseridos + atualizados
+    atualizados = Column(Integer, nullable=False, default=0, server_default='0')
+    inalterados = Column(Integer, nullable=False, default=0, server_default='0')
+    total_erros = Column(Integer, nullable=False, default=0)
+    erros = Column(Text)  # Lista JSON com as mensagens por linha
+    mensagem = Column(Text)  # Erro que interrompeu o job
+    criado_em = Column(DateTime, nullable=False, default=datetime.now)
+    iniciado_em = Column(DateTime)
+    concluido_em = Column(DateTime)
+    atualizado_em = Column(DateTime, default=datetime.now, onupdate=datetime.now)  # Sinal de vida: gravações e renovação periódica
+    executor = Column(String(100))  # host:pid do processo que executa o job
+
+class ArquivoImportado(db.Model):
+    __tablename__ = 'arquivos_importados'
+    hash = Column(String(64), primary_key=True)  # SHA-256 do conteúdo do arquivo
+    tipo = Column(String(50), primary_key=True)  # 'equipamentos' ou 'pontos_medicao'
+    modo = Column(String(10), primary_key=True)  # insert, skip, upsert
+    arquivo = Column(String(255))  # Nome do arquivo no último processamento
+    resultado = Column(Text, nullable=False)  # Relatório JSON da importação
+    importado_em = Column(DateTime, nullable=False, default=datetime.now)
+
+# Tabelas cujo total de registros é mantido em 'contadores'
+TABELAS_CONTADAS = ('equipamentos', 'pontos_medicao', 'certificados')
+
+def existem_dependentes(*condicoes):
+    """Se alguma das condições tem registro (um único SELECT com EXISTS por condição, sem carregar relacionamentos)"""
+    return db.session.execute(select(or_(*[exists().where(condicao) for condicao in condicoes]))).scalar()
+
+def postgresql():
+    """Se o banco da aplicação é PostgreSQL (gatilhos em PL/pgSQL)"""
+    return db.engine.dialect.name == 'postgresql'
+
+def criar_gatilho_postgresql(nome, tabela, definicao):
+    """Recriar um gatilho do PostgreSQL (sem CREATE TRIGGER IF NOT EXISTS)"""
+    db.session.execute(text(f'DROP TRIGGER IF EXISTS {nome} ON {tabela}'))
+    db.session.execute(text(f'CREATE TRIGGER {nome} {definicao}'))
+
+def instalar_gatilhos_contadores():
+    """Criar os gatilhos que mantêm os totais de 'contadores' em inserções e exclusões"""
+    if postgresql():
+        return instalar_gatilhos_contadores_postgresql()
+    
+    for tabela in TABELAS_CONTADAS:
+        db.session.execute(text(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{tabela}_contador_insert
+            AFTER INSERT ON {tabela}
+            BEGIN
+                UPDATE contadores SET valor = valor + 1 WHERE chave = '{tabela}';
+            END
+        """))
+        db.session.execute(text(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{tabela}_contador_delete
+            AFTER DELETE ON {tabela}
+            BEGIN
+                UPDATE contadores SET valor = valor - 1 WHERE chave = '{tabela}';
+            END
+        """))
+    db.session.commit()
+
+def instalar_gatilhos_contadores_postgresql():
+    """Gatilhos por comando com tabelas de transição: um UPDATE por INSERT/COPY, não por linha"""
+    for operacao, transicao, linhas, sinal in (('insert', 'NEW', 'novas', '+'), ('delete', 'OLD', 'antigas', '-')):
+        db.session.execute(text(f"""
+            CREATE OR REPLACE FUNCTION contador_{operacao}() RETURNS trigger AS $$
+            BEGIN
+                UPDATE contadores SET valor = valor {sinal} (SELECT count(*) FROM {linhas})
+                WHERE chave = TG_TABLE_NAME;
+                RETURN NULL;
+            END
+            $$ LANGUAGE plpgsql
+        """))
+        for tabela in TABELAS_CONTADAS:
+            criar_gatilho_postgresql(
+                f'trg_{tabela}_contador_{operacao}', tabela,
+                f'AFTER {operacao.upper()} ON {tabela} REFERENCING {transicao} TABLE AS {linhas} '
+                f'FOR EACH STATEMENT EXECUTE FUNCTION contador_{operacao}()'
+            )
+    db.session.commit()
+
+def recalcular_contadores():
+    """Recalcular os totais a partir das tabelas (instalação inicial ou correção)"""
+    for tabela in TABELAS_CONTADAS:
+        total = db.session.execute(text(f'SELECT COUNT(*) FROM {tabela}')).scalar()
+        db.session.merge(Contador(chave=tabela, valor=total))
+    db.session.commit()
+
+def definicao_coluna(coluna):
+    """Definição da coluna para ALTER TABLE ADD COLUMN, com o server_default compilado pelo dialeto
+    (texto entre aspas, expressões como text('0') ou CURRENT_TIMESTAMP sem aspas)"""
+    return str(CreateColumn(coluna).compile(dialect=db.engine.dialect))
+
+def adicionar_colunas_ausentes():
+    """Acrescentar às tabelas já existentes as colunas novas dos modelos (o create_all só cria tabelas).
+    
+    As colunas novas precisam ser anuláveis ou ter server_default.
+    """
+    inspetor = inspect(db.engine)
+    adicionadas = []
+    for tabela in db.metadata.sorted_tables:
+        if not inspetor.has_table(tabela.name):
+            continue
+        existentes = {coluna['name'] for coluna in inspetor.get_columns(tabela.name)}
+        for coluna in tabela.columns:
+            if coluna.name in existentes:
+                continue
+            db.session.execute(text(f'ALTER TABLE {tabela.name} ADD COLUMN {definicao_coluna(coluna)}'))
+            adicionadas.append(f'{tabela.name}.{coluna.name}')
+    db.session.commit()
+    return adicionadas
+
+# Versão dos dados das tabelas contadas (incrementada a cada alteração)
+CHAVE_VERSAO_DADOS = 'versao_dados'
+
+def instalar_gatilhos_versao_dados():
+    """Criar os gatilhos que incrementam 'versao_dados' em inserções, alterações e exclusões"""
+    if db.session.get(Contador, CHAVE_VERSAO_DADOS) is None:
+        db.session.add(Contador(chave=CHAVE_VERSAO_DADOS, valor=0))
+    
+    if postgresql():
+        # Um incremento por comando basta: a versão só precisa mudar a cada alteração
+        db.session.execute(text(f"""
+            CREATE OR REPLACE FUNCTION incrementar_versao_dados() RETURNS trigger AS $$
+            BEGIN
+                UPDATE contadores SET valor = valor + 1 WHERE chave = '{CHAVE_VERSAO_DADOS}';
+                RETURN NULL;
+            END
+            $$ LANGUAGE plpgsql
+        """))
+        for tabela in TABELAS_CONTADAS:
+            for evento in ('INSERT', 'UPDATE', 'DELETE'):
+                criar_gatilho_postgresql(
+                    f'trg_{tabela}_versao_{evento.lower()}', tabela,
+                    f'AFTER {evento} ON {tabela} FOR EACH STATEMENT EXECUTE FUNCTION incrementar_versao_dados()'
+                )
+        db.session.commit()
+        return
+    
+    for tabela in TABELAS_CONTADAS:
+        for evento in ('INSERT', 'UPDATE', 'DELETE'):
+            db.session.execute(text(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_{tabela}_versao_{evento.lower()}
+                AFTER {evento} ON {tabela}
+                BEGIN
+                    UPDATE contadores SET valor = valor + 1 WHERE chave = '{CHAVE_VERSAO_DADOS}';
+                END
+            """))
+    db.session.commit()
+
+# Tabela -> coluna usada como chave nos eventos de alteração
+CHAVES_EVENTOS = {
+    'equipamentos': 'numero_serie',
+    'pontos_medicao': 'id',
+    'certificados': 'id'
+}
+
+def instalar_gatilhos_eventos():
+    """Criar os gatilhos que registram cada alteração das tabelas contadas em 'eventos'"""
+    if postgresql():
+        # A coluna da chave vem como argumento do gatilho (TG_ARGV[0])
+        db.session.execute(text("""
+            CREATE OR REPLACE FUNCTION registrar_evento() RETURNS trigger AS $$
+            DECLARE
+                registro jsonb;
+            BEGIN
+                IF TG_OP = 'DELETE' THEN
+                    registro := to_jsonb(OLD);
+                ELSE
+                    registro := to_jsonb(NEW);
+                END IF;
+                INSERT INTO eventos (entidade, chave, operacao)
+                VALUES (TG_TABLE_NAME, registro ->> TG_ARGV[0], lower(TG_OP));
+                RETURN NULL;
+            END
+            $$ LANGUAGE plpgsql
+        """))
+        for tabela, chave in CHAVES_EVENTOS.items():
+            for evento in ('INSERT', 'UPDATE', 'DELETE'):
+                criar_gatilho_postgresql(
+                    f'trg_{tabela}_evento_{evento.lower()}', tabela,
+                    f"AFTER {evento} ON {tabela} FOR EACH ROW EXECUTE FUNCTION registrar_evento('{chave}')"
+                )
+        db.session.commit()
+        return
+    
+    for tabela, chave in CHAVES_EVENTOS.items():
+        for evento, registro in (('INSERT', 'NEW'), ('UPDATE', 'NEW'), ('DELETE', 'OLD')):
+            db.session.execute(text(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_{tabela}_evento_{evento.lower()}
+                AFTER {evento} ON {tabela}
+                BEGIN
+                    INSERT INTO eventos (entidade, chave, operacao)
+                    VALUES ('{tabela}', {registro}.{chave}, '{evento.lower()}');
+                END
+            """))
+    db.session.commit()
+
+# Perfil do SQLite aplicado a cada nova conexão (valores sobrescritos por
+# app.config['SQLITE_PRAGMAS']; None desliga o PRAGMA)
+PRAGMAS_SQLITE = {
+    'journal_mode': 'WAL',       # leitores não esperam o escritor (nem o contrário)
+    'synchronous': 'NORMAL',     # seguro com WAL: fsync só nos checkpoints
+    'cache_size': -65536,        # 64 MB de cache de páginas por conexão
+    'mmap_size': 268435456,      # leituras de até 256 MB do arquivo via mmap
+    'temp_store': 'MEMORY',      # ordenações e índices temporários em memória
+    'foreign_keys': 'ON',
+    'busy_timeout': 5000         # ms aguardando o lock de escrita antes de "database is locked"
+}
+
+# Conexões mantidas por processo (uma por thread do worker, mais folga)
+TAMANHO_POOL_PADRAO = 10
+
+def normalizar_uri_banco(uri):
+    """URI do SQLAlchemy a partir da DATABASE_URL ('postgres://' de provedores vira 'postgresql://')"""
+    if uri.startswith('postgres://'):
+        return 'postgresql://' + uri[len('postgres://'):]
+    return uri
+
+def banco_em_memoria(uri):
+    """Se a URI aponta para um SQLite em memória (uma conexão só, sem pool)"""
+    return uri.startswith('sqlite') and (uri in ('sqlite://', 'sqlite:///') or ':memory:' in uri)
+
+def opcoes_engine(uri, tamanho_pool=TAMANHO_POOL_PADRAO, espera_pool=30):
+    """Opções do create_engine: pool dimensionado para workers com várias threads"""
+    if banco_em_memoria(uri):
+        return {}
+    opcoes = {
+        'pool_size': tamanho_pool,
+        'max_overflow': tamanho_pool,
+        'pool_timeout': espera_pool
+    }
+    if not uri.startswith('sqlite'):
+        # Conexões de servidor podem cair (reinício, timeout de ociosidade)
+        opcoes['pool_pre_ping'] = True
+    return opcoes
+
+def instalar_perfil_sqlite(app):
+    """Aplicar os PRAGMAs do perfil em cada conexão nova do engine (só SQLite)"""
+    pragmas = {**PRAGMAS_SQLITE, **app.config.get('SQLITE_PRAGMAS', {})}
+    pragmas = {nome: valor for nome, valor in pragmas.items() if valor is not None}
+    
+    with app.app_context():
+        engine = db.engine
+    if engine.dialect.name != 'sqlite':
+        return
+    
+    def aplicar_pragmas(conexao, registro):
+        cursor = conexao.cursor()
+        for nome, valor in pragmas.items():
+            cursor.execute(f'PRAGMA {nome}={valor}')
+        cursor.close()
+    
+    event.listen(engine, 'connect', aplicar_pragmas)
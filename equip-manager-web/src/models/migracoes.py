@@ -0,0 +1,126 @@
+"""Migração das colunas de data para o tipo Data e criação dos índices.
+
+No SQLite o tipo DATE continua armazenado como texto 'YYYY-MM-DD', então
+a migração não recria tabelas: normaliza os valores legados (formatos
+alternativos, horário junto da data, textos vazios), anula os valores
+inválidos em colunas opcionais e rejeita a migração se houver valores
+inválidos em colunas obrigatórias. Em seguida cria os índices declarados
+nos modelos que ainda não existem no banco.
+"""
+from datetime import date, timedelta
+from sqlalchemy import text
+from src.models.database import db, Data, converter_data, PontoMedicao, Certificado
+
+def colunas_data():
+    """Listar (tabela, coluna) de todas as colunas do tipo Data"""
+    return [
+        (tabela, coluna)
+        for tabela in db.metadata.sorted_tables
+        for coluna in tabela.columns
+        if isinstance(coluna.type, Data)
+    ]
+
+def migrar_datas():
+    """Normalizar valores de data legados e criar índices ausentes.
+    
+    Retorna um relatório com os valores normalizados, anulados e rejeitados;
+    se houver rejeitados, nenhuma alteração é gravada.
+    """
+    relatorio = {'normalizados': 0, 'anulados': [], 'rejeitados': [], 'indices_criados': []}
+    
+    for tabela, coluna in colunas_data():
+        # Ler o texto bruto: valores inválidos não passariam pelo tipo Data
+        linhas = db.session.execute(text(
+            f'SELECT rowid, {coluna.name} FROM {tabela.name} WHERE {coluna.name} IS NOT NULL'
+        )).all()
+        
+        for rowid, valor in linhas:
+            try:
+                convertido = converter_data(valor)
+            except ValueError:
+                convertido = None
+            
+            normalizado = convertido.isoformat() if convertido else None
+            if normalizado == valor:
+                continue
+            
+            descricao = f'{tabela.name}.{coluna.name} (rowid {rowid}): {valor!r}'
+            if normalizado is None:
+                if not coluna.nullable:
+                    relatorio['rejeitados'].append(descricao)
+                    continue
+                relatorio['anulados'].append(descricao)
+            else:
+                relatorio['normalizados'] += 1
+            
+            db.session.execute(
+                text(f'UPDATE {tabela.name} SET {coluna.name} = :valor WHERE rowid = :rowid'),
+                {'valor': normalizado, 'rowid': rowid}
+            )
+    
+    if relatorio['rejeitados']:
+        db.session.rollback()
+        return relatorio
+    
+    db.session.commit()
+    
+    # create_all não cria índices novos em tabelas já existentes
+    for tabela in db.metadata.sorted_tables:
+        for indice in tabela.indexes:
+            existente = db.session.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = :nome"),
+                {'nome': indice.name}
+            ).first()
+            if not existente:
+                indice.create(bind=db.engine)
+                relatorio['indices_criados'].append(indice.name)
+    
+    db.session.execute(text('ANALYZE'))
+    db.session.commit()
+    
+    return relatorio
+
+def consultas_criticas():
+    """Consultas quentes (filtros de alertas, dashboard e histórico) e o índice esperado"""
+    hoje = date.today()
+    limite = hoje + timedelta(days=30)
+    
+    return [
+        ('pontos vencidos', db.session.query(PontoMedicao.id).filter(
+            PontoMedicao.data_proxima_calibracao.isnot(None),
+            PontoMedicao.data_proxima_calibracao < hoje
+        ), 'ix_pontos_medicao_data_proxima_calibracao'),
+        ('pontos próximos do vencimento', db.session.query(PontoMedicao.id).filter(
+            PontoMedicao.data_proxima_calibracao.isnot(None),
+            PontoMedicao.data_proxima_calibracao >= hoje,
+            PontoMedicao.data_proxima_calibracao <= limite
+        ), 'ix_pontos_medicao_data_proxima_calibracao'),
+        ('pontos por polo', db.session.query(PontoMedicao.id).filter(
+            PontoMedicao.polo_id == 1
+        ), 'ix_pontos_medicao_polo_id'),
+        ('certificados do equipamento', db.session.query(Certificado.id).filter(
+            Certificado.numero_serie_equipamento == 'X'
+        ).order_by(Certificado.data_certificado.desc()), 'ix_certificados_equipamento_data'),
+        ('certificados mais recentes', db.session.query(Certificado.id).order_by(
+            Certificado.data_certificado.desc(), Certificado.id.desc()
+        ).limit(20), 'ix_certificados_data_id')
+    ]
+
+def verificar_planos_consulta():
+    """Executar EXPLAIN QUERY PLAN nas consultas críticas.
+    
+    Retorna lista de (nome, índice esperado, plano, usa_indice).
+    """
+    # EXPLAIN não confere a versão do esquema: o cache de comandos do sqlite3 nas
+    # conexões do pool devolveria planos anteriores aos índices criados ou removidos
+    db.session.remove()
+    db.engine.dispose()
+    
+    resultados = []
+    for nome, query, indice in consultas_criticas():
+        sql = str(query.statement.compile(db.engine, compile_kwargs={'literal_binds': True}))
+        plano = ' | '.join(
+            linha[-1] for linha in db.session.execute(text(f'EXPLAIN QUERY PLAN {sql}')).all()
+        )
+        resultados.append((nome, indice, plano, indice in plano))
+    return resultados
@@ -1,30 +1,43 @@
 from flask import Blueprint, request, jsonify
-from src.models.database import db, Certificado, Equipamento, StatusCertificadoIncerteza
-from sqlalchemy import or_
+from src.models.database import db, Certificado, Equipamento, StatusCertificadoIncerteza, normalizar_datas
+from src.services.serializadores import consulta_certificados, para_dict, para_dicts
+from src.services.paginacao import paginar, CursorInvalido
+from src.services.busca import filtrar_busca
+from src.services.consultas import orcamento_consultas
+from src.services.escritas import executar_escrita, inserir, alterar, remover, EscritaNaoConcluida
 from datetime import datetime
 
 certificados_bp = Blueprint('certificados', __name__)
 
+# Chave estável de ordenação para paginação por cursor
+CHAVES_CURSOR = [
+    ('data_certificado', Certificado.data_certificado, True),
+    ('id', Certificado.id, True)
+]
+
+# Campos alteráveis pelo PUT (o equipamento não muda)
+CAMPOS_EDITAVEIS = (
+    'numero_certificado', 'revisao_certificado', 'data_certificado', 'status_certificado_id',
+    'caminho_arquivo'
+)
+
 @certificados_bp.route('/', methods=['GET'])
+@orcamento_consultas(3)
 def listar_certificados():
     """Listar todos os certificados com filtros opcionais"""
     try:
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 20, type=int)
         search = request.args.get('search', '')
         numero_serie = request.args.get('numero_serie', '')
         status_id = request.args.get('status_id', type=int)
         
-        query = Certificado.query
+        query = consulta_certificados()
         
         # Aplicar filtros
         if search:
-            query = query.filter(
-                or_(
-                    Certificado.numero_certificado.contains(search),
-                    Certificado.numero_serie_equipamento.contains(search)
-                )
-            )
+            query = filtrar_busca(query, 'certificados', search, [
+                Certificado.numero_certificado,
+                Certificado.numero_serie_equipamento
+            ])
         
         if numero_serie:
             query = query.filter(Certificado.numero_serie_equipamento == numero_serie)
@@ -35,42 +48,28 @@ def listar_certificados():
         # Ordenar por data mais recente
         query = query.order_by(Certificado.data_certificado.desc())
         
-        # Paginação
-        certificados_paginados = query.paginate(
-            page=page, per_page=per_page, error_out=False
-        )
-        
-        certificados = []
-        for cert in certificados_paginados.items:
-            certificado_data = {
-                'id': cert.id,
-                'numero_serie_equipamento': cert.numero_serie_equipamento,
-                'equipamento_nome': cert.equipamento.nome_equipamento if cert.equipamento else None,
-                'numero_certificado': cert.numero_certificado,
-                'revisao_certificado': cert.revisao_certificado,
-                'data_certificado': cert.data_certificado,
-                'status_certificado': cert.status_certificado.nome if cert.status_certificado else None,
-                'caminho_arquivo': cert.caminho_arquivo
-            }
-            certificados.append(certificado_data)
+        # Paginação (offset ou cursor)
+        pagina = paginar(query, CHAVES_CURSOR, 'certificados')
+        certificados = para_dicts(pagina.pop('itens'))
         
-        return jsonify({
-            'certificados': certificados,
-            'total': certificados_paginados.total,
-            'pages': certificados_paginados.pages,
-            'current_page': page,
-            'per_page': per_page
-        })
+        return jsonify({'certificados': certificados, **pagina})
     
+    except CursorInvalido as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @certificados_bp.route('/', methods=['POST'])
+@orcamento_consultas(5)
 def criar_certificado():
     """Criar um novo certificado"""
     try:
         data = request.get_json()
         
+        erro_data = normalizar_datas(data, ('data_certificado',))
+        if erro_data:
+            return jsonify({'error': erro_data}), 400
+        
         # Verificar se já existe certificado com mesmo número, série e revisão
         certificado_existente = Certificado.query.filter_by(
             numero_serie_equipamento=data['numero_serie_equipamento'],
@@ -81,7 +80,11 @@ def criar_certificado():
         if certificado_existente:
             return jsonify({'error': 'Certificado já existe para este equipamento'}), 400
         
-        certificado = Certificado(
+        # Verificar se o equipamento existe (chave estrangeira)
+        if db.session.get(Equipamento, data['numero_serie_equipamento']) is None:
+            return jsonify({'error': 'Equipamento não encontrado'}), 400
+        
+        campos = dict(
             numero_serie_equipamento=data['numero_serie_equipamento'],
             numero_certificado=data['numero_certificado'],
             revisao_certificado=data.get('revisao_certificado'),
@@ -90,32 +93,29 @@ def criar_certificado():
             caminho_arquivo=data.get('caminho_arquivo')
         )
         
-        db.session.add(certificado)
-        db.session.commit()
+        certificado_id = executar_escrita(inserir, Certificado, campos)
         
-        return jsonify({'message': 'Certificado criado com sucesso', 'id': certificado.id}), 201
+        return jsonify({'message': 'Certificado criado com sucesso', 'id': certificado_id}), 201
     
+    except EscritaNaoConcluida as e:
+        return jsonify({'error': str(e), 'status': e.status}), 503
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 @certificados_bp.route('/<int:certificado_id>', methods=['GET'])
+@orcamento_consultas(2)
 def obter_certificado(certificado_id):
     """Obter um certificado específico"""
     try:
-        certificado = Certificado.query.get_or_404(certificado_id)
+        certificado = consulta_certificados(detalhe=True).filter(
+            Certificado.id == certificado_id
+        ).first()
+        
+        if certificado is None:
+            return jsonify({'error': 'Certificado não encontrado'}), 404
         
-        certificado_data = {
-            'id': certificado.id,
-            'numero_serie_equipamento': certificado.numero_serie_equipamento,
-            'equipamento_nome': certificado.equipamento.nome_equipamento if certificado.equipamento else None,
-            'numero_certificado': certificado.numero_certificado,
-            'revisao_certificado': certificado.revisao_certificado,
-            'data_certificado': certificado.data_certificado,
-            'status_certificado_id': certificado.status_certificado_id,
-            'status_certificado': certificado.status_certificado.nome if certificado.status_certificado else None,
-            'caminho_arquivo': certificado.caminho_arquivo
-        }
+        certificado_data = para_dict(certificado)
         
         return jsonify(certificado_data)
     
@@ -123,61 +123,56 @@ def obter_certificado(certificado_id):
         return jsonify({'error': str(e)}), 500
 
 @certificados_bp.route('/<int:certificado_id>', methods=['PUT'])
+@orcamento_consultas(4)
 def atualizar_certificado(certificado_id):
     """Atualizar um certificado existente"""
     try:
         certificado = Certificado.query.get_or_404(certificado_id)
         data = request.get_json()
         
-        # Atualizar campos
-        certificado.numero_certificado = data.get('numero_certificado', certificado.numero_certificado)
-        certificado.revisao_certificado = data.get('revisao_certificado', certificado.revisao_certificado)
-        certificado.data_certificado = data.get('data_certificado', certificado.data_certificado)
-        certificado.status_certificado_id = data.get('status_certificado_id', certificado.status_certificado_id)
-        certificado.caminho_arquivo = data.get('caminho_arquivo', certificado.caminho_arquivo)
+        erro_data = normalizar_datas(data, ('data_certificado',))
+        if erro_data:
+            return jsonify({'error': erro_data}), 400
         
-        db.session.commit()
+        # Atualizar só os campos enviados
+        alteracoes = {campo: data[campo] for campo in CAMPOS_EDITAVEIS if campo in data}
+        executar_escrita(alterar, Certificado, certificado_id, alteracoes)
         
         return jsonify({'message': 'Certificado atualizado com sucesso'})
     
+    except EscritaNaoConcluida as e:
+        return jsonify({'error': str(e), 'status': e.status}), 503
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 @certificados_bp.route('/<int:certificado_id>', methods=['DELETE'])
+@orcamento_consultas(4)
 def deletar_certificado(certificado_id):
     """Deletar um certificado"""
     try:
         certificado = Certificado.query.get_or_404(certificado_id)
         
-        db.session.delete(certificado)
-        db.session.commit()
+        executar_escrita(remover, Certificado, certificado_id)
         
         return jsonify({'message': 'Certificado deletado com sucesso'})
     
+    except EscritaNaoConcluida as e:
+        return jsonify({'error': str(e), 'status': e.status}), 503
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 @certificados_bp.route('/equipamento/<numero_serie>', methods=['GET'])
+@orcamento_consultas(2)
 def certificados_por_equipamento(numero_serie):
     """Obter todos os certificados de um equipamento específico"""
     try:
-        certificados = Certificado.query.filter_by(
-            numero_serie_equipamento=numero_serie
+        certificados = consulta_certificados().filter(
+            Certificado.numero_serie_equipamento == numero_serie
         ).order_by(Certificado.data_certificado.desc()).all()
         
-        certificados_data = []
-        for cert in certificados:
-            certificado_data = {
-                'id': cert.id,
-                'numero_certificado': cert.numero_certificado,
-                'revisao_certificado': cert.revisao_certificado,
-                'data_certificado': cert.data_certificado,
-                'status_certificado': cert.status_certificado.nome if cert.status_certificado else None,
-                'caminho_arquivo': cert.caminho_arquivo
-            }
-            certificados_data.append(certificado_data)
+        certificados_data = para_dicts(certificados)
         
         return jsonify({
             'certificados': certificados_data,
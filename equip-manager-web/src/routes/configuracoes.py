@@ -2,18 +2,29 @@ from flask import Blueprint, request, jsonify
 from src.models.database import (
     db, Fabricante, Modelo, TipoEquipamento, Polo, Instalacao, 
     Unidade, ClassificacaoPontoMedicao, NaturezaTesteAnalise, 
-    StatusCertificadoIncerteza, ServicoIncerteza, CriterioAceitacao
+    StatusCertificadoIncerteza, ServicoIncerteza, CriterioAceitacao, Equipamento, existem_dependentes
 )
+from src.services.cache_configuracoes import (
+    resposta_configuracao, incrementar_versao_configuracao, ORCAMENTO_LISTAS
+)
+from src.services.consultas import orcamento_consultas
+from src.services.escritas import executar_escrita, inserir, alterar, remover, EscritaNaoConcluida
 
 configuracoes_bp = Blueprint('configuracoes', __name__)
 
+def gravar_configuracao(escrita, modelo, *args):
+    """Escrita: alterar uma lista de configuração e incrementar a versão do cache"""
+    resultado = escrita(modelo, *args)
+    incrementar_versao_configuracao()
+    return resultado
+
 # Rotas para Fabricantes
 @configuracoes_bp.route('/fabricantes', methods=['GET'])
+@orcamento_consultas(ORCAMENTO_LISTAS)
 def listar_fabricantes():
     """Listar todos os fabricantes"""
     try:
-        fabricantes = Fabricante.query.order_by(Fabricante.nome).all()
-        return jsonify([{'id': f.id, 'nome': f.nome} for f in fabricantes])
+        return resposta_configuracao('fabricantes')
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -26,11 +37,11 @@ def criar_fabricante():
         if Fabricante.query.filter_by(nome=data['nome']).first():
             return jsonify({'error': 'Fabricante já existe'}), 400
         
-        fabricante = Fabricante(nome=data['nome'])
-        db.session.add(fabricante)
-        db.session.commit()
+        fabricante_id = executar_escrita(gravar_configuracao, inserir, Fabricante, {'nome': data['nome']})
         
-        return jsonify({'message': 'Fabricante criado com sucesso', 'id': fabricante.id}), 201
+        return jsonify({'message': 'Fabricante criado com sucesso', 'id': fabricante_id}), 201
+    except EscritaNaoConcluida as e:
+        return jsonify({'error': str(e), 'status': e.status}), 503
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -47,10 +58,11 @@ def atualizar_fabricante(fabricante_id):
             if Fabricante.query.filter_by(nome=data['nome']).first():
                 return jsonify({'error': 'Nome do fabricante já existe'}), 400
         
-        fabricante.nome = data['nome']
-        db.session.commit()
+        executar_escrita(gravar_configuracao, alterar, Fabricante, fabricante_id, {'nome': data['nome']})
         
         return jsonify({'message': 'Fabricante atualizado com sucesso'})
+    except EscritaNaoConcluida as e:
+        return jsonify({'error': str(e), 'status': e.status}), 503
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -59,27 +71,28 @@ def atualizar_fabricante(fabricante_id):
 def deletar_fabricante(fabricante_id):
     """Deletar um fabricante"""
     try:
-        fabricante = Fabricante.query.get_or_404(fabricante_id)
+        Fabricante.query.get_or_404(fabricante_id)
         
         # Verificar se há equipamentos usando este fabricante
-        if fabricante.equipamentos:
+        if existem_dependentes(Equipamento.fabricante_id == fabricante_id):
             return jsonify({'error': 'Não é possível deletar fabricante com equipamentos associados'}), 400
         
-        db.session.delete(fabricante)
-        db.session.commit()
+        executar_escrita(gravar_configuracao, remover, Fabricante, fabricante_id)
         
         return jsonify({'message': 'Fabricante deletado com sucesso'})
+    except EscritaNaoConcluida as e:
+        return jsonify({'error': str(e), 'status': e.status}), 503
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 # Rotas para Tipos de Equipamento
 @configuracoes_bp.route('/tipos-equipamento', methods=['GET'])
+@orcamento_consultas(ORCAMENTO_LISTAS)
 def listar_tipos_equipamento():
     """Listar todos os tipos de equipamento"""
     try:
-        tipos = TipoEquipamento.query.order_by(TipoEquipamento.nome).all()
-        return jsonify([{'id': t.id, 'nome': t.nome} for t in tipos])
+        return resposta_configuracao('tipos_equipamento')
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -92,22 +105,22 @@ def criar_tipo_equipamento():
         if TipoEquipamento.query.filter_by(nome=data['nome']).first():
             return jsonify({'error': 'Tipo de equipamento já existe'}), 400
         
-        tipo = TipoEquipamento(nome=data['nome'])
-        db.session.add(tipo)
-        db.session.commit()
+        tipo_id = executar_escrita(gravar_configuracao, inserir, TipoEquipamento, {'nome': data['nome']})
         
-        return jsonify({'message': 'Tipo de equipamento criado com sucesso', 'id': tipo.id}), 201
+        return jsonify({'message': 'Tipo de equipamento criado com sucesso', 'id': tipo_id}), 201
+    except EscritaNaoConcluida as e:
+        return jsonify({'error': str(e), 'status': e.status}), 503
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 # Rotas para Polos
 @configuracoes_bp.route('/polos', methods=['GET'])
+@orcamento_consultas(ORCAMENTO_LISTAS)
 def listar_polos():
     """Listar todos os polos"""
     try:
-        polos = Polo.query.order_by(Polo.nome).all()
-        return jsonify([{'id': p.id, 'nome': p.nome} for p in polos])
+        return resposta_configuracao('polos')
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -120,27 +133,22 @@ def criar_polo():
         if Polo.query.filter_by(nome=data['nome']).first():
             return jsonify({'error': 'Polo já existe'}), 400
         
-        polo = Polo(nome=data['nome'])
-        db.session.add(polo)
-        db.session.commit()
+        polo_id = executar_escrita(gravar_configuracao, inserir, Polo, {'nome': data['nome']})
         
-        return jsonify({'message': 'Polo criado com sucesso', 'id': polo.id}), 201
+        return jsonify({'message': 'Polo criado com sucesso', 'id': polo_id}), 201
+    except EscritaNaoConcluida as e:
+        return jsonify({'error': str(e), 'status': e.status}), 503
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 # Rotas para Instalações
 @configuracoes_bp.route('/instalacoes', methods=['GET'])
+@orcamento_consultas(ORCAMENTO_LISTAS)
 def listar_instalacoes():
     """Listar todas as instalações"""
     try:
-        instalacoes = Instalacao.query.order_by(Instalacao.nome).all()
-        return jsonify([{
-            'id': i.id, 
-            'nome': i.nome,
-            'polo_id': i.polo_id,
-            'polo': i.polo.nome if i.polo else None
-        } for i in instalacoes])
+        return resposta_configuracao('instalacoes')
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -153,25 +161,25 @@ def criar_instalacao():
         if Instalacao.query.filter_by(nome=data['nome']).first():
             return jsonify({'error': 'Instalação já existe'}), 400
         
-        instalacao = Instalacao(
-            nome=data['nome'],
-            polo_id=data.get('polo_id')
-        )
-        db.session.add(instalacao)
-        db.session.commit()
+        instalacao_id = executar_escrita(gravar_configuracao, inserir, Instalacao, {
+            'nome': data['nome'],
+            'polo_id': data.get('polo_id')
+        })
         
-        return jsonify({'message': 'Instalação criada com sucesso', 'id': instalacao.id}), 201
+        return jsonify({'message': 'Instalação criada com sucesso', 'id': instalacao_id}), 201
+    except EscritaNaoConcluida as e:
+        return jsonify({'error': str(e), 'status': e.status}), 503
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 # Rotas para Unidades
 @configuracoes_bp.route('/unidades', methods=['GET'])
+@orcamento_consultas(ORCAMENTO_LISTAS)
 def listar_unidades():
     """Listar todas as unidades"""
     try:
-        unidades = Unidade.query.order_by(Unidade.nome).all()
-        return jsonify([{'id': u.id, 'nome': u.nome} for u in unidades])
+        return resposta_configuracao('unidades')
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -184,22 +192,22 @@ def criar_unidade():
         if Unidade.query.filter_by(nome=data['nome']).first():
             return jsonify({'error': 'Unidade já existe'}), 400
         
-        unidade = Unidade(nome=data['nome'])
-        db.session.add(unidade)
-        db.session.commit()
+        unidade_id = executar_escrita(gravar_configuracao, inserir, Unidade, {'nome': data['nome']})
         
-        return jsonify({'message': 'Unidade criada com sucesso', 'id': unidade.id}), 201
+        return jsonify({'message': 'Unidade criada com sucesso', 'id': unidade_id}), 201
+    except EscritaNaoConcluida as e:
+        return jsonify({'error': str(e), 'status': e.status}), 503
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 # Rotas para Classificações de Ponto de Medição
 @configuracoes_bp.route('/classificacoes-ponto-medicao', methods=['GET'])
+@orcamento_consultas(ORCAMENTO_LISTAS)
 def listar_classificacoes_ponto_medicao():
     """Listar todas as classificações de ponto de medição"""
     try:
-        classificacoes = ClassificacaoPontoMedicao.query.order_by(ClassificacaoPontoMedicao.nome).all()
-        return jsonify([{'id': c.id, 'nome': c.nome} for c in classificacoes])
+        return resposta_configuracao('classificacoes_ponto_medicao')
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -212,22 +220,22 @@ def criar_classificacao_ponto_medicao():
         if ClassificacaoPontoMedicao.query.filter_by(nome=data['nome']).first():
             return jsonify({'error': 'Classificação já existe'}), 400
         
-        classificacao = ClassificacaoPontoMedicao(nome=data['nome'])
-        db.session.add(classificacao)
-        db.session.commit()
+        classificacao_id = executar_escrita(gravar_configuracao, inserir, ClassificacaoPontoMedicao, {'nome': data['nome']})
         
-        return jsonify({'message': 'Classificação criada com sucesso', 'id': classificacao.id}), 201
+        return jsonify({'message': 'Classificação criada com sucesso', 'id': classificacao_id}), 201
+    except EscritaNaoConcluida as e:
+        return jsonify({'error': str(e), 'status': e.status}), 503
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 # Rotas para Naturezas de Teste/Análise
 @configuracoes_bp.route('/naturezas-teste-analise', methods=['GET'])
+@orcamento_consultas(ORCAMENTO_LISTAS)
 def listar_naturezas_teste_analise():
     """Listar todas as naturezas de teste/análise"""
     try:
-        naturezas = NaturezaTesteAnalise.query.order_by(NaturezaTesteAnalise.nome).all()
-        return jsonify([{'id': n.id, 'nome': n.nome} for n in naturezas])
+        return resposta_configuracao('naturezas_teste_analise')
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -240,22 +248,22 @@ def criar_natureza_teste_analise():
         if NaturezaTesteAnalise.query.filter_by(nome=data['nome']).first():
             return jsonify({'error': 'Natureza já existe'}), 400
         
-        natureza = NaturezaTesteAnalise(nome=data['nome'])
-        db.session.add(natureza)
-        db.session.commit()
+        natureza_id = executar_escrita(gravar_configuracao, inserir, NaturezaTesteAnalise, {'nome': data['nome']})
         
-        return jsonify({'message': 'Natureza criada com sucesso', 'id': natureza.id}), 201
+        return jsonify({'message': 'Natureza criada com sucesso', 'id': natureza_id}), 201
+    except EscritaNaoConcluida as e:
+        return jsonify({'error': str(e), 'status': e.status}), 503
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 # Rotas para Status
 @configuracoes_bp.route('/status', methods=['GET'])
+@orcamento_consultas(ORCAMENTO_LISTAS)
 def listar_status():
     """Listar todos os status"""
     try:
-        status = StatusCertificadoIncerteza.query.order_by(StatusCertificadoIncerteza.nome).all()
-        return jsonify([{'id': s.id, 'nome': s.nome} for s in status])
+        return resposta_configuracao('status')
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -268,22 +276,22 @@ def criar_status():
         if StatusCertificadoIncerteza.query.filter_by(nome=data['nome']).first():
             return jsonify({'error': 'Status já existe'}), 400
         
-        status = StatusCertificadoIncerteza(nome=data['nome'])
-        db.session.add(status)
-        db.session.commit()
+        status_id = executar_escrita(gravar_configuracao, inserir, StatusCertificadoIncerteza, {'nome': data['nome']})
         
-        return jsonify({'message': 'Status criado com sucesso', 'id': status.id}), 201
+        return jsonify({'message': 'Status criado com sucesso', 'id': status_id}), 201
+    except EscritaNaoConcluida as e:
+        return jsonify({'error': str(e), 'status': e.status}), 503
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 # Rotas para Critérios de Aceitação
 @configuracoes_bp.route('/criterios-aceitacao', methods=['GET'])
+@orcamento_consultas(ORCAMENTO_LISTAS)
 def listar_criterios_aceitacao():
     """Listar todos os critérios de aceitação"""
     try:
-        criterios = CriterioAceitacao.query.order_by(CriterioAceitacao.nome).all()
-        return jsonify([{'id': c.id, 'nome': c.nome} for c in criterios])
+        return resposta_configuracao('criterios_aceitacao')
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -296,31 +304,22 @@ def criar_criterio_aceitacao():
         if CriterioAceitacao.query.filter_by(nome=data['nome']).first():
             return jsonify({'error': 'Critério já existe'}), 400
         
-        criterio = CriterioAceitacao(nome=data['nome'])
-        db.session.add(criterio)
-        db.session.commit()
+        criterio_id = executar_escrita(gravar_configuracao, inserir, CriterioAceitacao, {'nome': data['nome']})
         
-        return jsonify({'message': 'Critério criado com sucesso', 'id': criterio.id}), 201
+        return jsonify({'message': 'Critério criado com sucesso', 'id': criterio_id}), 201
+    except EscritaNaoConcluida as e:
+        return jsonify({'error': str(e), 'status': e.status}), 503
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 # Rota para obter todas as configurações de uma vez
 @configuracoes_bp.route('/todas', methods=['GET'])
+@orcamento_consultas(ORCAMENTO_LISTAS)
 def obter_todas_configuracoes():
     """Obter todas as configurações em uma única requisição"""
     try:
-        return jsonify({
-            'fabricantes': [{'id': f.id, 'nome': f.nome} for f in Fabricante.query.order_by(Fabricante.nome).all()],
-            'tipos_equipamento': [{'id': t.id, 'nome': t.nome} for t in TipoEquipamento.query.order_by(TipoEquipamento.nome).all()],
-            'polos': [{'id': p.id, 'nome': p.nome} for p in Polo.query.order_by(Polo.nome).all()],
-            'instalacoes': [{'id': i.id, 'nome': i.nome, 'polo_id': i.polo_id} for i in Instalacao.query.order_by(Instalacao.nome).all()],
-            'unidades': [{'id': u.id, 'nome': u.nome} for u in Unidade.query.order_by(Unidade.nome).all()],
-            'classificacoes_ponto_medicao': [{'id': c.id, 'nome': c.nome} for c in ClassificacaoPontoMedicao.query.order_by(ClassificacaoPontoMedicao.nome).all()],
-            'naturezas_teste_analise': [{'id': n.id, 'nome': n.nome} for n in NaturezaTesteAnalise.query.order_by(NaturezaTesteAnalise.nome).all()],
-            'status': [{'id': s.id, 'nome': s.nome} for s in StatusCertificadoIncerteza.query.order_by(StatusCertificadoIncerteza.nome).all()],
-            'criterios_aceitacao': [{'id': c.id, 'nome': c.nome} for c in CriterioAceitacao.query.order_by(CriterioAceitacao.nome).all()]
-        })
+        return resposta_configuracao()
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -1,206 +1,366 @@
 from flask import Blueprint, request, jsonify
 from src.models.database import (
     db, Equipamento, PontoMedicao, Certificado, 
-    Fabricante, TipoEquipamento, Polo
+    Fabricante, TipoEquipamento, Polo, ClassificacaoPontoMedicao,
+    StatusCertificadoIncerteza, Contador, TABELAS_CONTADAS, CHAVE_VERSAO_DADOS
 )
-from datetime import datetime, timedelta
-from sqlalchemy import func, and_
+from src.services.serializadores import consulta_pontos_alerta, consulta_certificados, para_dict
+from src.services.cache_configuracoes import CHAVE_VERSAO, serializar, resposta_com_etag
+from src.services.consultas import orcamento_consultas
+from collections import OrderedDict
+import hashlib
+import threading
+from datetime import datetime, timedelta, date
+from sqlalchemy import func, and_, case, cast, extract, Integer
 
 dashboard_bp = Blueprint('dashboard', __name__)
 
+def calcular_resumo():
+    """Totais e alertas de calibração do resumo geral"""
+    # Contadores básicos (mantidos por gatilhos na tabela 'contadores')
+    totais = dict(db.session.query(Contador.chave, Contador.valor).filter(
+        Contador.chave.in_(TABELAS_CONTADAS)
+    ).all())
+    total_equipamentos = totais.get('equipamentos', 0)
+    total_pontos_medicao = totais.get('pontos_medicao', 0)
+    total_certificados = totais.get('certificados', 0)
+    
+    # Pontos de medição com calibração próxima do vencimento (30 dias)
+    data_hoje = date.today()
+    data_limite = data_hoje + timedelta(days=30)
+    
+    # Vencidos e próximos do vencimento em uma única consulta agrupada
+    pontos_vencidos, pontos_proximos_vencimento = db.session.query(
+        func.count(case((PontoMedicao.data_proxima_calibracao < data_hoje, 1))),
+        func.count(case((PontoMedicao.data_proxima_calibracao >= data_hoje, 1)))
+    ).filter(
+        PontoMedicao.data_proxima_calibracao.isnot(None),
+        PontoMedicao.data_proxima_calibracao <= data_limite
+    ).one()
+    
+    return {
+        'totais': {
+            'equipamentos': total_equipamentos,
+            'pontos_medicao': total_pontos_medicao,
+            'certificados': total_certificados
+        },
+        'alertas_calibracao': {
+            'vencidos': pontos_vencidos,
+            'proximos_vencimento': pontos_proximos_vencimento,
+            'total_alertas': pontos_vencidos + pontos_proximos_vencimento
+        }
+    }
+
 @dashboard_bp.route('/resumo', methods=['GET'])
+@orcamento_consultas(3)
 def resumo_geral():
     """Obter resumo geral do sistema"""
     try:
-        # Contadores básicos
-        total_equipamentos = Equipamento.query.count()
-        total_pontos_medicao = PontoMedicao.query.count()
-        total_certificados = Certificado.query.count()
-        
-        # Pontos de medição com calibração próxima do vencimento (30 dias)
-        data_limite = (datetime.now() + timedelta(days=30)).strftime('%Y-%m-%d')
-        data_hoje = datetime.now().strftime('%Y-%m-%d')
-        
-        pontos_vencidos = PontoMedicao.query.filter(
-            PontoMedicao.data_proxima_calibracao.isnot(None),
-            PontoMedicao.data_proxima_calibracao < data_hoje
-        ).count()
-        
-        pontos_proximos_vencimento = PontoMedicao.query.filter(
-            PontoMedicao.data_proxima_calibracao.isnot(None),
-            PontoMedicao.data_proxima_calibracao >= data_hoje,
-            PontoMedicao.data_proxima_calibracao <= data_limite
-        ).count()
-        
-        return jsonify({
-            'totais': {
-                'equipamentos': total_equipamentos,
-                'pontos_medicao': total_pontos_medicao,
-                'certificados': total_certificados
-            },
-            'alertas_calibracao': {
-                'vencidos': pontos_vencidos,
-                'proximos_vencimento': pontos_proximos_vencimento,
-                'total_alertas': pontos_vencidos + pontos_proximos_vencimento
-            }
-        })
+        return jsonify(calcular_resumo())
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def calcular_estatisticas_equipamentos():
+    """Equipamentos por fabricante e tipo, e pontos de medição por polo"""
+    # Equipamentos por fabricante
+    fabricantes_stats = db.session.query(
+        Fabricante.nome,
+        func.count(Equipamento.numero_serie).label('count')
+    ).join(Equipamento, Equipamento.fabricante_id == Fabricante.id)\
+     .group_by(Fabricante.nome)\
+     .order_by(func.count(Equipamento.numero_serie).desc()).all()
+    
+    # Equipamentos por tipo
+    tipos_stats = db.session.query(
+        TipoEquipamento.nome,
+        func.count(Equipamento.numero_serie).label('count')
+    ).join(Equipamento, Equipamento.tipo_equipamento_id == TipoEquipamento.id)\
+     .group_by(TipoEquipamento.nome)\
+     .order_by(func.count(Equipamento.numero_serie).desc()).all()
+    
+    # Equipamentos por polo (através dos pontos de medição)
+    polos_stats = db.session.query(
+        Polo.nome,
+        func.count(PontoMedicao.id).label('count')
+    ).join(PontoMedicao, PontoMedicao.polo_id == Polo.id)\
+     .group_by(Polo.nome)\
+     .order_by(func.count(PontoMedicao.id).desc()).all()
+    
+    return {
+        'por_fabricante': [{'nome': fab, 'count': count} for fab, count in fabricantes_stats],
+        'por_tipo': [{'nome': tipo, 'count': count} for tipo, count in tipos_stats],
+        'por_polo': [{'nome': polo, 'count': count} for polo, count in polos_stats]
+    }
+
 @dashboard_bp.route('/estatisticas-equipamentos', methods=['GET'])
+@orcamento_consultas(4)
 def estatisticas_equipamentos():
     """Obter estatísticas detalhadas dos equipamentos"""
     try:
-        # Equipamentos por fabricante
-        fabricantes_stats = db.session.query(
-            Fabricante.nome,
-            func.count(Equipamento.numero_serie).label('count')
-        ).join(Equipamento, Equipamento.fabricante_id == Fabricante.id)\
-         .group_by(Fabricante.nome)\
-         .order_by(func.count(Equipamento.numero_serie).desc()).all()
-        
-        # Equipamentos por tipo
-        tipos_stats = db.session.query(
-            TipoEquipamento.nome,
-            func.count(Equipamento.numero_serie).label('count')
-        ).join(Equipamento, Equipamento.tipo_equipamento_id == TipoEquipamento.id)\
-         .group_by(TipoEquipamento.nome)\
-         .order_by(func.count(Equipamento.numero_serie).desc()).all()
-        
-        # Equipamentos por polo (através dos pontos de medição)
-        polos_stats = db.session.query(
-            Polo.nome,
-            func.count(PontoMedicao.id).label('count')
-        ).join(PontoMedicao, PontoMedicao.polo_id == Polo.id)\
-         .group_by(Polo.nome)\
-         .order_by(func.count(PontoMedicao.id).desc()).all()
-        
-        return jsonify({
-            'por_fabricante': [{'nome': fab, 'count': count} for fab, count in fabricantes_stats],
-            'por_tipo': [{'nome': tipo, 'count': count} for tipo, count in tipos_stats],
-            'por_polo': [{'nome': polo, 'count': count} for polo, count in polos_stats]
-        })
+        return jsonify(calcular_estatisticas_equipamentos())
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+MESES = ['Jan', 'Fev', 'Mar', 'Abr', 'Mai', 'Jun', 
+         'Jul', 'Ago', 'Set', 'Out', 'Nov', 'Dez']
+
+# Chaves de detalhamento aceitas em agrupar_por: (modelo, coluna de ligação)
+GRUPOS_CRONOGRAMA = {
+    'polo': (Polo, PontoMedicao.polo_id),
+    'classificacao': (ClassificacaoPontoMedicao, PontoMedicao.classificacao_id)
+}
+
+# Limite de meses por consulta (10 anos)
+MAX_MESES_CRONOGRAMA = 120
+
+def _parse_ano_mes(valor):
+    """Converter 'YYYY-MM' (ou 'YYYY-MM-DD') em (ano, mes)"""
+    data = datetime.strptime(valor[:7], '%Y-%m')
+    return data.year, data.month
+
+class ParametroInvalido(ValueError):
+    """Parâmetro de consulta do dashboard inválido"""
+
+def calcular_cronograma(ano, de=None, ate=None, agrupar_por=None):
+    """Calibrações por mês no ano ou no intervalo de/ate, opcionalmente agrupadas"""
+    try:
+        ano_inicio, mes_inicio = _parse_ano_mes(de) if de else (ano, 1)
+        ano_fim, mes_fim = _parse_ano_mes(ate) if ate else (ano_inicio if de else ano, 12)
+    except ValueError:
+        raise ParametroInvalido('Parâmetros de/ate devem estar no formato YYYY-MM')
+    
+    if agrupar_por and agrupar_por not in GRUPOS_CRONOGRAMA:
+        raise ParametroInvalido(f'agrupar_por deve ser um de: {", ".join(GRUPOS_CRONOGRAMA)}')
+    
+    # Série densa de meses do intervalo
+    indice_inicio = ano_inicio * 12 + mes_inicio - 1
+    indice_fim = ano_fim * 12 + mes_fim - 1
+    if indice_fim < indice_inicio:
+        raise ParametroInvalido('Parâmetro ate deve ser posterior a de')
+    if indice_fim - indice_inicio + 1 > MAX_MESES_CRONOGRAMA:
+        raise ParametroInvalido(f'Intervalo máximo de {MAX_MESES_CRONOGRAMA} meses')
+    
+    meses = [divmod(indice, 12) for indice in range(indice_inicio, indice_fim + 1)]
+    meses = [(a, m + 1) for a, m in meses]
+    posicao = {mes: i for i, mes in enumerate(meses)}
+    
+    data_inicio = date(ano_inicio, mes_inicio, 1)
+    ano_seguinte, mes_seguinte = divmod(indice_fim + 1, 12)
+    data_fim = date(ano_seguinte, mes_seguinte + 1, 1)
+    
+    # Uma única consulta agrupada por ano/mês (e pelo grupo, se pedido)
+    # extract() devolve numeric no PostgreSQL: inteiros para casar com as chaves de 'posicao'
+    ano_col = cast(extract('year', PontoMedicao.data_proxima_calibracao), Integer)
+    mes_col = cast(extract('month', PontoMedicao.data_proxima_calibracao), Integer)
+    colunas = [ano_col.label('ano'), mes_col.label('mes')]
+    agrupamento = [ano_col, mes_col]
+    
+    if agrupar_por:
+        modelo_grupo, coluna_grupo = GRUPOS_CRONOGRAMA[agrupar_por]
+        colunas += [coluna_grupo.label('grupo_id'), modelo_grupo.nome.label('grupo_nome')]
+        agrupamento += [coluna_grupo, modelo_grupo.nome]
+    
+    query = db.session.query(*colunas, func.count(PontoMedicao.id).label('calibracoes'))
+    if agrupar_por:
+        query = query.outerjoin(modelo_grupo, coluna_grupo == modelo_grupo.id)
+    
+    linhas = query.filter(
+        PontoMedicao.data_proxima_calibracao.isnot(None),
+        PontoMedicao.data_proxima_calibracao >= data_inicio,
+        PontoMedicao.data_proxima_calibracao < data_fim
+    ).group_by(*agrupamento).all()
+    
+    totais = [0] * len(meses)
+    grupos = {}
+    for linha in linhas:
+        i = posicao.get((linha.ano, linha.mes))
+        if i is None:
+            continue
+        totais[i] += linha.calibracoes
+        if agrupar_por:
+            grupo = grupos.setdefault(linha.grupo_id, {
+                'id': linha.grupo_id,
+                'nome': linha.grupo_nome,
+                'calibracoes': [0] * len(meses)
+            })
+            grupo['calibracoes'][i] += linha.calibracoes
+    
+    cronograma = [{
+        'mes': MESES[m - 1],
+        'numero_mes': m,
+        'ano': a,
+        'calibracoes': totais[i]
+    } for i, (a, m) in enumerate(meses)]
+    
+    resultado = {
+        'de': f"{ano_inicio}-{mes_inicio:02d}",
+        'ate': f"{ano_fim}-{mes_fim:02d}",
+        'cronograma': cronograma,
+        'total': sum(totais)
+    }
+    
+    if not de and not ate:
+        resultado['ano'] = ano
+        resultado['total_ano'] = resultado['total']
+    
+    if agrupar_por:
+        resultado['agrupar_por'] = agrupar_por
+        resultado['grupos'] = sorted(grupos.values(), key=lambda g: g['nome'] or '')
+    
+    return resultado
+
 @dashboard_bp.route('/cronograma-calibracoes', methods=['GET'])
+@orcamento_consultas(2)
 def cronograma_calibracoes():
-    """Obter cronograma de calibrações por mês"""
+    """Obter cronograma de calibrações por mês (ano único ou intervalo de/ate)"""
     try:
         # Obter ano atual ou ano especificado
         ano = request.args.get('ano', datetime.now().year, type=int)
         
-        # Inicializar dados para todos os meses
-        meses = ['Jan', 'Fev', 'Mar', 'Abr', 'Mai', 'Jun', 
-                'Jul', 'Ago', 'Set', 'Out', 'Nov', 'Dez']
-        
-        cronograma = []
-        
-        for i, mes_nome in enumerate(meses, 1):
-            # Criar datas de início e fim do mês
-            if i == 12:
-                data_inicio = f"{ano}-{i:02d}-01"
-                data_fim = f"{ano + 1}-01-01"
-            else:
-                data_inicio = f"{ano}-{i:02d}-01"
-                data_fim = f"{ano}-{i+1:02d}-01"
-            
-            # Contar calibrações programadas para o mês
-            calibracoes_mes = PontoMedicao.query.filter(
-                PontoMedicao.data_proxima_calibracao.isnot(None),
-                PontoMedicao.data_proxima_calibracao >= data_inicio,
-                PontoMedicao.data_proxima_calibracao < data_fim
-            ).count()
-            
-            cronograma.append({
-                'mes': mes_nome,
-                'numero_mes': i,
-                'calibracoes': calibracoes_mes
-            })
-        
-        return jsonify({
-            'ano': ano,
-            'cronograma': cronograma,
-            'total_ano': sum(item['calibracoes'] for item in cronograma)
-        })
+        return jsonify(calcular_cronograma(
+            ano,
+            de=request.args.get('de'),
+            ate=request.args.get('ate'),
+            agrupar_por=request.args.get('agrupar_por')
+        ))
     
+    except ParametroInvalido as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def calcular_pontos_criticos(limite_dias=30):
+    """Pontos vencidos e próximos do vencimento (até limite_dias)"""
+    data_hoje = date.today()
+    data_limite = data_hoje + timedelta(days=limite_dias)
+    
+    # Pontos vencidos
+    pontos_vencidos = consulta_pontos_alerta().filter(
+        PontoMedicao.data_proxima_calibracao.isnot(None),
+        PontoMedicao.data_proxima_calibracao < data_hoje
+    ).order_by(PontoMedicao.data_proxima_calibracao).all()
+    
+    # Pontos próximos do vencimento
+    pontos_proximos = consulta_pontos_alerta().filter(
+        PontoMedicao.data_proxima_calibracao.isnot(None),
+        PontoMedicao.data_proxima_calibracao >= data_hoje,
+        PontoMedicao.data_proxima_calibracao <= data_limite
+    ).order_by(PontoMedicao.data_proxima_calibracao).all()
+    
+    def formatar_ponto_critico(ponto):
+        ponto_data = para_dict(ponto)
+        ponto_data['dias_restantes'] = (ponto.data_proxima_calibracao - data_hoje).days
+        ponto_data['equipamento'] = ponto_data.pop('equipamento_nome')
+        return ponto_data
+    
+    return {
+        'pontos_vencidos': [formatar_ponto_critico(p) for p in pontos_vencidos],
+        'pontos_proximos': [formatar_ponto_critico(p) for p in pontos_proximos],
+        'resumo': {
+            'total_vencidos': len(pontos_vencidos),
+            'total_proximos': len(pontos_proximos),
+            'total_criticos': len(pontos_vencidos) + len(pontos_proximos)
+        }
+    }
+
 @dashboard_bp.route('/pontos-criticos', methods=['GET'])
+@orcamento_consultas(3)
 def pontos_criticos():
     """Obter pontos de medição críticos (vencidos ou próximos do vencimento)"""
     try:
         limite_dias = request.args.get('dias', 30, type=int)
         
-        data_limite = (datetime.now() + timedelta(days=limite_dias)).strftime('%Y-%m-%d')
-        data_hoje = datetime.now().strftime('%Y-%m-%d')
+        return jsonify(calcular_pontos_criticos(limite_dias))
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Leituras do bundle antes de desistir de uma versão estável, e bundles em cache
+TENTATIVAS_BUNDLE = 3
+MAX_BUNDLES_EM_CACHE = 16
+
+# Comandos SQL de uma tentativa de montagem (versões antes/depois e as seções);
+# os contadores são lidos três vezes por tentativa
+CONSULTAS_POR_MONTAGEM = 10
+
+_bundles = OrderedDict()
+_trava_bundles = threading.Lock()
+
+def versoes_dados():
+    """Versões dos dados e das configurações (uma consulta)"""
+    versoes = dict(db.session.query(Contador.chave, Contador.valor).filter(
+        Contador.chave.in_((CHAVE_VERSAO_DADOS, CHAVE_VERSAO))
+    ).all())
+    return versoes.get(CHAVE_VERSAO_DADOS, 0), versoes.get(CHAVE_VERSAO, 0)
+
+def chave_bundle(versoes, ano, dias):
+    """Chave de cache e ETag do bundle (o dia entra porque vencimentos dependem de hoje)"""
+    chave = f'{versoes[0]}:{versoes[1]}:{date.today().isoformat()}:{ano}:{dias}'
+    return chave, hashlib.sha256(chave.encode('utf-8')).hexdigest()[:32]
+
+def montar_bundle(ano, dias):
+    """Todos os dados exibidos na tela do dashboard"""
+    return {
+        'resumo': calcular_resumo(),
+        'estatisticas': calcular_estatisticas_equipamentos(),
+        'cronograma': calcular_cronograma(ano),
+        'pontos_criticos': calcular_pontos_criticos(dias)
+    }
+
+@dashboard_bp.route('/bundle', methods=['GET'])
+@orcamento_consultas(CONSULTAS_POR_MONTAGEM * TENTATIVAS_BUNDLE, repeticoes=3 * TENTATIVAS_BUNDLE)
+def bundle():
+    """Obter resumo, estatísticas, cronograma e pontos críticos em uma única resposta"""
+    try:
+        ano = request.args.get('ano', date.today().year, type=int)
+        dias = request.args.get('dias', 30, type=int)
         
-        # Pontos vencidos
-        pontos_vencidos = PontoMedicao.query.filter(
-            PontoMedicao.data_proxima_calibracao.isnot(None),
-            PontoMedicao.data_proxima_calibracao < data_hoje
-        ).order_by(PontoMedicao.data_proxima_calibracao).all()
+        versoes = versoes_dados()
+        chave, etag = chave_bundle(versoes, ano, dias)
+        if request.if_none_match.contains(etag):
+            return resposta_com_etag(None, etag)
         
-        # Pontos próximos do vencimento
-        pontos_proximos = PontoMedicao.query.filter(
-            PontoMedicao.data_proxima_calibracao.isnot(None),
-            PontoMedicao.data_proxima_calibracao >= data_hoje,
-            PontoMedicao.data_proxima_calibracao <= data_limite
-        ).order_by(PontoMedicao.data_proxima_calibracao).all()
+        with _trava_bundles:
+            corpo = _bundles.get(chave)
         
-        def formatar_ponto_critico(ponto):
-            dias_restantes = None
-            if ponto.data_proxima_calibracao:
-                try:
-                    data_calibracao = datetime.strptime(ponto.data_proxima_calibracao, '%Y-%m-%d')
-                    dias_restantes = (data_calibracao - datetime.now()).days
-                except:
-                    pass
+        if corpo is None:
+            # Montagem consistente: refazer se a versão mudou durante as consultas
+            for _ in range(TENTATIVAS_BUNDLE):
+                dados = montar_bundle(ano, dias)
+                versoes_final = versoes_dados()
+                if versoes_final == versoes:
+                    break
+                versoes = versoes_final
+            else:
+                # Dados em alteração contínua: responder sem cache
+                return jsonify(dados)
             
-            return {
-                'id': ponto.id,
-                'tag_ponto_medicao': ponto.tag_ponto_medicao,
-                'nome_ponto_medicao': ponto.nome_ponto_medicao,
-                'data_proxima_calibracao': ponto.data_proxima_calibracao,
-                'dias_restantes': dias_restantes,
-                'polo': ponto.polo.nome if ponto.polo else None,
-                'equipamento': ponto.equipamento.nome_equipamento if ponto.equipamento else None,
-                'numero_serie_equipamento': ponto.numero_serie_equipamento
-            }
+            chave, etag = chave_bundle(versoes, ano, dias)
+            corpo, _ = serializar(dados)
+            with _trava_bundles:
+                _bundles[chave] = corpo
+                while len(_bundles) > MAX_BUNDLES_EM_CACHE:
+                    _bundles.popitem(last=False)
         
-        return jsonify({
-            'pontos_vencidos': [formatar_ponto_critico(p) for p in pontos_vencidos],
-            'pontos_proximos': [formatar_ponto_critico(p) for p in pontos_proximos],
-            'resumo': {
-                'total_vencidos': len(pontos_vencidos),
-                'total_proximos': len(pontos_proximos),
-                'total_criticos': len(pontos_vencidos) + len(pontos_proximos)
-            }
-        })
+        return resposta_com_etag(corpo, etag)
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @dashboard_bp.route('/ultimas-atividades', methods=['GET'])
+@orcamento_consultas(1)
 def ultimas_atividades():
     """Obter últimas atividades do sistema"""
     try:
         limite = request.args.get('limite', 10, type=int)
         
         # Últimos certificados adicionados
-        ultimos_certificados = Certificado.query.order_by(
+        ultimos_certificados = consulta_certificados().order_by(
             Certificado.data_certificado.desc()
         ).limit(limite).all()
         
-        # Últimos equipamentos adicionados (assumindo que temos uma data de criação)
-        # Como não temos data de criação, vamos usar os últimos por ID
-        ultimos_equipamentos = Equipamento.query.order_by(
-            Equipamento.numero_serie.desc()
-        ).limit(limite).all()
-        
         atividades = []
         
         # Adicionar certificados às atividades
@@ -212,7 +372,7 @@ def ultimas_atividades():
                 'detalhes': {
                     'numero_certificado': cert.numero_certificado,
                     'numero_serie_equipamento': cert.numero_serie_equipamento,
-                    'equipamento_nome': cert.equipamento.nome_equipamento if cert.equipamento else None
+                    'equipamento_nome': cert.equipamento_nome
                 }
             })
         
@@ -228,6 +388,7 @@ def ultimas_atividades():
         return jsonify({'error': str(e)}), 500
 
 @dashboard_bp.route('/indicadores-performance', methods=['GET'])
+@orcamento_consultas(4)
 def indicadores_performance():
     """Obter indicadores de performance do sistema"""
     try:
@@ -236,7 +397,7 @@ def indicadores_performance():
             PontoMedicao.data_proxima_calibracao.isnot(None)
         ).count()
         
-        data_hoje = datetime.now().strftime('%Y-%m-%d')
+        data_hoje = date.today()
         pontos_em_dia = PontoMedicao.query.filter(
             PontoMedicao.data_proxima_calibracao.isnot(None),
             PontoMedicao.data_proxima_calibracao >= data_hoje
@@ -244,11 +405,14 @@ def indicadores_performance():
         
         percentual_em_dia = (pontos_em_dia / total_pontos * 100) if total_pontos > 0 else 0
         
-        # Certificados por status (assumindo que temos status)
+        # Certificados por status (sem status agrupados em 'Sem Status')
+        status = func.coalesce(StatusCertificadoIncerteza.nome, 'Sem Status')
         certificados_por_status = db.session.query(
-            func.coalesce(db.session.query(db.literal('Sem Status')), 'Sem Status').label('status'),
+            status.label('status'),
             func.count(Certificado.id).label('count')
-        ).group_by('status').all()
+        ).outerjoin(
+            StatusCertificadoIncerteza, Certificado.status_certificado_id == StatusCertificadoIncerteza.id
+        ).group_by(status).all()
         
         return jsonify({
             'calibracoes': {
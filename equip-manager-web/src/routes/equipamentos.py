@@ -1,29 +1,47 @@
 from flask import Blueprint, request, jsonify
-from models.database import db, Equipamento, Fabricante, TipoEquipamento, Unidade
-from sqlalchemy import or_
-from datetime import datetimequipamentos_bp = Blueprint('equipamentos', __name__)
+from src.models.database import (
+    db, Equipamento, Fabricante, TipoEquipamento, Unidade, PontoMedicao, Certificado, PlacaOrificio, TrechoReto,
+    Contador, existem_dependentes
+)
+from src.services.serializadores import consulta_equipamentos, para_dict, para_dicts
+from src.services.paginacao import paginar, CursorInvalido
+from src.services.busca import filtrar_busca
+from src.services.consultas import orcamento_consultas
+from src.services.escritas import executar_escrita, inserir, alterar, remover, EscritaNaoConcluida
+from datetime import datetime
+
+equipamentos_bp = Blueprint('equipamentos', __name__)
+
+# Chave estável de ordenação para paginação por cursor
+CHAVES_CURSOR = [('numero_serie', Equipamento.numero_serie, False)]
+
+# Campos alteráveis pelo PUT (o número de série é a chave)
+CAMPOS_EDITAVEIS = (
+    'tag_equipamento', 'fabricante_id', 'modelo_id', 'nome_equipamento', 'tipo_equipamento_id',
+    'unidade_id', 'resolucao', 'faixa_minima_equipamento', 'faixa_maxima_equipamento',
+    'faixa_minima_pam', 'faixa_maxima_pam', 'faixa_minima_calibrada', 'faixa_maxima_calibrada',
+    'condicoes_ambientais', 'erro_maximo_admissivel', 'criterio_aceitacao_id',
+    'software_versao'
+)
 
 @equipamentos_bp.route('/', methods=['GET'])
+@orcamento_consultas(3)
 def listar_equipamentos():
     """Listar todos os equipamentos com filtros opcionais"""
     try:
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 20, type=int)
         search = request.args.get('search', '')
         fabricante_id = request.args.get('fabricante_id', type=int)
         tipo_equipamento_id = request.args.get('tipo_equipamento_id', type=int)
         
-        query = Equipamento.query
+        query = consulta_equipamentos()
         
         # Aplicar filtros
         if search:
-            query = query.filter(
-                or_(
-                    Equipamento.numero_serie.contains(search),
-                    Equipamento.tag_equipamento.contains(search),
-                    Equipamento.nome_equipamento.contains(search)
-                )
-            )
+            query = filtrar_busca(query, 'equipamentos', search, [
+                Equipamento.numero_serie,
+                Equipamento.tag_equipamento,
+                Equipamento.nome_equipamento
+            ])
         
         if fabricante_id:
             query = query.filter(Equipamento.fabricante_id == fabricante_id)
@@ -31,47 +49,19 @@ def listar_equipamentos():
         if tipo_equipamento_id:
             query = query.filter(Equipamento.tipo_equipamento_id == tipo_equipamento_id)
         
-        # Paginação
-        equipamentos_paginados = query.paginate(
-            page=page, per_page=per_page, error_out=False
-        )
-        
-        equipamentos = []
-        for equip in equipamentos_paginados.items:
-            equipamento_data = {
-                'numero_serie': equip.numero_serie,
-                'tag_equipamento': equip.tag_equipamento,
-                'nome_equipamento': equip.nome_equipamento,
-                'fabricante': equip.fabricante.nome if equip.fabricante else None,
-                'modelo': equip.modelo.nome if equip.modelo else None,
-                'tipo_equipamento': equip.tipo_equipamento.nome if equip.tipo_equipamento else None,
-                'unidade': equip.unidade.nome if equip.unidade else None,
-                'resolucao': equip.resolucao,
-                'faixa_minima_equipamento': equip.faixa_minima_equipamento,
-                'faixa_maxima_equipamento': equip.faixa_maxima_equipamento,
-                'faixa_minima_pam': equip.faixa_minima_pam,
-                'faixa_maxima_pam': equip.faixa_maxima_pam,
-                'faixa_minima_calibrada': equip.faixa_minima_calibrada,
-                'faixa_maxima_calibrada': equip.faixa_maxima_calibrada,
-                'condicoes_ambientais': equip.condicoes_ambientais,
-                'erro_maximo_admissivel': equip.erro_maximo_admissivel,
-                'criterio_aceitacao': equip.criterio_aceitacao.nome if equip.criterio_aceitacao else None,
-                'software_versao': equip.software_versao
-            }
-            equipamentos.append(equipamento_data)
+        # Paginação (offset ou cursor)
+        pagina = paginar(query, CHAVES_CURSOR, 'equipamentos')
+        equipamentos = para_dicts(pagina.pop('itens'))
         
-        return jsonify({
-            'equipamentos': equipamentos,
-            'total': equipamentos_paginados.total,
-            'pages': equipamentos_paginados.pages,
-            'current_page': page,
-            'per_page': per_page
-        })
+        return jsonify({'equipamentos': equipamentos, **pagina})
     
+    except CursorInvalido as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @equipamentos_bp.route('/', methods=['POST'])
+@orcamento_consultas(5)
 def criar_equipamento():
     """Criar um novo equipamento"""
     try:
@@ -86,7 +76,7 @@ def criar_equipamento():
             if Equipamento.query.filter_by(tag_equipamento=data['tag_equipamento']).first():
                 return jsonify({'error': 'TAG do equipamento já existe'}), 400
         
-        equipamento = Equipamento(
+        campos = dict(
             numero_serie=data['numero_serie'],
             tag_equipamento=data.get('tag_equipamento'),
             fabricante_id=data.get('fabricante_id'),
@@ -107,46 +97,29 @@ def criar_equipamento():
             software_versao=data.get('software_versao')
         )
         
-        db.session.add(equipamento)
-        db.session.commit()
+        executar_escrita(inserir, Equipamento, campos)
         
-        return jsonify({'message': 'Equipamento criado com sucesso', 'numero_serie': equipamento.numero_serie}), 201
+        return jsonify({'message': 'Equipamento criado com sucesso', 'numero_serie': data['numero_serie']}), 201
     
+    except EscritaNaoConcluida as e:
+        return jsonify({'error': str(e), 'status': e.status}), 503
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 @equipamentos_bp.route('/<numero_serie>', methods=['GET'])
+@orcamento_consultas(2)
 def obter_equipamento(numero_serie):
     """Obter um equipamento específico"""
     try:
-        equipamento = Equipamento.query.get_or_404(numero_serie)
+        equipamento = consulta_equipamentos(detalhe=True).filter(
+            Equipamento.numero_serie == numero_serie
+        ).first()
         
-        equipamento_data = {
-            'numero_serie': equipamento.numero_serie,
-            'tag_equipamento': equipamento.tag_equipamento,
-            'nome_equipamento': equipamento.nome_equipamento,
-            'fabricante_id': equipamento.fabricante_id,
-            'fabricante': equipamento.fabricante.nome if equipamento.fabricante else None,
-            'modelo_id': equipamento.modelo_id,
-            'modelo': equipamento.modelo.nome if equipamento.modelo else None,
-            'tipo_equipamento_id': equipamento.tipo_equipamento_id,
-            'tipo_equipamento': equipamento.tipo_equipamento.nome if equipamento.tipo_equipamento else None,
-            'unidade_id': equipamento.unidade_id,
-            'unidade': equipamento.unidade.nome if equipamento.unidade else None,
-            'resolucao': equipamento.resolucao,
-            'faixa_minima_equipamento': equipamento.faixa_minima_equipamento,
-            'faixa_maxima_equipamento': equipamento.faixa_maxima_equipamento,
-            'faixa_minima_pam': equipamento.faixa_minima_pam,
-            'faixa_maxima_pam': equipamento.faixa_maxima_pam,
-            'faixa_minima_calibrada': equipamento.faixa_minima_calibrada,
-            'faixa_maxima_calibrada': equipamento.faixa_maxima_calibrada,
-            'condicoes_ambientais': equipamento.condicoes_ambientais,
-            'erro_maximo_admissivel': equipamento.erro_maximo_admissivel,
-            'criterio_aceitacao_id': equipamento.criterio_aceitacao_id,
-            'criterio_aceitacao': equipamento.criterio_aceitacao.nome if equipamento.criterio_aceitacao else None,
-            'software_versao': equipamento.software_versao
-        }
+        if equipamento is None:
+            return jsonify({'error': 'Equipamento não encontrado'}), 404
+        
+        equipamento_data = para_dict(equipamento)
         
         return jsonify(equipamento_data)
     
@@ -154,6 +127,7 @@ def obter_equipamento(numero_serie):
         return jsonify({'error': str(e)}), 500
 
 @equipamentos_bp.route('/<numero_serie>', methods=['PUT'])
+@orcamento_consultas(4)
 def atualizar_equipamento(numero_serie):
     """Atualizar um equipamento existente"""
     try:
@@ -165,57 +139,51 @@ def atualizar_equipamento(numero_serie):
             if Equipamento.query.filter_by(tag_equipamento=data['tag_equipamento']).first():
                 return jsonify({'error': 'TAG do equipamento já existe'}), 400
         
-        # Atualizar campos
-        equipamento.tag_equipamento = data.get('tag_equipamento', equipamento.tag_equipamento)
-        equipamento.fabricante_id = data.get('fabricante_id', equipamento.fabricante_id)
-        equipamento.modelo_id = data.get('modelo_id', equipamento.modelo_id)
-        equipamento.nome_equipamento = data.get('nome_equipamento', equipamento.nome_equipamento)
-        equipamento.tipo_equipamento_id = data.get('tipo_equipamento_id', equipamento.tipo_equipamento_id)
-        equipamento.unidade_id = data.get('unidade_id', equipamento.unidade_id)
-        equipamento.resolucao = data.get('resolucao', equipamento.resolucao)
-        equipamento.faixa_minima_equipamento = data.get('faixa_minima_equipamento', equipamento.faixa_minima_equipamento)
-        equipamento.faixa_maxima_equipamento = data.get('faixa_maxima_equipamento', equipamento.faixa_maxima_equipamento)
-        equipamento.faixa_minima_pam = data.get('faixa_minima_pam', equipamento.faixa_minima_pam)
-        equipamento.faixa_maxima_pam = data.get('faixa_maxima_pam', equipamento.faixa_maxima_pam)
-        equipamento.faixa_minima_calibrada = data.get('faixa_minima_calibrada', equipamento.faixa_minima_calibrada)
-        equipamento.faixa_maxima_calibrada = data.get('faixa_maxima_calibrada', equipamento.faixa_maxima_calibrada)
-        equipamento.condicoes_ambientais = data.get('condicoes_ambientais', equipamento.condicoes_ambientais)
-        equipamento.erro_maximo_admissivel = data.get('erro_maximo_admissivel', equipamento.erro_maximo_admissivel)
-        equipamento.criterio_aceitacao_id = data.get('criterio_aceitacao_id', equipamento.criterio_aceitacao_id)
-        equipamento.software_versao = data.get('software_versao', equipamento.software_versao)
-        
-        db.session.commit()
+        # Atualizar só os campos enviados
+        alteracoes = {campo: data[campo] for campo in CAMPOS_EDITAVEIS if campo in data}
+        executar_escrita(alterar, Equipamento, numero_serie, alteracoes)
         
         return jsonify({'message': 'Equipamento atualizado com sucesso'})
     
+    except EscritaNaoConcluida as e:
+        return jsonify({'error': str(e), 'status': e.status}), 503
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 @equipamentos_bp.route('/<numero_serie>', methods=['DELETE'])
+@orcamento_consultas(2)
 def deletar_equipamento(numero_serie):
     """Deletar um equipamento"""
     try:
-        equipamento = Equipamento.query.get_or_404(numero_serie)
+        Equipamento.query.get_or_404(numero_serie)
         
         # Verificar se há dependências (pontos de medição, certificados, etc.)
-        if equipamento.pontos_medicao or equipamento.certificados:
-            return jsonify({'error': 'Não é possível deletar equipamento com dependências (pontos de medição ou certificados)'}), 400
+        if existem_dependentes(
+            PontoMedicao.numero_serie_equipamento == numero_serie,
+            Certificado.numero_serie_equipamento == numero_serie,
+            PlacaOrificio.numero_serie_equipamento == numero_serie,
+            TrechoReto.numero_serie_equipamento == numero_serie
+        ):
+            return jsonify({'error': 'Não é possível deletar equipamento com dependências (pontos de medição, certificados, placa de orifício ou trecho reto)'}), 400
         
-        db.session.delete(equipamento)
-        db.session.commit()
+        executar_escrita(remover, Equipamento, numero_serie)
         
         return jsonify({'message': 'Equipamento deletado com sucesso'})
     
+    except EscritaNaoConcluida as e:
+        return jsonify({'error': str(e), 'status': e.status}), 503
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 @equipamentos_bp.route('/estatisticas', methods=['GET'])
+@orcamento_consultas(3)
 def estatisticas_equipamentos():
     """Obter estatísticas dos equipamentos"""
     try:
-        total_equipamentos = Equipamento.query.count()
+        # Total mantido por gatilhos na tabela 'contadores'
+        total_equipamentos = db.session.query(Contador.valor).filter(Contador.chave == 'equipamentos').scalar() or 0
         
         # Equipamentos por fabricante
         fabricantes_stats = db.session.query(
@@ -0,0 +1,34 @@
+from urllib.parse import urlencode, urlsplit
+from flask import Blueprint, request, jsonify, redirect, current_app
+
+eventos_bp = Blueprint('eventos', __name__)
+
+def endereco_servidor_eventos():
+    """Endereço público do servidor de eventos: EVENTOS_URL ou o host da requisição na EVENTOS_PORTA"""
+    if current_app.config['EVENTOS_URL']:
+        return current_app.config['EVENTOS_URL'].rstrip('/')
+    host = urlsplit(request.host_url).hostname
+    if ':' in host:
+        host = f'[{host}]'
+    return f"{request.scheme}://{host}:{current_app.config['EVENTOS_PORTA']}"
+
+@eventos_bp.route('/stream', methods=['GET'])
+def stream():
+    """Canal SSE com as alterações de equipamentos, pontos de medição e certificados.
+    
+    As conexões ficam abertas por muito tempo e não devem ocupar as threads
+    dos workers: o navegador é redirecionado ao servidor de eventos
+    (src/servidor_eventos.py), levando o último evento recebido.
+    """
+    try:
+        parametros = {}
+        ultimo_id = request.headers.get('Last-Event-ID') or request.args.get('ultimo')
+        if ultimo_id:
+            parametros['ultimo'] = ultimo_id
+        
+        destino = f'{endereco_servidor_eventos()}{request.path}'
+        if parametros:
+            destino += f'?{urlencode(parametros)}'
+        return redirect(destino, code=307)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
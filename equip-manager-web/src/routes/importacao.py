@@ -1,18 +1,58 @@
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, current_app, request, jsonify, send_file, url_for
 from src.models.database import (
     db, Equipamento, PontoMedicao, Certificado, Fabricante, 
     TipoEquipamento, Polo, Unidade, ClassificacaoPontoMedicao
 )
-import pandas as pd
+from src.services.jobs import criar_job, consultar_job, retomar_job, JobNaoRetomavel
+from src.services.uploads import hash_upload, resultado_anterior, registrar_arquivo, UploadInvalido
+from src.services.escritas import EscritaNaoConcluida
+from src.services.exportacao import resposta_exportacao, FormatoInvalido
+from src.services.consultas import orcamento_consultas, consultas_em_lote
 import io
 import os
 from datetime import datetime
 
 importacao_bp = Blueprint('importacao', __name__)
 
+def importacao_assincrona():
+    """Se a requisição pediu processamento em segundo plano (?assincrono=true)"""
+    return request.args.get('assincrono', '').lower() == 'true'
+
+def reimportacao_forcada():
+    """Se a requisição pediu para processar um arquivo já importado (?forcar=true)"""
+    return request.args.get('forcar', '').lower() == 'true'
+
+def resposta_importacao(prefixo, resultado):
+    """Resposta com o relatório da importação (ou o guardado de um envio anterior do arquivo)"""
+    resposta = {
+        'message': f'Importação concluída',
+        f'{prefixo}_importados': resultado['importados'],
+        f'{prefixo}_inseridos': resultado['inseridos'],
+        f'{prefixo}_atualizados': resultado['atualizados'],
+        f'{prefixo}_inalterados': resultado['inalterados'],
+        f'{prefixo}_erro': resultado['erro'],
+        'erros': resultado['erros'][:10]  # Limitar a 10 erros para não sobrecarregar a resposta
+    }
+    if 'arquivos' in resultado:
+        resposta['arquivos'] = resultado['arquivos']
+    if 'importado_em' in resultado:
+        resposta['message'] = 'Arquivo já importado: resultado anterior (use ?forcar=true para reimportar)'
+        resposta['duplicado'] = True
+        resposta['importado_em'] = resultado['importado_em']
+    return jsonify(resposta)
+
+def resposta_job(job_id):
+    """Resposta 202 com o id do job agendado"""
+    return jsonify({
+        'message': 'Importação agendada',
+        'job_id': job_id,
+        'status_url': url_for('importacao.status_job', job_id=job_id)
+    }), 202
+
 @importacao_bp.route('/equipamentos', methods=['POST'])
+@consultas_em_lote
 def importar_equipamentos():
-    """Importar equipamentos de arquivo Excel"""
+    """Importar equipamentos de arquivo Excel (?modo=insert, skip ou upsert; ?forcar=true reprocessa um arquivo já importado)"""
     try:
         if 'file' not in request.files:
             return jsonify({'error': 'Nenhum arquivo enviado'}), 400
@@ -21,124 +61,43 @@ def importar_equipamentos():
         if file.filename == '':
             return jsonify({'error': 'Nenhum arquivo selecionado'}), 400
         
-        if not file.filename.endswith(('.xlsx', '.xls')):
-            return jsonify({'error': 'Formato de arquivo não suportado. Use .xlsx ou .xls'}), 400
+        if not file.filename.lower().endswith(('.xlsx', '.xls', '.csv')):
+            return jsonify({'error': 'Formato de arquivo não suportado. Use .xlsx, .xls ou .csv'}), 400
         
-        # Ler arquivo Excel
-        df = pd.read_excel(file)
+        # Ler em partes, validar e gravar cada parte pela fila de escritas (pandas só é carregado na primeira importação)
+        from src.services.importador import importar_arquivo, MODOS_IMPORTACAO, MODO_PADRAO
+        modo = request.args.get('modo', MODO_PADRAO).lower()
+        if modo not in MODOS_IMPORTACAO:
+            return jsonify({'error': 'Modo de importação inválido. Use insert, skip ou upsert'}), 400
         
-        # Mapear colunas esperadas
-        colunas_esperadas = {
-            'numero_serie': ['número de série', 'numero_serie', 'serial_number'],
-            'tag_equipamento': ['tag equipamento', 'tag_equipamento', 'tag'],
-            'nome_equipamento': ['nome equipamento', 'nome_equipamento', 'equipment_name'],
-            'fabricante': ['fabricante', 'marca', 'manufacturer'],
-            'modelo': ['modelo', 'model'],
-            'tipo_equipamento': ['tipo equipamento', 'tipo_equipamento', 'equipment_type']
-        }
+        # Reenvio de um arquivo já importado: devolver o resultado guardado sem ler a planilha
+        hash_arquivo = hash_upload(file)
+        if not reimportacao_forcada():
+            anterior = resultado_anterior(hash_arquivo, 'equipamentos', modo)
+            if anterior is not None:
+                return resposta_importacao('equipamentos', anterior)
         
-        # Normalizar nomes das colunas
-        df.columns = df.columns.str.lower().str.strip()
+        # Processar em segundo plano, se solicitado
+        if importacao_assincrona():
+            return resposta_job(criar_job('equipamentos', file, modo, hash_arquivo))
         
-        equipamentos_importados = 0
-        equipamentos_erro = 0
-        erros = []
+        resultado = importar_arquivo('equipamentos', file.stream, file.filename, modo)
+        registrar_arquivo(hash_arquivo, 'equipamentos', modo, file.filename, resultado)
         
-        for index, row in df.iterrows():
-            try:
-                # Extrair dados da linha
-                numero_serie = None
-                for col_name in colunas_esperadas['numero_serie']:
-                    if col_name in df.columns:
-                        numero_serie = str(row[col_name]).strip()
-                        break
-                
-                if not numero_serie or numero_serie == 'nan':
-                    erros.append(f'Linha {index + 2}: Número de série obrigatório')
-                    equipamentos_erro += 1
-                    continue
-                
-                # Verificar se equipamento já existe
-                if Equipamento.query.filter_by(numero_serie=numero_serie).first():
-                    erros.append(f'Linha {index + 2}: Equipamento {numero_serie} já existe')
-                    equipamentos_erro += 1
-                    continue
-                
-                # Extrair outros dados
-                tag_equipamento = None
-                for col_name in colunas_esperadas['tag_equipamento']:
-                    if col_name in df.columns:
-                        tag_equipamento = str(row[col_name]).strip() if pd.notna(row[col_name]) else None
-                        break
-                
-                nome_equipamento = None
-                for col_name in colunas_esperadas['nome_equipamento']:
-                    if col_name in df.columns:
-                        nome_equipamento = str(row[col_name]).strip() if pd.notna(row[col_name]) else None
-                        break
-                
-                if not nome_equipamento:
-                    nome_equipamento = f'Equipamento {numero_serie}'
-                
-                # Buscar ou criar fabricante
-                fabricante_id = None
-                for col_name in colunas_esperadas['fabricante']:
-                    if col_name in df.columns and pd.notna(row[col_name]):
-                        fabricante_nome = str(row[col_name]).strip()
-                        fabricante = Fabricante.query.filter_by(nome=fabricante_nome).first()
-                        if not fabricante:
-                            fabricante = Fabricante(nome=fabricante_nome)
-                            db.session.add(fabricante)
-                            db.session.flush()
-                        fabricante_id = fabricante.id
-                        break
-                
-                # Buscar ou criar tipo de equipamento
-                tipo_equipamento_id = None
-                for col_name in colunas_esperadas['tipo_equipamento']:
-                    if col_name in df.columns and pd.notna(row[col_name]):
-                        tipo_nome = str(row[col_name]).strip()
-                        tipo = TipoEquipamento.query.filter_by(nome=tipo_nome).first()
-                        if not tipo:
-                            tipo = TipoEquipamento(nome=tipo_nome)
-                            db.session.add(tipo)
-                            db.session.flush()
-                        tipo_equipamento_id = tipo.id
-                        break
-                
-                # Criar equipamento
-                equipamento = Equipamento(
-                    numero_serie=numero_serie,
-                    tag_equipamento=tag_equipamento,
-                    nome_equipamento=nome_equipamento,
-                    fabricante_id=fabricante_id,
-                    tipo_equipamento_id=tipo_equipamento_id
-                )
-                
-                db.session.add(equipamento)
-                equipamentos_importados += 1
-                
-            except Exception as e:
-                erros.append(f'Linha {index + 2}: {str(e)}')
-                equipamentos_erro += 1
-        
-        # Commit das alterações
-        db.session.commit()
-        
-        return jsonify({
-            'message': f'Importação concluída',
-            'equipamentos_importados': equipamentos_importados,
-            'equipamentos_erro': equipamentos_erro,
-            'erros': erros[:10]  # Limitar a 10 erros para não sobrecarregar a resposta
-        })
+        return resposta_importacao('equipamentos', resultado)
     
+    except UploadInvalido as e:
+        return jsonify({'error': str(e)}), 400
+    except EscritaNaoConcluida as e:
+        return jsonify({'error': str(e), 'status': e.status}), 503
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': f'Erro na importação: {str(e)}'}), 500
 
 @importacao_bp.route('/pontos-medicao', methods=['POST'])
+@consultas_em_lote
 def importar_pontos_medicao():
-    """Importar pontos de medição de arquivo Excel"""
+    """Importar pontos de medição de arquivo Excel (?modo=insert, skip ou upsert; ?forcar=true reprocessa um arquivo já importado)"""
     try:
         if 'file' not in request.files:
             return jsonify({'error': 'Nenhum arquivo enviado'}), 400
@@ -147,204 +106,147 @@ def importar_pontos_medicao():
         if file.filename == '':
             return jsonify({'error': 'Nenhum arquivo selecionado'}), 400
         
-        if not file.filename.endswith(('.xlsx', '.xls')):
-            return jsonify({'error': 'Formato de arquivo não suportado. Use .xlsx ou .xls'}), 400
-        
-        # Ler arquivo Excel
-        df = pd.read_excel(file)
+        if not file.filename.lower().endswith(('.xlsx', '.xls', '.csv')):
+            return jsonify({'error': 'Formato de arquivo não suportado. Use .xlsx, .xls ou .csv'}), 400
         
-        # Normalizar nomes das colunas
-        df.columns = df.columns.str.lower().str.strip()
+        # Ler em partes, validar e gravar cada parte pela fila de escritas (pandas só é carregado na primeira importação)
+        from src.services.importador import importar_arquivo, MODOS_IMPORTACAO, MODO_PADRAO
+        modo = request.args.get('modo', MODO_PADRAO).lower()
+        if modo not in MODOS_IMPORTACAO:
+            return jsonify({'error': 'Modo de importação inválido. Use insert, skip ou upsert'}), 400
         
-        pontos_importados = 0
-        pontos_erro = 0
-        erros = []
+        # Reenvio de um arquivo já importado: devolver o resultado guardado sem ler a planilha
+        hash_arquivo = hash_upload(file)
+        if not reimportacao_forcada():
+            anterior = resultado_anterior(hash_arquivo, 'pontos_medicao', modo)
+            if anterior is not None:
+                return resposta_importacao('pontos', anterior)
         
-        for index, row in df.iterrows():
-            try:
-                # Extrair dados obrigatórios
-                tag_ponto = str(row.get('tag_ponto_medicao', '')).strip()
-                nome_ponto = str(row.get('nome_ponto_medicao', '')).strip()
-                
-                if not tag_ponto or tag_ponto == 'nan':
-                    erros.append(f'Linha {index + 2}: TAG do ponto obrigatória')
-                    pontos_erro += 1
-                    continue
-                
-                if not nome_ponto or nome_ponto == 'nan':
-                    nome_ponto = f'Ponto {tag_ponto}'
-                
-                # Verificar se ponto já existe
-                if PontoMedicao.query.filter_by(tag_ponto_medicao=tag_ponto).first():
-                    erros.append(f'Linha {index + 2}: Ponto {tag_ponto} já existe')
-                    pontos_erro += 1
-                    continue
-                
-                # Buscar polo
-                polo_id = None
-                if 'polo' in df.columns and pd.notna(row['polo']):
-                    polo_nome = str(row['polo']).strip()
-                    polo = Polo.query.filter_by(nome=polo_nome).first()
-                    if not polo:
-                        polo = Polo(nome=polo_nome)
-                        db.session.add(polo)
-                        db.session.flush()
-                    polo_id = polo.id
-                
-                # Buscar classificação
-                classificacao_id = None
-                if 'classificacao' in df.columns and pd.notna(row['classificacao']):
-                    classificacao_nome = str(row['classificacao']).strip()
-                    classificacao = ClassificacaoPontoMedicao.query.filter_by(nome=classificacao_nome).first()
-                    if not classificacao:
-                        classificacao = ClassificacaoPontoMedicao(nome=classificacao_nome)
-                        db.session.add(classificacao)
-                        db.session.flush()
-                    classificacao_id = classificacao.id
-                
-                # Extrair número de série do equipamento
-                numero_serie_equipamento = None
-                if 'numero_serie_equipamento' in df.columns and pd.notna(row['numero_serie_equipamento']):
-                    numero_serie_equipamento = str(row['numero_serie_equipamento']).strip()
-                
-                # Criar ponto de medição
-                ponto = PontoMedicao(
-                    tag_ponto_medicao=tag_ponto,
-                    nome_ponto_medicao=nome_ponto,
-                    polo_id=polo_id,
-                    classificacao_id=classificacao_id,
-                    numero_serie_equipamento=numero_serie_equipamento,
-                    data_ultima_calibracao=str(row.get('data_ultima_calibracao', '')) if pd.notna(row.get('data_ultima_calibracao')) else None,
-                    data_proxima_calibracao=str(row.get('data_proxima_calibracao', '')) if pd.notna(row.get('data_proxima_calibracao')) else None,
-                    frequencia_calibracao_anp=int(row.get('frequencia_calibracao_anp', 0)) if pd.notna(row.get('frequencia_calibracao_anp')) else None
-                )
-                
-                db.session.add(ponto)
-                pontos_importados += 1
-                
-            except Exception as e:
-                erros.append(f'Linha {index + 2}: {str(e)}')
-                pontos_erro += 1
+        # Processar em segundo plano, se solicitado
+        if importacao_assincrona():
+            return resposta_job(criar_job('pontos_medicao', file, modo, hash_arquivo))
         
-        # Commit das alterações
-        db.session.commit()
+        resultado = importar_arquivo('pontos_medicao', file.stream, file.filename, modo)
+        registrar_arquivo(hash_arquivo, 'pontos_medicao', modo, file.filename, resultado)
         
-        return jsonify({
-            'message': f'Importação concluída',
-            'pontos_importados': pontos_importados,
-            'pontos_erro': pontos_erro,
-            'erros': erros[:10]
-        })
+        return resposta_importacao('pontos', resultado)
     
+    except UploadInvalido as e:
+        return jsonify({'error': str(e)}), 400
+    except EscritaNaoConcluida as e:
+        return jsonify({'error': str(e), 'status': e.status}), 503
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': f'Erro na importação: {str(e)}'}), 500
 
-@importacao_bp.route('/exportar-equipamentos', methods=['GET'])
-def exportar_equipamentos():
-    """Exportar equipamentos para arquivo Excel"""
+def importacao_em_lote(tipo, prefixo):
+    """Importar as planilhas enviadas em 'files' (ou 'file'), soltas ou em ZIP, em uma única gravação"""
     try:
-        # Buscar todos os equipamentos
-        equipamentos = db.session.query(
-            Equipamento.numero_serie,
-            Equipamento.tag_equipamento,
-            Equipamento.nome_equipamento,
-            Fabricante.nome.label('fabricante'),
-            TipoEquipamento.nome.label('tipo_equipamento'),
-            Unidade.nome.label('unidade'),
-            Equipamento.resolucao,
-            Equipamento.faixa_minima_equipamento,
-            Equipamento.faixa_maxima_equipamento
-        ).outerjoin(Fabricante, Equipamento.fabricante_id == Fabricante.id)\
-         .outerjoin(TipoEquipamento, Equipamento.tipo_equipamento_id == TipoEquipamento.id)\
-         .outerjoin(Unidade, Equipamento.unidade_id == Unidade.id).all()
+        arquivos = [
+            arquivo for arquivo in request.files.getlist('files') + request.files.getlist('file')
+            if arquivo.filename
+        ]
+        if not arquivos:
+            return jsonify({'error': 'Nenhum arquivo enviado'}), 400
         
-        # Converter para DataFrame
-        df = pd.DataFrame([{
-            'Número de Série': eq.numero_serie,
-            'TAG Equipamento': eq.tag_equipamento,
-            'Nome Equipamento': eq.nome_equipamento,
-            'Fabricante': eq.fabricante,
-            'Tipo Equipamento': eq.tipo_equipamento,
-            'Unidade': eq.unidade,
-            'Resolução': eq.resolucao,
-            'Faixa Mínima': eq.faixa_minima_equipamento,
-            'Faixa Máxima': eq.faixa_maxima_equipamento
-        } for eq in equipamentos])
+        if not all(arquivo.filename.lower().endswith(('.xlsx', '.xls', '.csv', '.zip')) for arquivo in arquivos):
+            return jsonify({'error': 'Formato de arquivo não suportado. Use .xlsx, .xls, .csv ou .zip'}), 400
         
-        # Criar arquivo Excel em memória
-        output = io.BytesIO()
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            df.to_excel(writer, sheet_name='Equipamentos', index=False)
-        output.seek(0)
+        from src.services.importador import MODOS_IMPORTACAO, MODO_PADRAO
+        from src.services.importacao_lote import importar_lote
+        modo = request.args.get('modo', MODO_PADRAO).lower()
+        if modo not in MODOS_IMPORTACAO:
+            return jsonify({'error': 'Modo de importação inválido. Use insert, skip ou upsert'}), 400
         
-        # Gerar nome do arquivo com timestamp
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f'equipamentos_{timestamp}.xlsx'
+        resultado = importar_lote(tipo, arquivos, modo, current_app.config['PROCESSOS_IMPORTACAO'])
+        return resposta_importacao(prefixo, resultado)
+    
+    except UploadInvalido as e:
+        return jsonify({'error': str(e)}), 400
+    except EscritaNaoConcluida as e:
+        return jsonify({'error': str(e), 'status': e.status}), 503
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Erro na importação: {str(e)}'}), 500
+
+@importacao_bp.route('/equipamentos/lote', methods=['POST'])
+@consultas_em_lote
+def importar_equipamentos_lote():
+    """Importar equipamentos de várias planilhas ou de um ZIP, lidas em paralelo (?modo=insert, skip ou upsert)"""
+    return importacao_em_lote('equipamentos', 'equipamentos')
+
+@importacao_bp.route('/pontos-medicao/lote', methods=['POST'])
+@consultas_em_lote
+def importar_pontos_medicao_lote():
+    """Importar pontos de medição de várias planilhas ou de um ZIP (um por polo, por exemplo), lidas em paralelo"""
+    return importacao_em_lote('pontos_medicao', 'pontos')
+
+@importacao_bp.route('/jobs/<job_id>', methods=['GET'])
+@orcamento_consultas(2)
+def status_job(job_id):
+    """Obter progresso ou resumo final de um job de importação"""
+    try:
+        job = consultar_job(job_id)
         
-        return send_file(
-            output,
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-            as_attachment=True,
-            download_name=filename
-        )
+        if job is None:
+            return jsonify({'error': 'Job de importação não encontrado'}), 404
+        
+        return jsonify(job)
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@importacao_bp.route('/jobs/<job_id>/retomar', methods=['POST'])
+@orcamento_consultas(3)
+def retomar_job_importacao(job_id):
+    """Retomar um job de importação que terminou em erro ou foi interrompido, depois da última parte gravada"""
+    try:
+        if retomar_job(job_id) is None:
+            return jsonify({'error': 'Job de importação não encontrado'}), 404
+        
+        return resposta_job(job_id)
+    
+    except JobNaoRetomavel as e:
+        return jsonify({'error': str(e)}), 409
+    except EscritaNaoConcluida as e:
+        return jsonify({'error': str(e), 'status': e.status}), 503
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@importacao_bp.route('/exportar-equipamentos', methods=['GET'])
+@orcamento_consultas(1)
+def exportar_equipamentos():
+    """Exportar equipamentos (?formato=xlsx, csv ou jsonl)"""
+    try:
+        formato = request.args.get('formato', 'xlsx').lower()
+        return resposta_exportacao('equipamentos', formato)
     
+    except FormatoInvalido as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': f'Erro na exportação: {str(e)}'}), 500
 
 @importacao_bp.route('/exportar-pontos-medicao', methods=['GET'])
+@orcamento_consultas(1)
 def exportar_pontos_medicao():
-    """Exportar pontos de medição para arquivo Excel"""
+    """Exportar pontos de medição (?formato=xlsx, csv ou jsonl)"""
     try:
-        # Buscar todos os pontos de medição
-        pontos = db.session.query(
-            PontoMedicao.tag_ponto_medicao,
-            PontoMedicao.nome_ponto_medicao,
-            Polo.nome.label('polo'),
-            ClassificacaoPontoMedicao.nome.label('classificacao'),
-            PontoMedicao.numero_serie_equipamento,
-            PontoMedicao.data_ultima_calibracao,
-            PontoMedicao.data_proxima_calibracao,
-            PontoMedicao.frequencia_calibracao_anp
-        ).outerjoin(Polo, PontoMedicao.polo_id == Polo.id)\
-         .outerjoin(ClassificacaoPontoMedicao, PontoMedicao.classificacao_id == ClassificacaoPontoMedicao.id).all()
-        
-        # Converter para DataFrame
-        df = pd.DataFrame([{
-            'TAG Ponto Medição': ponto.tag_ponto_medicao,
-            'Nome Ponto Medição': ponto.nome_ponto_medicao,
-            'Polo': ponto.polo,
-            'Classificação': ponto.classificacao,
-            'Número Série Equipamento': ponto.numero_serie_equipamento,
-            'Data Última Calibração': ponto.data_ultima_calibracao,
-            'Data Próxima Calibração': ponto.data_proxima_calibracao,
-            'Frequência Calibração ANP (dias)': ponto.frequencia_calibracao_anp
-        } for ponto in pontos])
-        
-        # Criar arquivo Excel em memória
-        output = io.BytesIO()
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            df.to_excel(writer, sheet_name='Pontos de Medição', index=False)
-        output.seek(0)
-        
-        # Gerar nome do arquivo com timestamp
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f'pontos_medicao_{timestamp}.xlsx'
-        
-        return send_file(
-            output,
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-            as_attachment=True,
-            download_name=filename
-        )
+        formato = request.args.get('formato', 'xlsx').lower()
+        return resposta_exportacao('pontos_medicao', formato)
     
+    except FormatoInvalido as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': f'Erro na exportação: {str(e)}'}), 500
 
 @importacao_bp.route('/template-equipamentos', methods=['GET'])
+@orcamento_consultas(1)
 def template_equipamentos():
     """Gerar template Excel para importação de equipamentos"""
     try:
+        import pandas as pd
+        
         # Criar DataFrame com colunas de exemplo
         df = pd.DataFrame({
             'numero_serie': ['EQ001', 'EQ002'],
@@ -374,9 +276,12 @@ def template_equipamentos():
         return jsonify({'error': f'Erro ao gerar template: {str(e)}'}), 500
 
 @importacao_bp.route('/template-pontos-medicao', methods=['GET'])
+@orcamento_consultas(1)
 def template_pontos_medicao():
     """Gerar template Excel para importação de pontos de medição"""
     try:
+        import pandas as pd
+        
         # Criar DataFrame com colunas de exemplo
         df = pd.DataFrame({
             'tag_ponto_medicao': ['PM001', 'PM002'],
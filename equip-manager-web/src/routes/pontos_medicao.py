@@ -1,32 +1,67 @@
 from flask import Blueprint, request, jsonify
-from src.models.database import db, PontoMedicao, Polo, ClassificacaoPontoMedicao, Equipamento
-from sqlalchemy import or_
-from datetime import datetime, timedelta
+from src.models.database import (
+    db, PontoMedicao, Polo, ClassificacaoPontoMedicao, Equipamento, AnaliseQuimica,
+    EventoCronogramaTeste, EventoCronogramaAnalise, normalizar_datas, existem_dependentes
+)
+from src.services.serializadores import (
+    consulta_pontos_medicao, consulta_pontos_alerta, para_dict, para_dicts
+)
+from src.services.paginacao import paginar, CursorInvalido
+from src.services.busca import filtrar_busca
+from src.services.calibracao import (
+    expressao_status, filtrar_status, contagem_por_status, StatusInvalido
+)
+from src.services.consultas import orcamento_consultas
+from src.services.escritas import executar_escrita, inserir, alterar, remover, EscritaNaoConcluida
+from datetime import datetime, timedelta, date
 
 pontos_medicao_bp = Blueprint('pontos_medicao', __name__)
 
+# Chave estável de ordenação para paginação por cursor
+CHAVES_CURSOR = [('id', PontoMedicao.id, False)]
+
+# Ordenações aceitas em ?sort= (prefixo '-' para decrescente)
+ORDENACOES = {
+    'dias_restantes': PontoMedicao.data_proxima_calibracao
+}
+
+CAMPOS_DATA = (
+    'data_ultima_calibracao', 'data_proxima_calibracao',
+    'data_retirada', 'data_recebimento_uso'
+)
+
+# Campos alteráveis pelo PUT
+CAMPOS_EDITAVEIS = (
+    'polo_id', 'nome_ponto_medicao', 'tag_ponto_medicao', 'classificacao_id',
+    'numero_serie_equipamento', 'certificado_calibracao_vigente', 'data_ultima_calibracao',
+    'data_proxima_calibracao', 'frequencia_calibracao_anp', 'data_retirada',
+    'data_recebimento_uso', 'controle_vencimento', 'solicitacao_calibracao'
+)
+
 @pontos_medicao_bp.route('/', methods=['GET'])
+@orcamento_consultas(4)
 def listar_pontos_medicao():
     """Listar todos os pontos de medição com filtros opcionais"""
     try:
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 20, type=int)
         search = request.args.get('search', '')
         polo_id = request.args.get('polo_id', type=int)
         classificacao_id = request.args.get('classificacao_id', type=int)
         vencimento_proximo = request.args.get('vencimento_proximo', type=bool)
+        status = request.args.get('status', '')
+        sort = request.args.get('sort', '')
         
-        query = PontoMedicao.query
+        data_hoje = date.today()
+        query = consulta_pontos_medicao().add_columns(
+            expressao_status(data_hoje).label('status_calibracao')
+        )
         
         # Aplicar filtros
         if search:
-            query = query.filter(
-                or_(
-                    PontoMedicao.nome_ponto_medicao.contains(search),
-                    PontoMedicao.tag_ponto_medicao.contains(search),
-                    PontoMedicao.numero_serie_equipamento.contains(search)
-                )
-            )
+            query = filtrar_busca(query, 'pontos_medicao', search, [
+                PontoMedicao.nome_ponto_medicao,
+                PontoMedicao.tag_ponto_medicao,
+                PontoMedicao.numero_serie_equipamento
+            ])
         
         if polo_id:
             query = query.filter(PontoMedicao.polo_id == polo_id)
@@ -36,64 +71,71 @@ def listar_pontos_medicao():
         
         # Filtro para calibrações próximas do vencimento (próximos 30 dias)
         if vencimento_proximo:
-            data_limite = (datetime.now() + timedelta(days=30)).strftime('%Y-%m-%d')
+            data_limite = data_hoje + timedelta(days=30)
             query = query.filter(
                 PontoMedicao.data_proxima_calibracao.isnot(None),
                 PontoMedicao.data_proxima_calibracao <= data_limite
             )
         
-        # Paginação
-        pontos_paginados = query.paginate(
-            page=page, per_page=per_page, error_out=False
-        )
+        # Contagem por status com os demais filtros, antes do filtro de status;
+        # no modo cursor só com count=true, para as páginas seguintes não refazerem a agregação
+        contagem = None
+        parametro_contagem = request.args.get('count', '').lower()
+        if parametro_contagem == 'true' or (
+            'cursor' not in request.args and parametro_contagem != 'false'
+        ):
+            contagem = contagem_por_status(query, data_hoje)
         
-        pontos = []
-        for ponto in pontos_paginados.items:
-            # Calcular status de calibração
-            status_calibracao = calcular_status_calibracao(ponto.data_proxima_calibracao)
-            
-            ponto_data = {
-                'id': ponto.id,
-                'nome_ponto_medicao': ponto.nome_ponto_medicao,
-                'tag_ponto_medicao': ponto.tag_ponto_medicao,
-                'polo': ponto.polo.nome if ponto.polo else None,
-                'classificacao': ponto.classificacao.nome if ponto.classificacao else None,
-                'numero_serie_equipamento': ponto.numero_serie_equipamento,
-                'equipamento_nome': ponto.equipamento.nome_equipamento if ponto.equipamento else None,
-                'certificado_calibracao_vigente': ponto.certificado_calibracao_vigente,
-                'data_ultima_calibracao': ponto.data_ultima_calibracao,
-                'data_proxima_calibracao': ponto.data_proxima_calibracao,
-                'frequencia_calibracao_anp': ponto.frequencia_calibracao_anp,
-                'data_retirada': ponto.data_retirada,
-                'data_recebimento_uso': ponto.data_recebimento_uso,
-                'controle_vencimento': ponto.controle_vencimento,
-                'solicitacao_calibracao': ponto.solicitacao_calibracao,
-                'status_calibracao': status_calibracao
-            }
-            pontos.append(ponto_data)
+        if status:
+            query = filtrar_status(query, status, data_hoje)
         
-        return jsonify({
-            'pontos_medicao': pontos,
-            'total': pontos_paginados.total,
-            'pages': pontos_paginados.pages,
-            'current_page': page,
-            'per_page': per_page
-        })
+        if sort:
+            coluna = ORDENACOES.get(sort.lstrip('-'))
+            if coluna is None:
+                return jsonify({'error': f'Ordenação inválida: {sort}'}), 400
+            if 'cursor' in request.args:
+                return jsonify({'error': 'Ordenação não suportada na paginação por cursor'}), 400
+            ordem = coluna.desc() if sort.startswith('-') else coluna.asc()
+            query = query.order_by(None).order_by(ordem.nulls_last(), PontoMedicao.id)
+        
+        # Paginação (offset ou cursor)
+        pagina = paginar(query, CHAVES_CURSOR, 'pontos_medicao')
+        pontos = para_dicts(pagina.pop('itens'))
+        for ponto in pontos:
+            ponto['dias_restantes'] = calcular_dias_restantes(ponto['data_proxima_calibracao'])
+        
+        resposta = {'pontos_medicao': pontos, **pagina}
+        if contagem is not None:
+            resposta['contagem_status'] = contagem
+        
+        return jsonify(resposta)
     
+    except (CursorInvalido, StatusInvalido) as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @pontos_medicao_bp.route('/', methods=['POST'])
+@orcamento_consultas(5)
 def criar_ponto_medicao():
     """Criar um novo ponto de medição"""
     try:
         data = request.get_json()
         
+        erro_data = normalizar_datas(data, CAMPOS_DATA)
+        if erro_data:
+            return jsonify({'error': erro_data}), 400
+        
         # Verificar se a TAG já existe
         if PontoMedicao.query.filter_by(tag_ponto_medicao=data['tag_ponto_medicao']).first():
             return jsonify({'error': 'TAG do ponto de medição já existe'}), 400
         
-        ponto = PontoMedicao(
+        # Verificar se o equipamento associado existe (chave estrangeira)
+        numero_serie = data.get('numero_serie_equipamento')
+        if numero_serie and db.session.get(Equipamento, numero_serie) is None:
+            return jsonify({'error': 'Equipamento não encontrado'}), 400
+        
+        campos = dict(
             polo_id=data.get('polo_id'),
             nome_ponto_medicao=data['nome_ponto_medicao'],
             tag_ponto_medicao=data['tag_ponto_medicao'],
@@ -109,43 +151,30 @@ def criar_ponto_medicao():
             solicitacao_calibracao=data.get('solicitacao_calibracao')
         )
         
-        db.session.add(ponto)
-        db.session.commit()
+        ponto_id = executar_escrita(inserir, PontoMedicao, campos)
         
-        return jsonify({'message': 'Ponto de medição criado com sucesso', 'id': ponto.id}), 201
+        return jsonify({'message': 'Ponto de medição criado com sucesso', 'id': ponto_id}), 201
     
+    except EscritaNaoConcluida as e:
+        return jsonify({'error': str(e), 'status': e.status}), 503
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 @pontos_medicao_bp.route('/<int:ponto_id>', methods=['GET'])
+@orcamento_consultas(2)
 def obter_ponto_medicao(ponto_id):
     """Obter um ponto de medição específico"""
     try:
-        ponto = PontoMedicao.query.get_or_404(ponto_id)
+        ponto = consulta_pontos_medicao(detalhe=True).add_columns(
+            expressao_status().label('status_calibracao')
+        ).filter(PontoMedicao.id == ponto_id).first()
+        
+        if ponto is None:
+            return jsonify({'error': 'Ponto de medição não encontrado'}), 404
         
-        status_calibracao = calcular_status_calibracao(ponto.data_proxima_calibracao)
-        
-        ponto_data = {
-            'id': ponto.id,
-            'polo_id': ponto.polo_id,
-            'polo': ponto.polo.nome if ponto.polo else None,
-            'nome_ponto_medicao': ponto.nome_ponto_medicao,
-            'tag_ponto_medicao': ponto.tag_ponto_medicao,
-            'classificacao_id': ponto.classificacao_id,
-            'classificacao': ponto.classificacao.nome if ponto.classificacao else None,
-            'numero_serie_equipamento': ponto.numero_serie_equipamento,
-            'equipamento_nome': ponto.equipamento.nome_equipamento if ponto.equipamento else None,
-            'certificado_calibracao_vigente': ponto.certificado_calibracao_vigente,
-            'data_ultima_calibracao': ponto.data_ultima_calibracao,
-            'data_proxima_calibracao': ponto.data_proxima_calibracao,
-            'frequencia_calibracao_anp': ponto.frequencia_calibracao_anp,
-            'data_retirada': ponto.data_retirada,
-            'data_recebimento_uso': ponto.data_recebimento_uso,
-            'controle_vencimento': ponto.controle_vencimento,
-            'solicitacao_calibracao': ponto.solicitacao_calibracao,
-            'status_calibracao': status_calibracao
-        }
+        ponto_data = para_dict(ponto)
+        ponto_data['dias_restantes'] = calcular_dias_restantes(ponto_data['data_proxima_calibracao'])
         
         return jsonify(ponto_data)
     
@@ -153,92 +182,92 @@ def obter_ponto_medicao(ponto_id):
         return jsonify({'error': str(e)}), 500
 
 @pontos_medicao_bp.route('/<int:ponto_id>', methods=['PUT'])
+@orcamento_consultas(4)
 def atualizar_ponto_medicao(ponto_id):
     """Atualizar um ponto de medição existente"""
     try:
         ponto = PontoMedicao.query.get_or_404(ponto_id)
         data = request.get_json()
         
+        erro_data = normalizar_datas(data, CAMPOS_DATA)
+        if erro_data:
+            return jsonify({'error': erro_data}), 400
+        
         # Verificar se a nova TAG já existe (se fornecida e diferente da atual)
         if data.get('tag_ponto_medicao') and data['tag_ponto_medicao'] != ponto.tag_ponto_medicao:
             if PontoMedicao.query.filter_by(tag_ponto_medicao=data['tag_ponto_medicao']).first():
                 return jsonify({'error': 'TAG do ponto de medição já existe'}), 400
         
-        # Atualizar campos
-        ponto.polo_id = data.get('polo_id', ponto.polo_id)
-        ponto.nome_ponto_medicao = data.get('nome_ponto_medicao', ponto.nome_ponto_medicao)
-        ponto.tag_ponto_medicao = data.get('tag_ponto_medicao', ponto.tag_ponto_medicao)
-        ponto.classificacao_id = data.get('classificacao_id', ponto.classificacao_id)
-        ponto.numero_serie_equipamento = data.get('numero_serie_equipamento', ponto.numero_serie_equipamento)
-        ponto.certificado_calibracao_vigente = data.get('certificado_calibracao_vigente', ponto.certificado_calibracao_vigente)
-        ponto.data_ultima_calibracao = data.get('data_ultima_calibracao', ponto.data_ultima_calibracao)
-        ponto.data_proxima_calibracao = data.get('data_proxima_calibracao', ponto.data_proxima_calibracao)
-        ponto.frequencia_calibracao_anp = data.get('frequencia_calibracao_anp', ponto.frequencia_calibracao_anp)
-        ponto.data_retirada = data.get('data_retirada', ponto.data_retirada)
-        ponto.data_recebimento_uso = data.get('data_recebimento_uso', ponto.data_recebimento_uso)
-        ponto.controle_vencimento = data.get('controle_vencimento', ponto.controle_vencimento)
-        ponto.solicitacao_calibracao = data.get('solicitacao_calibracao', ponto.solicitacao_calibracao)
-        
-        db.session.commit()
+        # Verificar se o novo equipamento associado existe (chave estrangeira)
+        numero_serie = data.get('numero_serie_equipamento')
+        if numero_serie and numero_serie != ponto.numero_serie_equipamento:
+            if db.session.get(Equipamento, numero_serie) is None:
+                return jsonify({'error': 'Equipamento não encontrado'}), 400
+        
+        # Atualizar só os campos enviados
+        alteracoes = {campo: data[campo] for campo in CAMPOS_EDITAVEIS if campo in data}
+        executar_escrita(alterar, PontoMedicao, ponto_id, alteracoes)
         
         return jsonify({'message': 'Ponto de medição atualizado com sucesso'})
     
+    except EscritaNaoConcluida as e:
+        return jsonify({'error': str(e), 'status': e.status}), 503
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 @pontos_medicao_bp.route('/<int:ponto_id>', methods=['DELETE'])
+@orcamento_consultas(2)
 def deletar_ponto_medicao(ponto_id):
     """Deletar um ponto de medição"""
     try:
         ponto = PontoMedicao.query.get_or_404(ponto_id)
         
         # Verificar se há dependências (análises químicas, eventos de cronograma, etc.)
-        if ponto.analises_quimicas or ponto.eventos_cronograma_testes or ponto.eventos_cronograma_analises:
+        if existem_dependentes(
+            AnaliseQuimica.tag_ponto_medicao == ponto.tag_ponto_medicao,
+            EventoCronogramaTeste.tag_ponto_medicao == ponto.tag_ponto_medicao,
+            EventoCronogramaAnalise.tag_ponto_medicao == ponto.tag_ponto_medicao
+        ):
             return jsonify({'error': 'Não é possível deletar ponto de medição com dependências'}), 400
         
-        db.session.delete(ponto)
-        db.session.commit()
+        executar_escrita(remover, PontoMedicao, ponto_id)
         
         return jsonify({'message': 'Ponto de medição deletado com sucesso'})
     
+    except EscritaNaoConcluida as e:
+        return jsonify({'error': str(e), 'status': e.status}), 503
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 @pontos_medicao_bp.route('/alertas-calibracao', methods=['GET'])
+@orcamento_consultas(3)
 def alertas_calibracao():
     """Obter pontos de medição com calibração próxima do vencimento"""
     try:
         dias_alerta = request.args.get('dias', 30, type=int)
         
-        data_limite = (datetime.now() + timedelta(days=dias_alerta)).strftime('%Y-%m-%d')
-        data_hoje = datetime.now().strftime('%Y-%m-%d')
+        data_hoje = date.today()
+        data_limite = data_hoje + timedelta(days=dias_alerta)
         
         # Pontos com calibração vencida
-        pontos_vencidos = PontoMedicao.query.filter(
+        pontos_vencidos = consulta_pontos_alerta().filter(
             PontoMedicao.data_proxima_calibracao.isnot(None),
             PontoMedicao.data_proxima_calibracao < data_hoje
         ).all()
         
         # Pontos com calibração próxima do vencimento
-        pontos_proximos = PontoMedicao.query.filter(
+        pontos_proximos = consulta_pontos_alerta().filter(
             PontoMedicao.data_proxima_calibracao.isnot(None),
             PontoMedicao.data_proxima_calibracao >= data_hoje,
             PontoMedicao.data_proxima_calibracao <= data_limite
         ).all()
         
         def formatar_ponto_alerta(ponto):
-            return {
-                'id': ponto.id,
-                'tag_ponto_medicao': ponto.tag_ponto_medicao,
-                'nome_ponto_medicao': ponto.nome_ponto_medicao,
-                'data_proxima_calibracao': ponto.data_proxima_calibracao,
-                'numero_serie_equipamento': ponto.numero_serie_equipamento,
-                'equipamento_nome': ponto.equipamento.nome_equipamento if ponto.equipamento else None,
-                'polo': ponto.polo.nome if ponto.polo else None,
-                'dias_restantes': calcular_dias_restantes(ponto.data_proxima_calibracao)
-            }
+            ponto_data = para_dict(ponto)
+            ponto_data['dias_restantes'] = calcular_dias_restantes(ponto.data_proxima_calibracao)
+            return ponto_data
         
         return jsonify({
             'pontos_vencidos': [formatar_ponto_alerta(p) for p in pontos_vencidos],
@@ -250,33 +279,9 @@ def alertas_calibracao():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-def calcular_status_calibracao(data_proxima_calibracao):
-    """Calcular o status da calibração baseado na data"""
-    if not data_proxima_calibracao:
-        return 'sem_data'
-    
-    try:
-        data_calibracao = datetime.strptime(data_proxima_calibracao, '%Y-%m-%d')
-        data_hoje = datetime.now()
-        
-        if data_calibracao < data_hoje:
-            return 'vencido'
-        elif (data_calibracao - data_hoje).days <= 30:
-            return 'proximo_vencimento'
-        else:
-            return 'vigente'
-    except:
-        return 'data_invalida'
-
 def calcular_dias_restantes(data_proxima_calibracao):
     """Calcular quantos dias restam para a calibração"""
     if not data_proxima_calibracao:
         return None
     
-    try:
-        data_calibracao = datetime.strptime(data_proxima_calibracao, '%Y-%m-%d')
-        data_hoje = datetime.now()
-        return (data_calibracao - data_hoje).days
-    except:
-        return None
-
+    return (data_proxima_calibracao - date.today()).days
@@ -0,0 +1,553 @@
+"""Suíte de benchmark dos endpoints (flask benchmark).
+
+Mede, com o cliente de testes do Flask contra o banco configurado, a
+latência (p50/p95/máx.), os comandos SQL e os bytes de resposta de:
+
+- todas as rotas GET dos blueprints, com variações de busca, filtro,
+  ordenação e paginação nas listagens;
+- um ciclo criar/alterar/excluir de equipamentos, pontos de medição,
+  certificados e fabricantes (as linhas criadas são removidas);
+- importação de planilhas grandes (equipamentos e pontos de medição,
+  apagados ao final) e exportação em todos os formatos;
+- vazão de leituras em threads paralelas, sem escrita e durante uma
+  importação grande (com WAL os leitores não devem falhar com
+  "database is locked" nem esperar o fim da importação), e de criações
+  simultâneas de equipamentos (commit em grupo da fila de escritas).
+
+O resultado é um dicionário serializável em JSON, para guardar cada
+execução e compará-las ao longo do tempo (comparar()). Como a suíte grava
+no banco, rode-a numa cópia preenchida com flask gerar-dados.
+"""
+import io
+import platform
+import sqlite3
+import threading
+import time
+from datetime import date, datetime
+from flask import url_for
+from sqlalchemy import event, func, select, text
+from src.models.database import (
+    db, Equipamento, PontoMedicao, Certificado, Fabricante, TipoEquipamento,
+    Unidade, Polo, ClassificacaoPontoMedicao, StatusCertificadoIncerteza,
+    CriterioAceitacao, JobImportacao, TABELAS_CONTADAS
+)
+from src.services.exportacao import FORMATOS
+
+REPETICOES_PADRAO = 20
+LINHAS_IMPORTACAO_PADRAO = 10_000
+REPETICOES_EXPORTACAO = 3
+LEITORES_PADRAO = 4
+
+# Duração (s) da medição de leituras paralelas sem escrita
+DURACAO_LEITURA_BASE = 2.0
+
+# Criações de equipamento por thread na medição de escritas paralelas
+ESCRITAS_POR_THREAD = 200
+
+PREFIXO_BENCHMARK = 'BENCH'
+
+# Endpoints fora da medição de leitura (fluxo contínuo ou medidos à parte)
+ENDPOINTS_IGNORADOS = {
+    'static', 'static_files', 'index', 'metrics', 'eventos.stream',
+    'importacao.exportar_equipamentos', 'importacao.exportar_pontos_medicao'
+}
+
+# Variações de parâmetros medidas além da chamada sem parâmetros
+VARIANTES = {
+    'equipamentos.listar_equipamentos': [
+        {'search': 'sintetico'}, {'page': 50}, {'per_page': 100}
+    ],
+    'pontos_medicao.listar_pontos_medicao': [
+        {'search': 'SIN'}, {'status': 'vencido'}, {'sort': 'dias_restantes'},
+        {'page': 50}, {'per_page': 100}
+    ],
+    'certificados.listar_certificados': [
+        {'search': 'SIN'}, {'page': 50}, {'per_page': 100}
+    ],
+    'dashboard.pontos_criticos': [{'dias': 90}],
+    'dashboard.bundle': [{'dias': 90}]
+}
+
+# Rotas lidas em paralelo na medição de concorrência
+ROTAS_CONCORRENCIA = (
+    'pontos_medicao.listar_pontos_medicao', 'equipamentos.listar_equipamentos',
+    'certificados.listar_certificados', 'dashboard.resumo_geral'
+)
+
+# Endpoint de exportação por tipo
+EXPORTACOES = {
+    'equipamentos': 'importacao.exportar_equipamentos',
+    'pontos_medicao': 'importacao.exportar_pontos_medicao'
+}
+
+def percentil(valores, fracao):
+    """Percentil pelo método do posto mais próximo"""
+    ordenados = sorted(valores)
+    posicao = max(0, min(len(ordenados) - 1, round(fracao * len(ordenados) + 0.5) - 1))
+    return ordenados[posicao]
+
+class ContadorConsultas:
+    """Conta os comandos SQL executados enquanto está instalado no engine"""
+    
+    def __init__(self):
+        self.total = 0
+    
+    def __call__(self, *args, **kwargs):
+        self.total += 1
+    
+    def __enter__(self):
+        event.listen(db.engine, 'before_cursor_execute', self)
+        return self
+    
+    def __exit__(self, *exc):
+        event.remove(db.engine, 'before_cursor_execute', self)
+
+def medir(cliente, contador, nome, metodo, caminho, repeticoes, corpo=None, ao_responder=None, url=None):
+    """Executar a requisição 'repeticoes' vezes e resumir tempo, consultas e bytes.
+    
+    corpo(i) devolve os kwargs da i-ésima requisição (json, data), url(i) o
+    endereço quando ele muda a cada execução e ao_responder(resposta, i)
+    recebe cada resposta.
+    """
+    tempos = []
+    consultas = []
+    tamanhos = []
+    status = None
+    for repeticao in range(repeticoes):
+        argumentos = corpo(repeticao) if corpo else {}
+        endereco = url(repeticao) if url else caminho
+        contador.total = 0
+        inicio = time.perf_counter()
+        resposta = cliente.open(endereco, method=metodo, **argumentos)
+        conteudo = resposta.get_data()
+        resposta.close()
+        tempos.append(time.perf_counter() - inicio)
+        consultas.append(contador.total)
+        tamanhos.append(len(conteudo))
+        status = resposta.status_code
+        if ao_responder:
+            ao_responder(resposta, repeticao)
+    
+    if not tempos:
+        return {'nome': nome, 'metodo': metodo, 'url': caminho, 'status': None, 'amostras': 0,
+                'p50_ms': None, 'p95_ms': None, 'max_ms': None, 'consultas': None, 'bytes': None}
+    
+    return {
+        'nome': nome,
+        'metodo': metodo,
+        'url': caminho,
+        'status': status,
+        'amostras': repeticoes,
+        'p50_ms': round(percentil(tempos, 0.5) * 1000, 2),
+        'p95_ms': round(percentil(tempos, 0.95) * 1000, 2),
+        'max_ms': round(max(tempos) * 1000, 2),
+        'consultas': percentil(consultas, 0.5),
+        'bytes': percentil(tamanhos, 0.5)
+    }
+
+def primeiro(coluna):
+    """Menor valor da coluna (amostra para os parâmetros de rota)"""
+    return db.session.execute(select(func.min(coluna))).scalar()
+
+def amostras():
+    """Valores usados nos parâmetros das rotas"""
+    return {
+        'numero_serie': primeiro(Equipamento.numero_serie),
+        'ponto_id': primeiro(PontoMedicao.id),
+        'certificado_id': primeiro(Certificado.id),
+        'fabricante_id': primeiro(Fabricante.id),
+        'job_id': primeiro(JobImportacao.id)
+    }
+
+def rotas_leitura(app, valores):
+    """(nome, url) de cada rota GET e das suas variações; rotas sem amostra ficam de fora"""
+    rotas = []
+    for regra in sorted(app.url_map.iter_rules(), key=lambda regra: regra.endpoint):
+        if 'GET' not in regra.methods or regra.endpoint in ENDPOINTS_IGNORADOS:
+            continue
+        parametros = {argumento: valores.get(argumento) for argumento in regra.arguments}
+        if any(valor is None for valor in parametros.values()):
+            continue
+        
+        rotas.append((regra.endpoint, url_for(regra.endpoint, **parametros)))
+        for variante in VARIANTES.get(regra.endpoint, []):
+            sufixo = '&'.join(f'{chave}={valor}' for chave, valor in variante.items())
+            rotas.append((f'{regra.endpoint}?{sufixo}', url_for(regra.endpoint, **parametros, **variante)))
+    return rotas
+
+def ciclos_escrita():
+    """Entidades do ciclo criar/alterar/excluir: URLs, corpo de criação e de alteração"""
+    tipo = primeiro(TipoEquipamento.id)
+    unidade = primeiro(Unidade.id)
+    criterio = primeiro(CriterioAceitacao.id)
+    fabricante = primeiro(Fabricante.id)
+    polo = primeiro(Polo.id)
+    classificacao = primeiro(ClassificacaoPontoMedicao.id)
+    status = primeiro(StatusCertificadoIncerteza.id)
+    equipamento = primeiro(Equipamento.numero_serie)
+    hoje = date.today().isoformat()
+    
+    ciclos = [
+        {
+            'entidade': 'equipamentos',
+            'url': '/api/equipamentos/',
+            'item': '/api/equipamentos/{}',
+            'chave': 'numero_serie',
+            'criar': lambda i: {
+                'numero_serie': f'{PREFIXO_BENCHMARK}-EQ-{i}',
+                'tag_equipamento': f'{PREFIXO_BENCHMARK}-TAG-{i}',
+                'nome_equipamento': 'Equipamento de benchmark', 'fabricante_id': fabricante,
+                'tipo_equipamento_id': tipo, 'unidade_id': unidade, 'criterio_aceitacao_id': criterio
+            },
+            'alterar': lambda i: {'nome_equipamento': f'Equipamento de benchmark {i}'}
+        },
+        {
+            'entidade': 'pontos_medicao',
+            'url': '/api/pontos-medicao/',
+            'item': '/api/pontos-medicao/{}',
+            'chave': 'id',
+            'criar': lambda i: {
+                'tag_ponto_medicao': f'{PREFIXO_BENCHMARK}-PM-{i}', 'nome_ponto_medicao': 'Ponto de benchmark',
+                'polo_id': polo, 'classificacao_id': classificacao, 'data_proxima_calibracao': hoje
+            },
+            'alterar': lambda i: {'nome_ponto_medicao': f'Ponto de benchmark {i}'}
+        },
+        {
+            'entidade': 'fabricantes',
+            'url': '/api/configuracoes/fabricantes',
+            'item': '/api/configuracoes/fabricantes/{}',
+            'chave': 'id',
+            'criar': lambda i: {'nome': f'{PREFIXO_BENCHMARK} fabricante {i}'},
+            'alterar': lambda i: {'nome': f'{PREFIXO_BENCHMARK} fabricante alterado {i}'}
+        }
+    ]
+    if equipamento is not None:
+        ciclos.append({
+            'entidade': 'certificados',
+            'url': '/api/certificados/',
+            'item': '/api/certificados/{}',
+            'chave': 'id',
+            'criar': lambda i: {
+                'numero_serie_equipamento': equipamento, 'numero_certificado': f'{PREFIXO_BENCHMARK}-{i}',
+                'data_certificado': hoje, 'status_certificado_id': status
+            },
+            'alterar': lambda i: {'revisao_certificado': str(i)}
+        })
+    return ciclos
+
+def medir_escritas(cliente, contador, repeticoes):
+    """Criar, alterar e excluir 'repeticoes' registros de cada entidade"""
+    resultados = []
+    for ciclo in ciclos_escrita():
+        entidade = ciclo['entidade']
+        chaves = []
+        
+        def guardar_chave(resposta, i):
+            if ciclo['chave'] == 'id':
+                chaves.append((resposta.get_json() or {}).get('id'))
+            else:
+                chaves.append(ciclo['criar'](i)[ciclo['chave']])
+        
+        resultados.append(medir(
+            cliente, contador, f'{entidade}.criar', 'POST', ciclo['url'], repeticoes,
+            lambda i: {'json': ciclo['criar'](i)}, guardar_chave
+        ))
+        chaves = [chave for chave in chaves if chave is not None]
+        resultados.append(medir(
+            cliente, contador, f'{entidade}.atualizar', 'PUT', ciclo['item'], len(chaves),
+            lambda i: {'json': ciclo['alterar'](i)}, url=lambda i: ciclo['item'].format(chaves[i])
+        ))
+        resultados.append(medir(
+            cliente, contador, f'{entidade}.deletar', 'DELETE', ciclo['item'], len(chaves),
+            url=lambda i: ciclo['item'].format(chaves[i])
+        ))
+    return resultados
+
+def planilha_importacao(tipo, linhas):
+    """Planilha .xlsx em memória com 'linhas' registros de benchmark"""
+    import pandas as pd
+    
+    if tipo == 'equipamentos':
+        fabricantes = db.session.execute(select(Fabricante.nome)).scalars().all()
+        tipos = db.session.execute(select(TipoEquipamento.nome)).scalars().all()
+        df = pd.DataFrame({
+            'numero_serie': [f'{PREFIXO_BENCHMARK}-IMP-{i:07d}' for i in range(linhas)],
+            'tag_equipamento': [f'{PREFIXO_BENCHMARK}-IMP-TAG-{i:07d}' for i in range(linhas)],
+            'nome_equipamento': [f'Equipamento importado {i}' for i in range(linhas)],
+            'fabricante': [fabricantes[i % len(fabricantes)] for i in range(linhas)],
+            'tipo_equipamento': [tipos[i % len(tipos)] for i in range(linhas)]
+        })
+    else:
+        polos = db.session.execute(select(Polo.nome)).scalars().all()
+        classificacoes = db.session.execute(select(ClassificacaoPontoMedicao.nome)).scalars().all()
+        df = pd.DataFrame({
+            'tag_ponto_medicao': [f'{PREFIXO_BENCHMARK}-IMP-{i:07d}' for i in range(linhas)],
+            'nome_ponto_medicao': [f'Ponto importado {i}' for i in range(linhas)],
+            'polo': [polos[i % len(polos)] for i in range(linhas)],
+            'classificacao': [classificacoes[i % len(classificacoes)] for i in range(linhas)],
+            'data_proxima_calibracao': [date.today().isoformat()] * linhas,
+            'frequencia_calibracao_anp': [365] * linhas
+        })
+    
+    arquivo = io.BytesIO()
+    df.to_excel(arquivo, index=False)
+    return arquivo.getvalue()
+
+def remover_importados():
+    """Apagar os registros criados pela importação de benchmark"""
+    db.session.execute(text(
+        "DELETE FROM pontos_medicao WHERE tag_ponto_medicao LIKE :prefixo"
+    ), {'prefixo': f'{PREFIXO_BENCHMARK}-IMP-%'})
+    db.session.execute(text(
+        "DELETE FROM equipamentos WHERE numero_serie LIKE :prefixo"
+    ), {'prefixo': f'{PREFIXO_BENCHMARK}-IMP-%'})
+    db.session.commit()
+
+def medir_importacoes(cliente, contador, linhas):
+    """Importar uma planilha grande de cada tipo e medir linhas por segundo
+    (inserção e, em seguida, reimportação da mesma planilha com ?modo=upsert;
+    ?forcar=true para processar a planilha mesmo se já importada em outra execução)"""
+    resultados = []
+    for tipo, url in (('equipamentos', '/api/importacao/equipamentos'),
+                      ('pontos_medicao', '/api/importacao/pontos-medicao')):
+        conteudo = planilha_importacao(tipo, linhas)
+        try:
+            for nome, endereco in ((f'importacao.{tipo}', f'{url}?forcar=true'),
+                                   (f'importacao.{tipo}.upsert', f'{url}?modo=upsert&forcar=true')):
+                resultado = medir(
+                    cliente, contador, nome, 'POST', endereco, 1,
+                    lambda _: {'data': {'file': (io.BytesIO(conteudo), f'{tipo}.xlsx')}}
+                )
+                resultado['linhas'] = linhas
+                resultado['bytes_planilha'] = len(conteudo)
+                resultado['linhas_por_segundo'] = round(linhas / (resultado['p50_ms'] / 1000), 1)
+                resultados.append(resultado)
+        finally:
+            remover_importados()
+    return resultados
+
+def medir_exportacoes(cliente, contador, repeticoes):
+    """Exportar cada tipo em cada formato, lendo a resposta inteira"""
+    resultados = []
+    for tipo, endpoint in EXPORTACOES.items():
+        for formato in FORMATOS:
+            resultado = medir(
+                cliente, contador, f'exportacao.{tipo}.{formato}', 'GET',
+                url_for(endpoint, formato=formato), repeticoes
+            )
+            resultado['mb_por_segundo'] = round(resultado['bytes'] / 1e6 / (resultado['p50_ms'] / 1000), 2)
+            resultados.append(resultado)
+    return resultados
+
+def ler_continuamente(app, urls, parar, tempos, falhas):
+    """Ler as URLs em rodízio até 'parar' ser sinalizado (roda em uma thread)"""
+    cliente = app.test_client()
+    posicao = 0
+    while not parar.is_set():
+        inicio = time.perf_counter()
+        resposta = cliente.get(urls[posicao % len(urls)])
+        resposta.get_data()
+        resposta.close()
+        tempos.append(time.perf_counter() - inicio)
+        if resposta.status_code != 200:
+            falhas.append(resposta.status_code)
+        posicao += 1
+
+def medir_leituras(app, urls, leitores, enquanto):
+    """Leituras em 'leitores' threads enquanto enquanto() executa: vazão, latência e falhas"""
+    parar = threading.Event()
+    tempos = []
+    falhas = []
+    threads = [
+        threading.Thread(target=ler_continuamente, args=(app, urls, parar, tempos, falhas), daemon=True)
+        for _ in range(leitores)
+    ]
+    inicio = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    try:
+        enquanto()
+    finally:
+        parar.set()
+        for thread in threads:
+            thread.join()
+    decorrido = time.perf_counter() - inicio
+    
+    return {
+        'segundos': round(decorrido, 2),
+        'leituras': len(tempos),
+        'leituras_por_segundo': round(len(tempos) / decorrido, 1),
+        'p50_ms': round(percentil(tempos, 0.5) * 1000, 2) if tempos else None,
+        'p95_ms': round(percentil(tempos, 0.95) * 1000, 2) if tempos else None,
+        'max_ms': round(max(tempos) * 1000, 2) if tempos else None,
+        'falhas': len(falhas)
+    }
+
+def criar_continuamente(app, escritor, quantidade, tempos, falhas):
+    """Criar 'quantidade' equipamentos em sequência (roda em uma thread)"""
+    cliente = app.test_client()
+    for indice in range(quantidade):
+        inicio = time.perf_counter()
+        resposta = cliente.post('/api/equipamentos/', json={
+            'numero_serie': f'{PREFIXO_BENCHMARK}-CONC-{escritor}-{indice}',
+            'nome_equipamento': 'Equipamento de benchmark'
+        })
+        resposta.close()
+        tempos.append(time.perf_counter() - inicio)
+        if resposta.status_code != 201:
+            falhas.append(resposta.status_code)
+
+def medir_escritas_paralelas(app, escritores, por_escritor=ESCRITAS_POR_THREAD):
+    """Criações de equipamentos em 'escritores' threads simultâneas: vazão, latência e falhas"""
+    tempos = []
+    falhas = []
+    fila = app.extensions.get('fila_escrita')
+    lotes_antes = fila.lotes if fila else 0
+    threads = [
+        threading.Thread(target=criar_continuamente, args=(app, escritor, por_escritor, tempos, falhas))
+        for escritor in range(escritores)
+    ]
+    inicio = time.perf_counter()
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        decorrido = time.perf_counter() - inicio
+    finally:
+        db.session.execute(text(
+            "DELETE FROM equipamentos WHERE numero_serie LIKE :prefixo"
+        ), {'prefixo': f'{PREFIXO_BENCHMARK}-CONC-%'})
+        db.session.commit()
+    
+    return {
+        'escritores': escritores,
+        'segundos': round(decorrido, 2),
+        'escritas': len(tempos),
+        'escritas_por_segundo': round(len(tempos) / decorrido, 1),
+        'p50_ms': round(percentil(tempos, 0.5) * 1000, 2),
+        'p95_ms': round(percentil(tempos, 0.95) * 1000, 2),
+        'max_ms': round(max(tempos) * 1000, 2),
+        'falhas': len(falhas),
+        'commits_em_grupo': fila.lotes - lotes_antes if fila else None
+    }
+
+def medir_concorrencia(app, leitores, linhas):
+    """Vazão de leituras paralelas (sem escrita e durante a importação de 'linhas' pontos)
+    e de escritas paralelas, com o mesmo número de threads"""
+    urls = [url_for(endpoint) for endpoint in ROTAS_CONCORRENCIA]
+    conteudo = planilha_importacao('pontos_medicao', linhas)
+    importacao = {}
+    
+    def importar():
+        inicio = time.perf_counter()
+        resposta = app.test_client().post(
+            '/api/importacao/pontos-medicao?forcar=true',
+            data={'file': (io.BytesIO(conteudo), 'pontos_medicao.xlsx')}
+        )
+        resposta.close()
+        importacao['status'] = resposta.status_code
+        importacao['ms'] = round((time.perf_counter() - inicio) * 1000, 2)
+    
+    sem_escrita = medir_leituras(app, urls, leitores, lambda: time.sleep(DURACAO_LEITURA_BASE))
+    try:
+        durante_importacao = medir_leituras(app, urls, leitores, importar)
+    finally:
+        remover_importados()
+    
+    return {
+        'leitores': leitores,
+        'rotas': list(ROTAS_CONCORRENCIA),
+        'escritas_paralelas': medir_escritas_paralelas(app, leitores),
+        'linhas_importacao': linhas,
+        'status_importacao': importacao.get('status'),
+        'importacao_ms': importacao.get('ms'),
+        'sem_escrita': sem_escrita,
+        'durante_importacao': durante_importacao
+    }
+
+def ambiente():
+    """Versões e tamanho das tabelas no momento da execução"""
+    return {
+        'python': platform.python_version(),
+        'dialeto': db.engine.dialect.name,
+        'sqlite': sqlite3.sqlite_version if db.engine.dialect.name == 'sqlite' else None,
+        'banco': db.engine.url.render_as_string(hide_password=True),
+        'journal_mode': (
+            db.session.execute(text('PRAGMA journal_mode')).scalar()
+            if db.engine.dialect.name == 'sqlite' else None
+        ),
+        'linhas': {
+            tabela: db.session.execute(text(f'SELECT COUNT(*) FROM {tabela}')).scalar()
+            for tabela in TABELAS_CONTADAS
+        }
+    }
+
+def executar_benchmark(app, repeticoes=REPETICOES_PADRAO, linhas_importacao=LINHAS_IMPORTACAO_PADRAO,
+                       escritas=True, progresso=None, leitores=LEITORES_PADRAO):
+    """Executar a suíte completa; retorna o resultado serializável em JSON"""
+    cliente = app.test_client()
+    resultado = {
+        'executado_em': datetime.now().isoformat(timespec='seconds'),
+        'repeticoes': repeticoes,
+        'ambiente': ambiente(),
+        'rotas': [],
+        'importacao': [],
+        'exportacao': [],
+        'concorrencia': None
+    }
+    
+    with ContadorConsultas() as contador, app.test_request_context():
+        for nome, url in rotas_leitura(app, amostras()):
+            # Uma chamada de aquecimento (caches em processo, planos do SQLite)
+            cliente.get(url).close()
+            resultado['rotas'].append(medir(cliente, contador, nome, 'GET', url, repeticoes))
+            if progresso:
+                progresso(resultado['rotas'][-1])
+        
+        if escritas:
+            for medicao in medir_escritas(cliente, contador, repeticoes):
+                resultado['rotas'].append(medicao)
+                if progresso:
+                    progresso(medicao)
+        
+        if linhas_importacao:
+            for medicao in medir_importacoes(cliente, contador, linhas_importacao):
+                resultado['importacao'].append(medicao)
+                if progresso:
+                    progresso(medicao)
+        
+        for medicao in medir_exportacoes(cliente, contador, REPETICOES_EXPORTACAO):
+            resultado['exportacao'].append(medicao)
+            if progresso:
+                progresso(medicao)
+        
+        if leitores and linhas_importacao:
+            resultado['concorrencia'] = medir_concorrencia(app, leitores, linhas_importacao)
+    
+    return resultado
+
+def comparar(anterior, atual):
+    """Variação do p50 e das consultas por medição presente nas duas execuções"""
+    def por_nome(execucao):
+        return {
+            medicao['nome'] + ('' if medicao['metodo'] == 'GET' else f" [{medicao['metodo']}]"): medicao
+            for secao in ('rotas', 'importacao', 'exportacao')
+            for medicao in execucao.get(secao, [])
+        }
+    
+    antes = por_nome(anterior)
+    depois = por_nome(atual)
+    comparacao = []
+    for nome, medicao in depois.items():
+        if nome not in antes or not antes[nome]['p50_ms'] or medicao['p50_ms'] is None:
+            continue
+        comparacao.append({
+            'nome': nome,
+            'p50_ms_antes': antes[nome]['p50_ms'],
+            'p50_ms_depois': medicao['p50_ms'],
+            'variacao_p50': round((medicao['p50_ms'] / antes[nome]['p50_ms'] - 1) * 100, 1),
+            'consultas_antes': antes[nome]['consultas'],
+            'consultas_depois': medicao['consultas']
+        })
+    return comparacao
@@ -0,0 +1,178 @@
+"""Busca textual com índice FTS5 (SQLite) para o parâmetro ``search``.
+
+Cada tabela pesquisável tem uma tabela virtual FTS5 de conteúdo externo,
+mantida por gatilhos em inserções, alterações e exclusões. Os termos da
+busca viram consultas por prefixo ("termo"*) combinadas com AND e os
+resultados são ordenados por relevância (bm25). Quando o FTS5 não está
+disponível, a busca volta ao LIKE '%termo%' (sem diferenciar maiúsculas)
+nas mesmas colunas; no PostgreSQL esse ILIKE usa índices GIN de trigramas
+(extensão pg_trgm), criados se o usuário do banco tiver permissão.
+
+Observação: a tabela 'equipamentos' não tem chave inteira, então o índice
+usa o rowid implícito, que um VACUUM pode renumerar. Compacte o banco com
+`flask migrar-datas --vacuum` (VACUUM seguido de reconstruir_indices_busca)
+ou, após um VACUUM feito por fora, rode `flask init-db --reconstruir-busca`.
+"""
+from sqlalchemy import or_, text, table, literal_column
+from sqlalchemy.exc import DatabaseError, OperationalError
+from src.models.database import db
+
+# Tabela de origem -> colunas indexadas e coluna usada como rowid
+INDICES_BUSCA = {
+    'equipamentos': {
+        'rowid': 'rowid',
+        'colunas': ['numero_serie', 'tag_equipamento', 'nome_equipamento']
+    },
+    'pontos_medicao': {
+        'rowid': 'id',
+        'colunas': ['tag_ponto_medicao', 'nome_ponto_medicao', 'numero_serie_equipamento']
+    },
+    'certificados': {
+        'rowid': 'id',
+        'colunas': ['numero_certificado', 'numero_serie_equipamento']
+    }
+}
+
+# Hífen, sublinhado, ponto e barra fazem parte de números de série e TAGs
+TOKENIZADOR = "unicode61 remove_diacritics 2 tokenchars '-_./'"
+
+_disponivel = None
+
+def instalar_busca_textual():
+    """Criar as tabelas FTS5 e seus gatilhos; retorna False se o FTS5 não estiver disponível"""
+    global _disponivel
+    
+    if db.engine.dialect.name == 'postgresql':
+        instalar_indices_trigramas()
+    if db.engine.dialect.name != 'sqlite':
+        _disponivel = False
+        return False
+    
+    for tabela, indice in INDICES_BUSCA.items():
+        fts = f'{tabela}_fts'
+        colunas = ', '.join(indice['colunas'])
+        novos = ', '.join(f'new.{c}' for c in indice['colunas'])
+        antigos = ', '.join(f'old.{c}' for c in indice['colunas'])
+        rowid = indice['rowid']
+        
+        existente = db.session.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :nome"),
+            {'nome': fts}
+        ).first()
+        
+        try:
+            db.session.execute(text(f"""
+                CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+                    {colunas}, content='{tabela}', content_rowid='{rowid}',
+                    tokenize="{TOKENIZADOR}", prefix='2 3 4'
+                )
+            """))
+        except OperationalError:
+            db.session.rollback()
+            _disponivel = False
+            return False
+        
+        db.session.execute(text(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{fts}_insert AFTER INSERT ON {tabela}
+            BEGIN
+                INSERT INTO {fts}(rowid, {colunas}) VALUES (new.{rowid}, {novos});
+            END
+        """))
+        db.session.execute(text(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{fts}_delete AFTER DELETE ON {tabela}
+            BEGIN
+                INSERT INTO {fts}({fts}, rowid, {colunas}) VALUES ('delete', old.{rowid}, {antigos});
+            END
+        """))
+        db.session.execute(text(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{fts}_update AFTER UPDATE ON {tabela}
+            BEGIN
+                INSERT INTO {fts}({fts}, rowid, {colunas}) VALUES ('delete', old.{rowid}, {antigos});
+                INSERT INTO {fts}(rowid, {colunas}) VALUES (new.{rowid}, {novos});
+            END
+        """))
+        
+        # Indexar registros já existentes na primeira instalação
+        if not existente:
+            db.session.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"))
+    
+    db.session.commit()
+    _disponivel = True
+    return True
+
+def instalar_indices_trigramas():
+    """PostgreSQL: índices GIN (pg_trgm) nas colunas pesquisáveis; retorna False sem a extensão"""
+    try:
+        db.session.execute(text('CREATE EXTENSION IF NOT EXISTS pg_trgm'))
+    except DatabaseError:
+        db.session.rollback()
+        return False
+    
+    for tabela, indice in INDICES_BUSCA.items():
+        for coluna in indice['colunas']:
+            db.session.execute(text(
+                f'CREATE INDEX IF NOT EXISTS ix_{tabela}_{coluna}_trgm '
+                f'ON {tabela} USING gin ({coluna} gin_trgm_ops)'
+            ))
+    db.session.commit()
+    return True
+
+def reconstruir_indices_busca():
+    """Reindexar todas as tabelas FTS5 a partir das tabelas de origem; False sem FTS5"""
+    if not busca_textual_disponivel():
+        return False
+    for tabela in INDICES_BUSCA:
+        db.session.execute(text(f"INSERT INTO {tabela}_fts({tabela}_fts) VALUES ('rebuild')"))
+    db.session.commit()
+    return True
+
+def compactar_banco():
+    """SQLite: VACUUM e reconstrução dos índices de busca (o rowid de 'equipamentos' pode mudar)"""
+    db.session.commit()
+    with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conexao:
+        conexao.execute(text('VACUUM'))
+    return reconstruir_indices_busca()
+
+def busca_textual_disponivel():
+    """Indica se os índices FTS5 existem neste banco"""
+    global _disponivel
+    
+    if _disponivel is None:
+        if db.engine.dialect.name != 'sqlite':
+            _disponivel = False
+        else:
+            _disponivel = db.session.execute(text(
+                "SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name IN "
+                "('equipamentos_fts', 'pontos_medicao_fts', 'certificados_fts')"
+            )).scalar() == len(INDICES_BUSCA)
+    
+    return _disponivel
+
+def expressao_fts(termo):
+    """Converter o texto digitado em consulta FTS5 por prefixo (todos os termos)"""
+    tokens = [t.replace('"', '') for t in termo.split()]
+    return ' '.join(f'"{t}"*' for t in tokens if t)
+
+def filtrar_busca(query, tabela, termo, colunas):
+    """Aplicar o filtro de busca à consulta.
+    
+    colunas: colunas do modelo usadas no LIKE/ILIKE quando o FTS5 não está disponível.
+    Com FTS5, a consulta também passa a ser ordenada por relevância.
+    """
+    expressao = expressao_fts(termo)
+    if not expressao:
+        return query
+    
+    if not busca_textual_disponivel():
+        return query.filter(or_(*[c.icontains(termo, autoescape=True) for c in colunas]))
+    
+    fts = f'{tabela}_fts'
+    resultados = db.session.query(
+        literal_column('rowid').label('rowid'),
+        literal_column('rank').label('rank')
+    ).select_from(table(fts)).filter(
+        text(f'{fts} MATCH :termo_busca').bindparams(termo_busca=expressao)
+    ).subquery()
+    
+    rowid = literal_column(f"{tabela}.{INDICES_BUSCA[tabela]['rowid']}")
+    return query.join(resultados, resultados.c.rowid == rowid).order_by(resultados.c.rank)
@@ -0,0 +1,104 @@
+"""Cache em processo das listas de configuração (lookups).
+
+As listas ficam em memória junto com a versão global de configuração
+(chave 'versao_configuracao' em 'contadores'). Toda alteração de lookup
+incrementa a versão na mesma transação; cada requisição lê apenas essa
+linha e só recarrega as listas quando a versão mudou, o que também
+invalida o cache dos demais processos. As respostas levam um ETag forte
+(hash do corpo) e respondem 304 a If-None-Match sem consultar as listas.
+"""
+import hashlib
+import threading
+from flask import Response, current_app, request
+from sqlalchemy import select, update
+from src.models.database import (
+    db, Contador, Fabricante, TipoEquipamento, Polo, Instalacao, Unidade,
+    ClassificacaoPontoMedicao, NaturezaTesteAnalise,
+    StatusCertificadoIncerteza, CriterioAceitacao
+)
+from src.services.serializadores import consulta_instalacoes, para_dicts
+
+CHAVE_VERSAO = 'versao_configuracao'
+
+# Lista -> modelo com colunas id e nome (instalações têm consulta própria)
+LISTAS = {
+    'fabricantes': Fabricante,
+    'tipos_equipamento': TipoEquipamento,
+    'polos': Polo,
+    'unidades': Unidade,
+    'classificacoes_ponto_medicao': ClassificacaoPontoMedicao,
+    'naturezas_teste_analise': NaturezaTesteAnalise,
+    'status': StatusCertificadoIncerteza,
+    'criterios_aceitacao': CriterioAceitacao
+}
+
+TODAS = 'todas'
+
+# Comandos de uma recarga do cache: versão, cada lista e as instalações
+ORCAMENTO_LISTAS = len(LISTAS) + 2
+
+_cache = {'versao': None, 'respostas': {}}
+_trava = threading.Lock()
+
+def versao_configuracao():
+    """Versão atual das configurações segundo o banco"""
+    versao = db.session.execute(
+        select(Contador.valor).where(Contador.chave == CHAVE_VERSAO)
+    ).scalar()
+    return versao or 0
+
+def incrementar_versao_configuracao():
+    """Incrementar a versão na transação corrente (chamar antes do commit)"""
+    resultado = db.session.execute(
+        update(Contador).where(Contador.chave == CHAVE_VERSAO).values(valor=Contador.valor + 1)
+    )
+    if resultado.rowcount == 0:
+        db.session.add(Contador(chave=CHAVE_VERSAO, valor=1))
+
+def carregar_listas():
+    """Consultar todas as listas de configuração, ordenadas por nome"""
+    listas = {
+        chave: [{'id': id, 'nome': nome} for id, nome in db.session.execute(
+            select(modelo.id, modelo.nome).order_by(modelo.nome)
+        )]
+        for chave, modelo in LISTAS.items()
+    }
+    listas['instalacoes'] = para_dicts(consulta_instalacoes().order_by(Instalacao.nome).all())
+    return listas
+
+def serializar(dados):
+    """Corpo JSON e ETag (hash do corpo)"""
+    corpo = current_app.json.dumps(dados).encode('utf-8')
+    return corpo, hashlib.sha256(corpo).hexdigest()[:32]
+
+def respostas_em_cache():
+    """Corpos e ETags das listas, recarregados só quando a versão muda"""
+    versao = versao_configuracao()
+    with _trava:
+        if _cache['versao'] == versao:
+            return _cache['respostas']
+    
+    listas = carregar_listas()
+    respostas = {chave: serializar(dados) for chave, dados in listas.items()}
+    respostas[TODAS] = serializar(listas)
+    
+    with _trava:
+        _cache['versao'] = versao
+        _cache['respostas'] = respostas
+    return respostas
+
+def resposta_configuracao(chave=TODAS):
+    """Resposta da lista (ou de todas) com ETag; 304 se o cliente já tem a versão"""
+    corpo, etag = respostas_em_cache()[chave]
+    return resposta_com_etag(corpo, etag)
+
+def resposta_com_etag(corpo, etag):
+    """Resposta JSON com ETag forte; 304 se If-None-Match já contém o ETag"""
+    if request.if_none_match.contains(etag):
+        resposta = Response(status=304)
+    else:
+        resposta = Response(corpo, mimetype='application/json')
+    
+    resposta.set_etag(etag)
+    resposta.headers['Cache-Control'] = 'no-cache'
+    return resposta
@@ -0,0 +1,58 @@
+"""Status de calibração calculado no banco.
+
+O status deriva apenas de ``data_proxima_calibracao`` e da data de hoje:
+``sem_data`` (nula), ``vencido`` (anterior a hoje), ``proximo_vencimento``
+(até DIAS_PROXIMO_VENCIMENTO dias) e ``vigente``. Os filtros por status
+são traduzidos em intervalos de data, para usar o índice da coluna.
+"""
+from datetime import date, timedelta
+from sqlalchemy import and_, case, func, or_
+from src.models.database import PontoMedicao
+
+DIAS_PROXIMO_VENCIMENTO = 30
+
+STATUS_CALIBRACAO = ('vencido', 'proximo_vencimento', 'vigente', 'sem_data')
+
+class StatusInvalido(ValueError):
+    """Status de calibração desconhecido"""
+
+def limites_status(hoje=None):
+    """Datas de hoje e limite do 'proximo_vencimento'"""
+    hoje = hoje or date.today()
+    return hoje, hoje + timedelta(days=DIAS_PROXIMO_VENCIMENTO)
+
+def condicao_status(status, hoje=None):
+    """Condição SQL equivalente a um status de calibração"""
+    coluna = PontoMedicao.data_proxima_calibracao
+    hoje, limite = limites_status(hoje)
+    
+    if status == 'vencido':
+        return coluna < hoje
+    if status == 'proximo_vencimento':
+        return and_(coluna >= hoje, coluna <= limite)
+    if status == 'vigente':
+        return coluna > limite
+    if status == 'sem_data':
+        return coluna.is_(None)
+    raise StatusInvalido(f'Status de calibração inválido: {status}')
+
+def expressao_status(hoje=None):
+    """Expressão CASE com o status de calibração de cada ponto"""
+    return case(
+        *[(condicao_status(status, hoje), status) for status in STATUS_CALIBRACAO[:-1]],
+        else_='sem_data'
+    )
+
+def filtrar_status(query, valor, hoje=None):
+    """Filtrar a consulta por um ou mais status separados por vírgula"""
+    status = [s.strip() for s in valor.split(',') if s.strip()]
+    if not status:
+        return query
+    return query.filter(or_(*[condicao_status(s, hoje) for s in status]))
+
+def contagem_por_status(query, hoje=None):
+    """Contar os pontos da consulta em cada status com um único agregado"""
+    linha = query.order_by(None).with_entities(
+        *[func.count(case((condicao_status(status, hoje), 1))) for status in STATUS_CALIBRACAO]
+    ).one()
+    return dict(zip(STATUS_CALIBRACAO, linha))
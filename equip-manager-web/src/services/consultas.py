@@ -0,0 +1,139 @@
+"""Detector de N+1 e orçamento de consultas por rota (desenvolvimento e testes).
+
+Com a aplicação em debug, em TESTING ou com MONITORAR_CONSULTAS=1 no
+ambiente, cada requisição conta os comandos SQL executados, agrupados pelo
+SQL normalizado (literais e listas do IN trocados por '?'). Um mesmo
+comando repetido mais de LIMITE_REPETICOES_CONSULTA vezes indica consulta
+por linha (relacionamento lazy dentro de um laço, por exemplo).
+
+As rotas declaram quantos comandos podem executar com
+@orcamento_consultas(n); rotas que repetem comandos por lote de propósito
+(importações) usam @consultas_em_lote. Em TESTING uma violação levanta
+ConsultasExcessivas e o teste falha; fora dele, é registrada no log.
+"""
+import math
+import re
+import traceback
+from collections import Counter
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from src.models.database import db
+
+# Repetições do mesmo comando, por requisição, a partir das quais há suspeita de N+1
+LIMITE_REPETICOES_CONSULTA = 5
+
+# Comandos mais repetidos exibidos na mensagem de violação
+MAX_COMANDOS_RELATADOS = 3
+
+_LITERAIS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_LISTAS_IN = re.compile(r'\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)', re.IGNORECASE)
+_ESPACOS = re.compile(r'\s+')
+_COLUNAS_SELECT = re.compile(r'^SELECT .*? FROM ')
+
+class ConsultasExcessivas(AssertionError):
+    """Requisição acima do orçamento de consultas ou com consulta repetida por linha"""
+
+def normalizar_sql(statement):
+    """SQL sem literais, com listas do IN colapsadas e espaços simplificados"""
+    sql = _LITERAIS.sub('?', statement)
+    sql = _LISTAS_IN.sub('IN (?)', sql)
+    return _ESPACOS.sub(' ', sql).strip()
+
+def resumir_sql(sql, tamanho=200):
+    """SQL para mensagens: sem a lista de colunas do SELECT e truncado"""
+    sql = _COLUNAS_SELECT.sub('SELECT ... FROM ', sql, count=1)
+    return sql if len(sql) <= tamanho else sql[:tamanho] + '...'
+
+def orcamento_consultas(maximo, repeticoes=None):
+    """Declarar o máximo de comandos SQL que a rota pode executar por requisição
+    (e, opcionalmente, quantas vezes um mesmo comando pode se repetir)"""
+    def decorador(funcao):
+        funcao.orcamento_consultas = maximo
+        if repeticoes is not None:
+            funcao.limite_repeticoes = repeticoes
+        return funcao
+    return decorador
+
+def consultas_em_lote(funcao):
+    """Marcar a rota como repetidora de comandos por lote (sem detecção de N+1)"""
+    funcao.limite_repeticoes = math.inf
+    return funcao
+
+def monitoramento_ativo():
+    """Se as consultas devem ser contadas (debug, TESTING ou MONITORAR_CONSULTAS)"""
+    app = current_app
+    return app.debug or app.testing or app.config.get('MONITORAR_CONSULTAS')
+
+def origem_do_comando():
+    """Linha do código da aplicação que disparou o comando (fora do SQLAlchemy)"""
+    for quadro in reversed(traceback.extract_stack()[:-1]):
+        caminho = quadro.filename.replace('\\', '/')
+        if '/src/' in caminho and not caminho.endswith('/services/consultas.py'):
+            return f'{caminho.rsplit("/src/", 1)[1]}:{quadro.lineno} ({quadro.name})'
+    return 'origem desconhecida'
+
+def registrar_comando(conn, cursor, statement, parameters, context, executemany):
+    """Contar o comando na requisição monitorada e guardar a origem da 1ª repetição suspeita"""
+    if not has_request_context() or 'consultas' not in g:
+        return
+    
+    sql = normalizar_sql(statement)
+    g.consultas[sql] += 1
+    if g.consultas[sql] == g.limite_repeticoes + 1:
+        g.origens_consultas[sql] = origem_do_comando()
+
+def iniciar_monitoramento():
+    """Preparar a contagem da requisição (before_request)"""
+    if not monitoramento_ativo():
+        return
+    
+    visao = current_app.view_functions.get(request.endpoint)
+    g.consultas = Counter()
+    g.origens_consultas = {}
+    g.limite_repeticoes = getattr(
+        visao, 'limite_repeticoes',
+        current_app.config.get('LIMITE_REPETICOES_CONSULTA', LIMITE_REPETICOES_CONSULTA)
+    )
+    g.orcamento_consultas = getattr(visao, 'orcamento_consultas', None)
+
+def violacoes(consultas, origens, limite_repeticoes, orcamento):
+    """Descrições das violações encontradas na requisição"""
+    problemas = []
+    total = sum(consultas.values())
+    repetidos = [(sql, vezes) for sql, vezes in consultas.most_common() if vezes > limite_repeticoes]
+    for sql, vezes in repetidos[:MAX_COMANDOS_RELATADOS]:
+        problemas.append(f'{vezes}x {origens.get(sql, "origem desconhecida")}: {resumir_sql(sql)}')
+    
+    if orcamento is not None and total > orcamento:
+        mais_frequentes = [
+            f'{vezes}x {resumir_sql(sql, 120)}' for sql, vezes in consultas.most_common(MAX_COMANDOS_RELATADOS)
+        ]
+        problemas.append(
+            f'{total} comandos SQL, orçamento de {orcamento} (mais frequentes: '
+            + ' | '.join(mais_frequentes) + ')'
+        )
+    return problemas
+
+def verificar_consultas(response):
+    """Comparar a contagem com o orçamento e o limite de repetições (after_request)"""
+    consultas = g.pop('consultas', None)
+    if consultas is None:
+        return response
+    
+    problemas = violacoes(
+        consultas, g.origens_consultas, g.limite_repeticoes, g.orcamento_consultas
+    )
+    if problemas:
+        mensagem = f'Consultas excessivas em {request.method} {request.path}: ' + '; '.join(problemas)
+        if current_app.testing:
+            raise ConsultasExcessivas(mensagem)
+        current_app.logger.warning(mensagem)
+    return response
+
+def instalar_monitor_consultas(app):
+    """Registrar os ganchos do monitor e o evento de contagem do SQLAlchemy"""
+    app.before_request(iniciar_monitoramento)
+    app.after_request(verificar_consultas)
+    
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', registrar_comando)
@@ -0,0 +1,315 @@
+"""Geração de dados sintéticos em escala para testes de desempenho.
+
+Preenche o esquema com equipamentos, pontos de medição, certificados,
+testes de poços, análises químicas e incertezas em quantidades
+configuráveis (ESCALA_PADRAO vezes o fator informado). Os lookups são
+completados até as cardinalidades de CARDINALIDADES, com distribuição
+desigual entre fabricantes (poucos concentram a maioria), e as datas
+seguem a rotina de calibração: cada ponto tem uma frequência ANP e a
+última calibração cai num ponto aleatório do ciclo, com parte dos pontos
+vencida e alguns sem datas.
+
+As chaves geradas levam o prefixo PREFIXO e continuam a numeração de
+execuções anteriores. A mesma semente gera os mesmos dados. As linhas são
+inseridas em lotes (executemany) pelos gatilhos normais do banco, então
+contadores, busca textual e versão dos dados ficam consistentes.
+"""
+import random
+from datetime import date, timedelta
+from sqlalchemy import func, insert, select
+from src.models.database import (
+    db, Equipamento, PontoMedicao, Certificado, TestePoco, AnaliseQuimica, Incerteza,
+    Fabricante, Modelo, TipoEquipamento, Polo, Instalacao, Unidade,
+    ClassificacaoPontoMedicao, NaturezaTesteAnalise, StatusCertificadoIncerteza,
+    ServicoIncerteza, CriterioAceitacao
+)
+from src.services.cache_configuracoes import incrementar_versao_configuracao
+from src.services.eventos import remover_eventos_antigos
+
+# Quantidade de linhas por tabela com fator 1
+ESCALA_PADRAO = {
+    'equipamentos': 100_000,
+    'pontos_medicao': 300_000,
+    'certificados': 2_000_000,
+    'testes_pocos': 50_000,
+    'analises_quimicas': 100_000,
+    'incertezas': 20_000
+}
+
+# Total de registros desejado em cada lookup
+CARDINALIDADES = {
+    Fabricante: 40,
+    Modelo: 400,
+    TipoEquipamento: 30,
+    Polo: 8,
+    Instalacao: 60,
+    Unidade: 14,
+    ClassificacaoPontoMedicao: 5,
+    NaturezaTesteAnalise: 6,
+    StatusCertificadoIncerteza: 7,
+    ServicoIncerteza: 6,
+    CriterioAceitacao: 7
+}
+
+# Frequências de calibração ANP (dias) e seus pesos
+FREQUENCIAS_CALIBRACAO = ((90, 1), (180, 3), (365, 5), (730, 1))
+
+# Fração dos pontos sem datas de calibração e sem equipamento associado
+FRACAO_SEM_DATAS = 0.03
+FRACAO_SEM_EQUIPAMENTO = 0.1
+
+# Anos de histórico de certificados, testes e análises
+ANOS_HISTORICO = 10
+
+PREFIXO = 'SIN'
+TAMANHO_LOTE_GERACAO = 10_000
+
+def quantidades(fator=1.0, **especificas):
+    """Linhas a gerar por tabela: ESCALA_PADRAO * fator, com valores específicos por cima"""
+    totais = {tabela: int(total * fator) for tabela, total in ESCALA_PADRAO.items()}
+    totais.update({tabela: total for tabela, total in especificas.items() if total is not None})
+    return totais
+
+def pesos_zipf(quantidade, expoente=1.1):
+    """Pesos decrescentes (poucos itens concentram a maioria das linhas)"""
+    return [1 / (posicao ** expoente) for posicao in range(1, quantidade + 1)]
+
+def completar_lookups(aleatorio):
+    """Criar os registros que faltam em cada lookup; retorna os ids por modelo"""
+    criados = False
+    for modelo, total in CARDINALIDADES.items():
+        faltam = total - db.session.execute(select(func.count()).select_from(modelo)).scalar()
+        if faltam <= 0:
+            continue
+        
+        prefixo = f'{PREFIXO} {modelo.__tablename__} '
+        inicio = ultimo_numero(modelo.nome, prefixo, 3) + 1
+        novos = [{'nome': f'{prefixo}{numero:03d}'} for numero in range(inicio, inicio + faltam)]
+        
+        if modelo is Modelo:
+            fabricantes = db.session.execute(select(Fabricante.id)).scalars().all()
+            for registro in novos:
+                registro['fabricante_id'] = aleatorio.choice(fabricantes)
+        elif modelo is Instalacao:
+            polos = db.session.execute(select(Polo.id)).scalars().all()
+            for registro in novos:
+                registro['polo_id'] = aleatorio.choice(polos)
+        
+        db.session.execute(insert(modelo), novos)
+        criados = True
+    
+    if criados:
+        incrementar_versao_configuracao()
+    db.session.commit()
+    
+    return {
+        modelo: db.session.execute(select(modelo.id).order_by(modelo.id)).scalars().all()
+        for modelo in CARDINALIDADES
+    }
+
+def ultimo_numero(coluna, prefixo, digitos=8):
+    """Maior número das chaves sintéticas da coluna ('prefixo' + número com 'digitos' dígitos), 0 se não há"""
+    resultado = db.session.execute(
+        select(coluna).where(coluna.like(prefixo + '_' * digitos)).order_by(coluna.desc())
+    ).scalars()
+    try:
+        # Com largura fixa, a ordem do texto é a dos números; sufixos com letras vêm antes
+        for chave in resultado:
+            sufixo = chave[len(prefixo):]
+            if sufixo.isdigit():
+                return int(sufixo)
+        return 0
+    finally:
+        resultado.close()
+
+def proximo_numero(coluna, prefixo=f'{PREFIXO}-'):
+    """Próximo número das chaves sintéticas da coluna, depois do maior já gravado
+    (a contagem repetiria chaves depois de exclusões)"""
+    return ultimo_numero(coluna, prefixo) + 1
+
+def gravar(modelo, registros, progresso=None):
+    """Inserir os registros gerados em lotes, com commit por lote"""
+    total = 0
+    lote = []
+    for registro in registros:
+        lote.append(registro)
+        if len(lote) == TAMANHO_LOTE_GERACAO:
+            db.session.execute(insert(modelo), lote)
+            db.session.commit()
+            total += len(lote)
+            lote = []
+            if progresso:
+                progresso(modelo.__tablename__, total)
+    if lote:
+        db.session.execute(insert(modelo), lote)
+        db.session.commit()
+        total += len(lote)
+        if progresso:
+            progresso(modelo.__tablename__, total)
+    return total
+
+def data_aleatoria(aleatorio, hoje, anos=ANOS_HISTORICO):
+    """Data uniforme nos últimos 'anos'"""
+    return hoje - timedelta(days=aleatorio.randrange(anos * 365))
+
+def gerar_equipamentos(aleatorio, ids, inicio, quantidade):
+    """Equipamentos com fabricantes e tipos em distribuição desigual"""
+    fabricantes = ids[Fabricante]
+    pesos_fabricantes = pesos_zipf(len(fabricantes))
+    modelos = ids[Modelo]
+    tipos = ids[TipoEquipamento]
+    pesos_tipos = pesos_zipf(len(tipos), 0.8)
+    for numero in range(inicio, inicio + quantidade):
+        faixa_minima = round(aleatorio.uniform(-50, 50), 1)
+        faixa_maxima = round(faixa_minima + aleatorio.choice((10, 50, 100, 250, 1000)), 1)
+        yield {
+            'numero_serie': f'{PREFIXO}-{numero:08d}',
+            'tag_equipamento': f'{PREFIXO}-EQ-{numero:08d}',
+            'nome_equipamento': f'Equipamento sintético {numero}',
+            'fabricante_id': aleatorio.choices(fabricantes, pesos_fabricantes)[0],
+            'modelo_id': aleatorio.choice(modelos),
+            'tipo_equipamento_id': aleatorio.choices(tipos, pesos_tipos)[0],
+            'unidade_id': aleatorio.choice(ids[Unidade]),
+            'criterio_aceitacao_id': aleatorio.choice(ids[CriterioAceitacao]),
+            'resolucao': aleatorio.choice((0.001, 0.01, 0.1, 1.0)),
+            'faixa_minima_equipamento': faixa_minima,
+            'faixa_maxima_equipamento': faixa_maxima
+        }
+
+def gerar_pontos_medicao(aleatorio, ids, inicio, quantidade, equipamentos, hoje):
+    """Pontos de medição com datas distribuídas ao longo do ciclo de calibração"""
+    frequencias = [frequencia for frequencia, _ in FREQUENCIAS_CALIBRACAO]
+    pesos_frequencias = [peso for _, peso in FREQUENCIAS_CALIBRACAO]
+    for numero in range(inicio, inicio + quantidade):
+        registro = {
+            'tag_ponto_medicao': f'{PREFIXO}-PM-{numero:08d}',
+            'nome_ponto_medicao': f'Ponto de medição sintético {numero}',
+            'polo_id': aleatorio.choice(ids[Polo]),
+            'classificacao_id': aleatorio.choice(ids[ClassificacaoPontoMedicao]),
+            'numero_serie_equipamento': None,
+            'data_ultima_calibracao': None,
+            'data_proxima_calibracao': None,
+            'frequencia_calibracao_anp': None
+        }
+        if equipamentos and aleatorio.random() >= FRACAO_SEM_EQUIPAMENTO:
+            registro['numero_serie_equipamento'] = equipamentos[aleatorio.randrange(len(equipamentos))]
+        if aleatorio.random() >= FRACAO_SEM_DATAS:
+            frequencia = aleatorio.choices(frequencias, pesos_frequencias)[0]
+            # Última calibração em qualquer ponto do ciclo, com atrasos de até 30%
+            ultima = hoje - timedelta(days=aleatorio.randrange(int(frequencia * 1.3)))
+            registro['frequencia_calibracao_anp'] = frequencia
+            registro['data_ultima_calibracao'] = ultima
+            registro['data_proxima_calibracao'] = ultima + timedelta(days=frequencia)
+        yield registro
+
+def gerar_certificados(aleatorio, ids, inicio, quantidade, equipamentos, hoje):
+    """Histórico de certificados espalhado pelos equipamentos e pelos últimos anos"""
+    status = ids[StatusCertificadoIncerteza]
+    pesos_status = pesos_zipf(len(status), 1.5)
+    for numero in range(inicio, inicio + quantidade):
+        yield {
+            'numero_serie_equipamento': equipamentos[aleatorio.randrange(len(equipamentos))],
+            'numero_certificado': f'{PREFIXO}-{numero:08d}',
+            'revisao_certificado': '0',
+            'data_certificado': data_aleatoria(aleatorio, hoje),
+            'status_certificado_id': aleatorio.choices(status, pesos_status)[0]
+        }
+
+def gerar_testes_pocos(aleatorio, ids, inicio, quantidade, hoje):
+    """Testes de poços dos últimos cinco anos"""
+    for numero in range(inicio, inicio + quantidade):
+        data_teste = data_aleatoria(aleatorio, hoje, 5)
+        yield {
+            'instalacao_id': aleatorio.choice(ids[Instalacao]),
+            'poco': f'POCO-{aleatorio.randrange(1, 2000):04d}',
+            'natureza_id': aleatorio.choice(ids[NaturezaTesteAnalise]),
+            'data_teste': data_teste,
+            'numero_btp': f'{PREFIXO}-{numero:08d}',
+            'data_recebimento_btp': data_teste + timedelta(days=aleatorio.randrange(1, 45)),
+            'validacao': aleatorio.random() < 0.8
+        }
+
+def gerar_analises_quimicas(aleatorio, ids, inicio, quantidade, pontos, hoje):
+    """Análises químicas dos últimos cinco anos, ligadas aos pontos gerados"""
+    for numero in range(inicio, inicio + quantidade):
+        data_coleta = data_aleatoria(aleatorio, hoje, 5)
+        yield {
+            'instalacao_id': aleatorio.choice(ids[Instalacao]),
+            'tag_ponto_medicao': pontos[aleatorio.randrange(len(pontos))] if pontos else None,
+            'poco': f'POCO-{aleatorio.randrange(1, 2000):04d}',
+            'natureza_id': aleatorio.choice(ids[NaturezaTesteAnalise]),
+            'data_coleta': data_coleta,
+            'sot': f'{PREFIXO}-{numero:08d}',
+            'data_recebimento_lab': data_coleta + timedelta(days=aleatorio.randrange(1, 30)),
+            'validacao': aleatorio.random() < 0.8
+        }
+
+def gerar_incertezas(aleatorio, ids, inicio, quantidade, hoje):
+    """Relatórios de incerteza dos últimos cinco anos"""
+    for numero in range(inicio, inicio + quantidade):
+        limite_inferior = round(aleatorio.uniform(0.1, 1.0), 2)
+        yield {
+            'sistema_medicao': f'Sistema {aleatorio.randrange(1, 500):03d}',
+            'numero_relatorio': f'{PREFIXO}-{numero:08d}',
+            'data_relatorio': data_aleatoria(aleatorio, hoje, 5),
+            'incerteza_expandida': round(aleatorio.uniform(0.05, 2.0), 3),
+            'status_limite_id': aleatorio.choice(ids[StatusCertificadoIncerteza]),
+            'status_emissao_id': aleatorio.choice(ids[StatusCertificadoIncerteza]),
+            'servico_id': aleatorio.choice(ids[ServicoIncerteza]),
+            'limite_inferior': limite_inferior,
+            'limite_superior': round(limite_inferior + aleatorio.uniform(0.5, 2.0), 2)
+        }
+
+def gerar_dados(totais, semente=42, progresso=None):
+    """Gerar as quantidades pedidas em cada tabela; retorna as linhas inseridas"""
+    aleatorio = random.Random(semente)
+    hoje = date.today()
+    ids = completar_lookups(aleatorio)
+    gerados = {}
+    
+    inicio = proximo_numero(Equipamento.numero_serie)
+    gerados['equipamentos'] = gravar(
+        Equipamento, gerar_equipamentos(aleatorio, ids, inicio, totais['equipamentos']), progresso
+    )
+    equipamentos = db.session.execute(
+        select(Equipamento.numero_serie).where(Equipamento.numero_serie.like(f'{PREFIXO}-%'))
+    ).scalars().all()
+    
+    inicio = proximo_numero(PontoMedicao.tag_ponto_medicao, f'{PREFIXO}-PM-')
+    gerados['pontos_medicao'] = gravar(PontoMedicao, gerar_pontos_medicao(
+        aleatorio, ids, inicio, totais['pontos_medicao'], equipamentos, hoje
+    ), progresso)
+    
+    if equipamentos:
+        inicio = proximo_numero(Certificado.numero_certificado)
+        gerados['certificados'] = gravar(Certificado, gerar_certificados(
+            aleatorio, ids, inicio, totais['certificados'], equipamentos, hoje
+        ), progresso)
+    else:
+        gerados['certificados'] = 0
+    del equipamentos
+    
+    inicio = proximo_numero(TestePoco.numero_btp)
+    gerados['testes_pocos'] = gravar(TestePoco, gerar_testes_pocos(
+        aleatorio, ids, inicio, totais['testes_pocos'], hoje
+    ), progresso)
+    
+    pontos = db.session.execute(
+        select(PontoMedicao.tag_ponto_medicao).where(PontoMedicao.tag_ponto_medicao.like(f'{PREFIXO}-%'))
+    ).scalars().all()
+    inicio = proximo_numero(AnaliseQuimica.sot)
+    gerados['analises_quimicas'] = gravar(AnaliseQuimica, gerar_analises_quimicas(
+        aleatorio, ids, inicio, totais['analises_quimicas'], pontos, hoje
+    ), progresso)
+    del pontos
+    
+    inicio = proximo_numero(Incerteza.numero_relatorio)
+    gerados['incertezas'] = gravar(Incerteza, gerar_incertezas(
+        aleatorio, ids, inicio, totais['incertezas'], hoje
+    ), progresso)
+    
+    # A outbox de eventos recebeu uma linha por inserção: manter só a janela de reconexão
+    remover_eventos_antigos()
+    db.session.commit()
+    
+    return gerados
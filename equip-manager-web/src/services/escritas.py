@@ -0,0 +1,186 @@
+"""Fila única de escritas no SQLite, com commit em grupo.
+
+O SQLite aceita um escritor por vez: com várias threads gravando ao mesmo
+tempo, cada uma disputa o lock do banco e as que esperam demais falham com
+"database is locked". Aqui as rotas validam a requisição na própria thread
+e entregam só a escrita (uma função sem argumentos de sessão, que usa
+db.session) a executar_escrita(). Uma thread escritora por processo
+consome a fila, executa as escritas pendentes em sequência e faz um único
+commit para o lote; cada chamador recebe o resultado (ou a exceção) da sua
+função por um Future.
+
+Se o commit do lote falhar, ele é desfeito e as escritas são refeitas uma
+a uma, para que o erro de uma requisição não derrube as outras. Por isso
+as funções de escrita devem apenas gravar no banco (nada de efeitos fora
+da transação) e receber dados simples, não objetos de outra sessão.
+
+Com vários workers, cada processo tem a sua fila: os escritores dos
+processos ainda disputam o lock, mas em lotes, e o busy_timeout do perfil
+do SQLite cobre a espera. Fora do SQLite em arquivo (ou com FILA_ESCRITA
+desligada) a escrita roda direto na requisição, com commit próprio.
+"""
+import queue
+import threading
+from concurrent.futures import Future
+from flask import current_app
+from sqlalchemy import delete, insert, update
+from src.models.database import db, banco_em_memoria
+
+# Escritas reunidas em um mesmo commit, no máximo
+TAMANHO_MAXIMO_LOTE = 64
+
+# Espera máxima (s) do chamador por uma escrita pequena
+ESPERA_ESCRITA = 60
+
+class EscritaNaoConcluida(TimeoutError):
+    """A espera pela escrita esgotou; 'status' diz se ela ainda pode ser gravada"""
+    status = None
+
+class EscritaCancelada(EscritaNaoConcluida):
+    """A escrita ainda estava na fila e foi cancelada: nada foi gravado"""
+    status = 'cancelada'
+
+class EscritaPendente(EscritaNaoConcluida):
+    """A escrita já está em execução na thread escritora e pode ainda ser gravada"""
+    status = 'pendente'
+
+class FilaEscrita:
+    """Fila de escritas consumida por uma thread escritora do processo"""
+    
+    def __init__(self, app):
+        self.app = app
+        self.fila = queue.Queue()
+        self.thread = None
+        self.trava = threading.Lock()
+        self.lotes = 0
+        self.escritas = 0
+    
+    def enviar(self, funcao, args):
+        """Enfileirar a escrita; retorna o Future com o resultado"""
+        futuro = Future()
+        self.iniciar()
+        self.fila.put((funcao, args, futuro))
+        return futuro
+    
+    def iniciar(self):
+        """Iniciar a thread escritora na primeira escrita (e após um fork do worker)"""
+        with self.trava:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self.executar, name='fila-escrita', daemon=True)
+                self.thread.start()
+    
+    def na_thread_escritora(self):
+        """Se o código corrente já roda na thread escritora"""
+        return threading.current_thread() is self.thread
+    
+    def executar(self):
+        """Laço da thread escritora: esperar uma escrita e juntar as que já estão na fila"""
+        while True:
+            lote = [self.fila.get()]
+            while len(lote) < TAMANHO_MAXIMO_LOTE:
+                try:
+                    lote.append(self.fila.get_nowait())
+                except queue.Empty:
+                    break
+            
+            lote = [item for item in lote if item[2].set_running_or_notify_cancel()]
+            if not lote:
+                continue
+            try:
+                with self.app.app_context():
+                    self.gravar_lote(lote)
+            except Exception as e:
+                # Falha fora das escritas (contexto, conexão): não deixar chamadores esperando
+                for _, _, futuro in lote:
+                    if not futuro.done():
+                        futuro.set_exception(e)
+    
+    def gravar_lote(self, lote):
+        """Executar as escritas do lote com um único commit"""
+        try:
+            resultados = [funcao(*args) for funcao, args, _ in lote]
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            for item in lote:
+                self.gravar_individual(item)
+        else:
+            for (_, _, futuro), resultado in zip(lote, resultados):
+                futuro.set_result(resultado)
+        
+        self.lotes += 1
+        self.escritas += len(lote)
+    
+    def gravar_individual(self, item):
+        """Executar uma escrita com commit próprio, entregando o erro ao chamador"""
+        funcao, args, futuro = item
+        try:
+            resultado = funcao(*args)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            futuro.set_exception(e)
+        else:
+            futuro.set_result(resultado)
+
+def fila_ativa(app):
+    """Se as escritas da aplicação passam pela fila (SQLite em arquivo e FILA_ESCRITA)"""
+    uri = app.config['SQLALCHEMY_DATABASE_URI']
+    return (app.config.get('FILA_ESCRITA', True) and uri.startswith('sqlite')
+            and not banco_em_memoria(uri))
+
+def instalar_fila_escrita(app):
+    """Registrar a fila de escritas da aplicação (a thread só sobe na primeira escrita)"""
+    if fila_ativa(app):
+        app.extensions['fila_escrita'] = FilaEscrita(app)
+
+def executar_escrita(funcao, *args, espera=ESPERA_ESCRITA):
+    """Executar funcao(*args) com commit, pela fila de escritas quando ativa.
+    
+    Retorna o resultado da função ou levanta a exceção dela. espera=None
+    aguarda sem limite (importações grandes). Esgotada a espera, a escrita
+    ainda na fila é cancelada (EscritaCancelada); se já começou, não há
+    como desfazê-la e o chamador recebe EscritaPendente.
+    """
+    fila = current_app.extensions.get('fila_escrita')
+    if fila is None or fila.na_thread_escritora():
+        try:
+            resultado = funcao(*args)
+            db.session.commit()
+            return resultado
+        except Exception:
+            db.session.rollback()
+            raise
+    
+    futuro = fila.enviar(funcao, args)
+    try:
+        return futuro.result(timeout=espera)
+    except TimeoutError:
+        if futuro.cancel():
+            raise EscritaCancelada('Fila de escritas ocupada: nada foi gravado, tente novamente')
+        if futuro.done():
+            # Terminou entre o fim da espera e o cancelamento (ou a própria escrita levantou TimeoutError)
+            return futuro.result()
+        raise EscritaPendente('Escrita em andamento: confira o resultado antes de repetir a operação')
+
+def inserir(modelo, campos):
+    """Escrita: inserir um registro; retorna a chave primária"""
+    return db.session.execute(insert(modelo).values(**campos)).inserted_primary_key[0]
+
+def alterar(modelo, chave, campos):
+    """Escrita: alterar os campos do registro pela chave primária; retorna se ele existia.
+    
+    Modelos com coluna 'versao' têm a versão incrementada.
+    """
+    if not campos:
+        return db.session.get(modelo, chave) is not None
+    coluna = modelo.__mapper__.primary_key[0]
+    if 'versao' in modelo.__table__.c:
+        campos = {**campos, 'versao': modelo.versao + 1}
+    resultado = db.session.execute(update(modelo).where(coluna == chave).values(**campos))
+    return resultado.rowcount > 0
+
+def remover(modelo, chave):
+    """Escrita: excluir o registro pela chave primária; retorna se ele existia"""
+    coluna = modelo.__mapper__.primary_key[0]
+    return db.session.execute(delete(modelo).where(coluna == chave)).rowcount > 0
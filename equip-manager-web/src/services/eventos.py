@@ -0,0 +1,134 @@
+"""Publicação das alterações de dados no canal SSE (/api/eventos/stream).
+
+Gatilhos gravam cada alteração de equipamentos, pontos de medição e
+certificados na tabela 'eventos' (outbox), inclusive as feitas por outros
+processos. O canal é servido por um processo asyncio à parte
+(src/servidor_eventos.py), para que as conexões abertas não prendam as
+threads dos workers: ele lê a outbox a cada INTERVALO_LEITURA segundos com
+as funções deste módulo, monta notificações compactas com os contadores
+atualizados e as entrega às filas dos assinantes, e apara a outbox a cada
+INTERVALO_LIMPEZA segundos.
+"""
+import json
+from datetime import date
+from sqlalchemy import func, select
+from src.models.database import db, Evento, Contador, TABELAS_CONTADAS
+from src.services.calibracao import condicao_status
+from src.services.escritas import executar_escrita
+
+INTERVALO_LEITURA = 1.0
+INTERVALO_HEARTBEAT = 15.0
+
+# Intervalo (s) entre as limpezas da outbox, feitas com ou sem assinantes
+INTERVALO_LIMPEZA = 60.0
+
+# Eventos por leitura acima dos quais as mudanças viram uma notificação agregada
+LIMITE_INDIVIDUAIS = 20
+
+# Eventos mantidos na outbox para reconexões (Last-Event-ID)
+MAX_EVENTOS_RETIDOS = 10000
+
+# Mensagens pendentes por assinante antes de considerá-lo lento
+TAMANHO_FILA = 100
+
+def formatar_mensagem(tipo, dados, id=None):
+    """Mensagem no formato text/event-stream"""
+    linhas = []
+    if id is not None:
+        linhas.append(f'id: {id}')
+    linhas.append(f'event: {tipo}')
+    linhas.append(f"data: {json.dumps(dados, ensure_ascii=False, separators=(',', ':'))}")
+    return '\n'.join(linhas) + '\n\n'
+
+def ultimo_evento():
+    """Id do evento mais recente da outbox"""
+    return db.session.execute(select(func.max(Evento.id))).scalar() or 0
+
+def primeiro_evento():
+    """Id do evento mais antigo ainda retido na outbox"""
+    return db.session.execute(select(func.min(Evento.id))).scalar()
+
+def alertas_calibracao(hoje):
+    """Pontos vencidos e próximos do vencimento, contados em intervalos do índice da data"""
+    vencidos = select(func.count()).where(condicao_status('vencido', hoje)).scalar_subquery()
+    proximos = select(func.count()).where(condicao_status('proximo_vencimento', hoje)).scalar_subquery()
+    linha = db.session.execute(select(vencidos, proximos)).one()
+    return {'vencidos': linha[0], 'proximos_vencimento': linha[1]}
+
+class Contadores:
+    """Contadores enviados nas notificações.
+    
+    Os totais vêm da tabela 'contadores', mantida pelos gatilhos. Os alertas
+    de calibração só são recontados quando o lote lido tem eventos de pontos
+    de medição ou quando o dia muda.
+    """
+    
+    def __init__(self):
+        self.alertas = None
+        self.dia = None
+    
+    def atuais(self, entidades=()):
+        """Contadores após os eventos das 'entidades' informadas"""
+        hoje = date.today()
+        if self.alertas is None or self.dia != hoje or 'pontos_medicao' in entidades:
+            self.alertas = alertas_calibracao(hoje)
+            self.dia = hoje
+        
+        contadores = dict(db.session.execute(
+            select(Contador.chave, Contador.valor).where(Contador.chave.in_(TABELAS_CONTADAS))
+        ).all())
+        contadores.update(self.alertas)
+        return contadores
+
+def notificacoes(apos, contadores=None):
+    """Mensagens para os eventos após o id 'apos' e o id do último evento coberto.
+    
+    Até LIMITE_INDIVIDUAIS eventos geram uma mensagem 'mudanca' cada; acima
+    disso (importações, por exemplo) uma única mensagem 'lote' com a
+    contagem por entidade, calculada no banco.
+    """
+    contadores = contadores or Contadores()
+    eventos = db.session.execute(
+        select(Evento.id, Evento.entidade, Evento.chave, Evento.operacao)
+        .where(Evento.id > apos).order_by(Evento.id).limit(LIMITE_INDIVIDUAIS + 1)
+    ).all()
+    if not eventos:
+        return [], apos
+    
+    if len(eventos) <= LIMITE_INDIVIDUAIS:
+        atuais = contadores.atuais({evento.entidade for evento in eventos})
+        mensagens = [formatar_mensagem('mudanca', {
+            'entidade': evento.entidade,
+            'chave': evento.chave,
+            'operacao': evento.operacao,
+            'contadores': atuais
+        }, evento.id) for evento in eventos]
+        return mensagens, eventos[-1].id
+    
+    ultimo = ultimo_evento()
+    entidades = dict(db.session.execute(
+        select(Evento.entidade, func.count(Evento.id))
+        .where(Evento.id > apos, Evento.id <= ultimo)
+        .group_by(Evento.entidade)
+    ).all())
+    mensagem = formatar_mensagem('lote', {'entidades': entidades, 'contadores': contadores.atuais(entidades)}, ultimo)
+    return [mensagem], ultimo
+
+def remover_eventos_antigos():
+    """Escrita: manter na outbox só os MAX_EVENTOS_RETIDOS eventos mais recentes; retorna os removidos"""
+    limite = ultimo_evento() - MAX_EVENTOS_RETIDOS
+    return db.session.query(Evento).filter(Evento.id <= limite).delete(synchronize_session=False)
+
+def aparar_outbox():
+    """Remover os eventos excedentes pela fila de escritas, só quando existem"""
+    primeiro, ultimo = db.session.execute(select(func.min(Evento.id), func.max(Evento.id))).one()
+    if primeiro is not None and primeiro <= ultimo - MAX_EVENTOS_RETIDOS:
+        executar_escrita(remover_eventos_antigos)
+
+def mensagens_pendentes(apos):
+    """Mensagens perdidas desde o Last-Event-ID informado na reconexão"""
+    primeiro = primeiro_evento()
+    if primeiro is not None and apos < primeiro - 1:
+        # Eventos já removidos da outbox: o cliente deve recarregar tudo
+        return [formatar_mensagem('resync', {})]
+    return notificacoes(apos)[0]
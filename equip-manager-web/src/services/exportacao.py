@@ -0,0 +1,224 @@
+"""Exportação em fluxo nos formatos CSV, JSON Lines ou Excel.
+
+As linhas são lidas do banco em lotes (yield_per) e escritas à medida que
+chegam, então a memória não cresce com o tamanho da tabela. No PostgreSQL
+a leitura usa um cursor do lado do servidor (cursor nomeado do psycopg2),
+e o banco também não envia o resultado inteiro de uma vez. CSV e JSON
+Lines são enviados ao cliente enquanto são produzidos; o Excel é gravado
+no modo write-only do openpyxl em um arquivo temporário e enviado em
+blocos ao final, porque o formato .xlsx é um ZIP que só fica completo no
+fechamento.
+
+Os pontos de medição saem com duas colunas de sincronização no fim
+(ocultas no Excel): '_versao', a versão do registro no banco, e '_hash',
+o hash do conteúdo das demais colunas. Na reimportação da planilha, as
+linhas com o mesmo hash não mudaram e nem chegam ao banco, e uma versão
+diferente da atual indica que o registro foi alterado depois da exportação.
+"""
+import csv
+import hashlib
+import io
+import json
+import os
+import tempfile
+from datetime import date, datetime
+from flask import Response, stream_with_context
+from src.models.database import (
+    Equipamento, PontoMedicao, Fabricante, TipoEquipamento, Unidade, Polo,
+    ClassificacaoPontoMedicao
+)
+from src.services.serializadores import projetar
+
+# Linhas por lote lido do banco e bytes por bloco enviado
+TAMANHO_LOTE = 1000
+TAMANHO_BLOCO = 64 * 1024
+
+# Formato -> (mimetype, extensão)
+FORMATOS = {
+    'csv': ('text/csv', 'csv'),
+    'jsonl': ('application/x-ndjson', 'jsonl'),
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx')
+}
+
+class FormatoInvalido(ValueError):
+    """Formato de exportação não suportado"""
+
+# Colunas de sincronização acrescentadas ao fim das exportações reimportáveis
+COLUNA_VERSAO = '_versao'
+COLUNA_HASH = '_hash'
+
+# Colunas exportadas: (chave no JSON Lines, cabeçalho no CSV/Excel, coluna)
+COLUNAS_EXPORTACAO_EQUIPAMENTOS = [
+    ('numero_serie', 'Número de Série', Equipamento.numero_serie),
+    ('tag_equipamento', 'TAG Equipamento', Equipamento.tag_equipamento),
+    ('nome_equipamento', 'Nome Equipamento', Equipamento.nome_equipamento),
+    ('fabricante', 'Fabricante', Fabricante.nome),
+    ('tipo_equipamento', 'Tipo Equipamento', TipoEquipamento.nome),
+    ('unidade', 'Unidade', Unidade.nome),
+    ('resolucao', 'Resolução', Equipamento.resolucao),
+    ('faixa_minima_equipamento', 'Faixa Mínima', Equipamento.faixa_minima_equipamento),
+    ('faixa_maxima_equipamento', 'Faixa Máxima', Equipamento.faixa_maxima_equipamento)
+]
+
+COLUNAS_EXPORTACAO_PONTOS_MEDICAO = [
+    ('tag_ponto_medicao', 'TAG Ponto Medição', PontoMedicao.tag_ponto_medicao),
+    ('nome_ponto_medicao', 'Nome Ponto Medição', PontoMedicao.nome_ponto_medicao),
+    ('polo', 'Polo', Polo.nome),
+    ('classificacao', 'Classificação', ClassificacaoPontoMedicao.nome),
+    ('numero_serie_equipamento', 'Número Série Equipamento', PontoMedicao.numero_serie_equipamento),
+    ('data_ultima_calibracao', 'Data Última Calibração', PontoMedicao.data_ultima_calibracao),
+    ('data_proxima_calibracao', 'Data Próxima Calibração', PontoMedicao.data_proxima_calibracao),
+    ('frequencia_calibracao_anp', 'Frequência Calibração ANP (dias)', PontoMedicao.frequencia_calibracao_anp)
+]
+
+# Tipo -> (modelo, colunas, junções, ordenação, nome da planilha)
+EXPORTACOES = {
+    'equipamentos': (
+        Equipamento, COLUNAS_EXPORTACAO_EQUIPAMENTOS,
+        [
+            (Fabricante, Equipamento.fabricante_id == Fabricante.id),
+            (TipoEquipamento, Equipamento.tipo_equipamento_id == TipoEquipamento.id),
+            (Unidade, Equipamento.unidade_id == Unidade.id)
+        ],
+        Equipamento.numero_serie, 'Equipamentos'
+    ),
+    'pontos_medicao': (
+        PontoMedicao, COLUNAS_EXPORTACAO_PONTOS_MEDICAO,
+        [
+            (Polo, PontoMedicao.polo_id == Polo.id),
+            (ClassificacaoPontoMedicao, PontoMedicao.classificacao_id == ClassificacaoPontoMedicao.id)
+        ],
+        PontoMedicao.id, 'Pontos de Medição'
+    )
+}
+
+# Tipo -> coluna de versão (exportado com '_versao' e '_hash')
+SINCRONIZACAO = {
+    'pontos_medicao': PontoMedicao.versao
+}
+
+def valor_canonico(valor):
+    """Texto do valor para o hash, igual para o que vem do banco e da planilha relida"""
+    if valor is None or valor != valor:  # None ou NaN (célula vazia no pandas)
+        return ''
+    if isinstance(valor, datetime):
+        return valor.date().isoformat()
+    if isinstance(valor, date):
+        return valor.isoformat()
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    return str(valor).strip()
+
+def hash_linha(valores):
+    """Hash do conteúdo de uma linha (valores das colunas exportadas, na ordem)"""
+    texto = '\x1f'.join(valor_canonico(valor) for valor in valores)
+    return hashlib.blake2b(texto.encode('utf-8'), digest_size=8).hexdigest()
+
+def com_hash(registros):
+    """Acrescentar a cada linha (conteúdo + versão) o hash do conteúdo"""
+    for linha in registros:
+        yield (*linha, hash_linha(linha[:-1]))
+
+def linhas(query):
+    """Iterar a consulta em lotes, sem carregar o resultado inteiro (cursor do servidor)"""
+    return query.execution_options(stream_results=True).yield_per(TAMANHO_LOTE)
+
+def gerar_csv(registros, cabecalhos):
+    """Gerar o CSV em blocos (com BOM, para o Excel reconhecer UTF-8)"""
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    
+    buffer.write('\ufeff')
+    escritor.writerow(cabecalhos)
+    yield buffer.getvalue().encode('utf-8')
+    buffer.seek(0)
+    buffer.truncate(0)
+    
+    for linha in registros:
+        escritor.writerow(linha)
+        if buffer.tell() >= TAMANHO_BLOCO:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate(0)
+    
+    yield buffer.getvalue().encode('utf-8')
+
+def gerar_jsonl(registros, chaves):
+    """Gerar um objeto JSON por linha, agrupados em blocos"""
+    bloco = []
+    tamanho = 0
+    
+    for linha in registros:
+        texto = json.dumps(dict(zip(chaves, linha)), ensure_ascii=False, default=str) + '\n'
+        bloco.append(texto)
+        tamanho += len(texto)
+        if tamanho >= TAMANHO_BLOCO:
+            yield ''.join(bloco).encode('utf-8')
+            bloco = []
+            tamanho = 0
+    
+    yield ''.join(bloco).encode('utf-8')
+
+def gerar_xlsx(registros, cabecalhos, titulo):
+    """Gravar o Excel em modo write-only num arquivo temporário e enviá-lo em blocos"""
+    from openpyxl import Workbook
+    from openpyxl.utils import get_column_letter
+    
+    livro = Workbook(write_only=True)
+    planilha = livro.create_sheet(titulo)
+    # Colunas de sincronização ficam ocultas
+    for indice, cabecalho in enumerate(cabecalhos, start=1):
+        if cabecalho in (COLUNA_VERSAO, COLUNA_HASH):
+            planilha.column_dimensions[get_column_letter(indice)].hidden = True
+    planilha.append(cabecalhos)
+    for linha in registros:
+        planilha.append(list(linha))
+    
+    descritor, caminho = tempfile.mkstemp(prefix='exportacao_', suffix='.xlsx')
+    os.close(descritor)
+    try:
+        livro.save(caminho)
+        with open(caminho, 'rb') as arquivo:
+            while True:
+                bloco = arquivo.read(TAMANHO_BLOCO)
+                if not bloco:
+                    break
+                yield bloco
+    finally:
+        os.remove(caminho)
+
+def resposta_exportacao(tipo, formato):
+    """Resposta em fluxo com a exportação do tipo no formato pedido"""
+    if formato not in FORMATOS:
+        raise FormatoInvalido(f"Formato inválido: {formato}. Use {', '.join(FORMATOS)}")
+    
+    modelo, colunas, juncoes, ordem, titulo = EXPORTACOES[tipo]
+    if tipo in SINCRONIZACAO:
+        colunas = colunas + [(COLUNA_VERSAO, COLUNA_VERSAO, SINCRONIZACAO[tipo])]
+    query = projetar(
+        modelo, {chave: coluna for chave, _, coluna in colunas}, juncoes
+    ).order_by(ordem)
+    
+    registros = linhas(query)
+    chaves = [chave for chave, _, _ in colunas]
+    cabecalhos = [cabecalho for _, cabecalho, _ in colunas]
+    if tipo in SINCRONIZACAO:
+        registros = com_hash(registros)
+        chaves.append(COLUNA_HASH)
+        cabecalhos.append(COLUNA_HASH)
+    
+    if formato == 'csv':
+        gerador = gerar_csv(registros, cabecalhos)
+    elif formato == 'jsonl':
+        gerador = gerar_jsonl(registros, chaves)
+    else:
+        gerador = gerar_xlsx(registros, cabecalhos, titulo)
+    
+    mimetype, extensao = FORMATOS[formato]
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    
+    return Response(
+        stream_with_context(gerador),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename={tipo}_{timestamp}.{extensao}'}
+    )
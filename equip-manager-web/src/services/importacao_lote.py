@@ -0,0 +1,253 @@
+"""Importação de várias planilhas de uma vez (vários arquivos ou um ZIP).
+
+Ler e validar uma planilha (pd.read_excel e preparar_*) ocupa a CPU e
+segura o GIL, então cada arquivo é preparado em um processo de um pool
+compartilhado. Os lotes validados são reunidos na ordem dos arquivos,
+chaves repetidas entre arquivos são rejeitadas como na planilha única e
+tudo é gravado em uma só escrita pela fila de escritas, com um relatório
+de erros consolidado ('arquivo: Linha N: ...').
+
+Os ZIPs são conferidos antes da extração: o total de entradas e o tamanho
+descompactado das planilhas (somados entre os ZIPs do envio) são limitados
+por MAX_MEMBROS_ZIP e MAX_TAMANHO_ZIP. Planilhas que não podem ser lidas,
+ou sem nenhuma coluna do modelo, aparecem no relatório como ilegíveis.
+
+Durante a junção, as linhas de cada arquivo são renumeradas em sequência
+(deslocadas pelo total de linhas dos arquivos anteriores), e o relatório
+converte de volta para arquivo e linha.
+"""
+import bisect
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import pandas as pd
+from flask import current_app
+from src.services.escritas import executar_escrita
+from src.services.uploads import UploadInvalido
+from src.services.importador import (
+    IMPORTACOES, MODO_PADRAO, ler_planilha, campos_planilha, duplicados, registrar,
+    somar_contagens, relatorio
+)
+
+EXTENSOES_PLANILHA = ('.xlsx', '.xls', '.csv')
+
+# Chaves únicas conferidas entre os arquivos, em ordem: (campo, mensagem)
+CHAVES_LOTE = {
+    'equipamentos': (
+        ('numero_serie', 'Equipamento {} já existe'),
+        ('tag_equipamento', 'TAG {} já existe')
+    ),
+    'pontos_medicao': (
+        ('tag_ponto_medicao', 'Ponto {} já existe'),
+    )
+}
+
+# Pool de processos do worker, criado na primeira importação em lote
+_pool = None
+_trava = threading.Lock()
+
+# Vezes que as planilhas são enviadas ao pool quando um processo dele morre
+TENTATIVAS_POOL = 2
+
+def pool_processos(processos):
+    """Pool de processos compartilhado (spawn: sem herdar threads e conexões do worker)"""
+    global _pool
+    with _trava:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=processos, mp_context=multiprocessing.get_context('spawn')
+            )
+        return _pool
+
+def descartar_pool(pool):
+    """Descartar um pool quebrado (um processo morreu): o próximo pedido cria outro"""
+    global _pool
+    with _trava:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def preparar_arquivo(tipo, caminho):
+    """Ler e validar uma planilha (roda em um processo do pool);
+    retorna (dados aceitos, erros, campos da planilha, linhas)"""
+    df = ler_planilha(caminho)
+    campos = campos_planilha(tipo, df)
+    if not campos:
+        # Texto qualquer com extensão .csv vira um DataFrame sem nenhuma coluna conhecida
+        raise ValueError('nenhuma coluna da planilha modelo encontrada')
+    dados, erros = IMPORTACOES[tipo][0](df)
+    return dados, erros, campos, len(df)
+
+def nome_de_planilha(nome):
+    """Se o nome é de uma planilha aceita (fora pastas ocultas e metadados do macOS)"""
+    base = os.path.basename(nome)
+    return (nome.lower().endswith(EXTENSOES_PLANILHA) and not base.startswith(('.', '~$'))
+            and '__MACOSX' not in nome)
+
+def conferir_zip(pacote, nome, membros, tamanho):
+    """Somar as entradas e o tamanho descompactado das planilhas do ZIP aos totais do envio;
+    UploadInvalido acima de MAX_MEMBROS_ZIP ou MAX_TAMANHO_ZIP (antes de extrair qualquer coisa)"""
+    entradas = pacote.infolist()
+    membros += len(entradas)
+    tamanho += sum(membro.file_size for membro in entradas if nome_de_planilha(membro.filename))
+    if membros > current_app.config['MAX_MEMBROS_ZIP']:
+        raise UploadInvalido(
+            f'{nome}: mais de {current_app.config["MAX_MEMBROS_ZIP"]} arquivos nos ZIPs enviados'
+        )
+    if tamanho > current_app.config['MAX_TAMANHO_ZIP']:
+        raise UploadInvalido(
+            f'{nome}: planilhas descompactadas somam mais de {current_app.config["MAX_TAMANHO_ZIP"]} bytes'
+        )
+    return membros, tamanho
+
+def salvar_planilhas(arquivos, pasta):
+    """Gravar na pasta as planilhas enviadas, abrindo os ZIPs; retorna [(nome, caminho)] na ordem do envio"""
+    planilhas = []
+    membros = tamanho = 0
+    
+    def destino(nome):
+        return os.path.join(pasta, f'{len(planilhas):05d}{os.path.splitext(nome)[1].lower()}')
+    
+    for arquivo in arquivos:
+        if not arquivo.filename.lower().endswith('.zip'):
+            caminho = destino(arquivo.filename)
+            arquivo.save(caminho)
+            planilhas.append((arquivo.filename, caminho))
+            continue
+        
+        try:
+            with zipfile.ZipFile(arquivo.stream) as pacote:
+                membros, tamanho = conferir_zip(pacote, arquivo.filename, membros, tamanho)
+                for membro in pacote.infolist():
+                    if membro.is_dir() or not nome_de_planilha(membro.filename):
+                        continue
+                    caminho = destino(membro.filename)
+                    with pacote.open(membro) as origem, open(caminho, 'wb') as saida:
+                        shutil.copyfileobj(origem, saida)
+                    planilhas.append((f'{arquivo.filename}/{membro.filename}', caminho))
+        except zipfile.BadZipFile:
+            raise UploadInvalido(f'Arquivo ZIP inválido: {arquivo.filename}')
+    
+    if not planilhas:
+        raise UploadInvalido('Nenhuma planilha .xlsx, .xls ou .csv enviada')
+    return planilhas
+
+def descartar_repetidos(tipo, lotes, erros):
+    """Rejeitar chaves repetidas entre arquivos (a primeira ocorrência, na ordem dos arquivos, é mantida)"""
+    todos = pd.concat([dados for dados, _ in lotes], ignore_index=True)
+    for campo, mensagem in CHAVES_LOTE[tipo]:
+        repetido = duplicados(todos[campo])
+        registrar(erros, todos['_linha'], repetido, mensagem, todos[campo])
+        todos = todos[~repetido]
+    
+    aceitas = set(todos['_linha'])
+    return [(dados[dados['_linha'].isin(aceitas)], campos) for dados, campos in lotes]
+
+def agrupar(lotes):
+    """Juntar arquivos seguidos com as mesmas colunas (o upsert altera só as colunas presentes)"""
+    grupos = []
+    for dados, campos in lotes:
+        if grupos and grupos[-1][1] == campos:
+            grupos[-1][0].append(dados)
+        else:
+            grupos.append(([dados], campos))
+    return [(pd.concat(partes, ignore_index=True), list(campos)) for partes, campos in grupos]
+
+def gravar_lote(tipo, grupos, erros, modo):
+    """Escrita: gravar os grupos validados em ordem; retorna (contagem, erros)"""
+    erros = list(erros)
+    gravar = IMPORTACOES[tipo][1]
+    contagem = {'inseridos': 0, 'atualizados': 0, 'inalterados': 0}
+    for dados, campos in grupos:
+        somar_contagens(contagem, gravar(dados, erros, modo, campos))
+    return contagem, erros
+
+def preparar_planilhas(tipo, caminhos, processos):
+    """Preparar as planilhas no pool; retorna, na ordem, o resultado de preparar_arquivo
+    ou a exceção de cada arquivo.
+    
+    Se um processo do pool morre (falta de memória, por exemplo), o pool fica
+    quebrado e todos os pedidos pendentes falham com BrokenProcessPool: ele é
+    descartado e os arquivos sem resultado vão para um pool novo, até
+    TENTATIVAS_POOL vezes.
+    """
+    resultados = [None] * len(caminhos)
+    pendentes = list(range(len(caminhos)))
+    for _ in range(TENTATIVAS_POOL):
+        pool = pool_processos(processos)
+        quebrados = []
+        try:
+            futuros = [(indice, pool.submit(preparar_arquivo, tipo, caminhos[indice])) for indice in pendentes]
+        except BrokenProcessPool as e:
+            futuros = []
+            quebrados = pendentes
+            for indice in pendentes:
+                resultados[indice] = e
+        
+        for indice, futuro in futuros:
+            try:
+                resultados[indice] = futuro.result()
+            except BrokenProcessPool as e:
+                resultados[indice] = e
+                quebrados.append(indice)
+            except Exception as e:
+                resultados[indice] = e
+        
+        if not quebrados:
+            break
+        descartar_pool(pool)
+        pendentes = quebrados
+    return resultados
+
+def arquivo_da_linha(bases, linha):
+    """Índice do arquivo de uma linha renumerada (a linha N do arquivo i é bases[i] + N)"""
+    return bisect.bisect_right(bases, linha - 2) - 1
+
+def importar_lote(tipo, arquivos, modo=MODO_PADRAO, processos=None):
+    """Preparar as planilhas em paralelo e gravá-las em uma escrita; retorna o relatório
+    consolidado, com o resumo por arquivo em 'arquivos'"""
+    with tempfile.TemporaryDirectory(prefix='importacao_lote_') as pasta:
+        planilhas = salvar_planilhas(arquivos, pasta)
+        resultados = preparar_planilhas(
+            tipo, [caminho for _, caminho in planilhas], processos or os.cpu_count()
+        )
+        
+        bases, lotes, erros, resumo = [], [], [], []
+        base = 0
+        for (nome, _), resultado in zip(planilhas, resultados):
+            bases.append(base)
+            if isinstance(resultado, Exception):
+                resumo.append({'arquivo': nome, 'linhas': 0, 'mensagem': f'Planilha ilegível: {resultado}'})
+                continue
+            
+            dados, erros_arquivo, campos, linhas = resultado
+            lotes.append((dados.assign(_linha=dados['_linha'] + base), tuple(campos)))
+            erros.extend((linha + base, mensagem) for linha, mensagem in erros_arquivo)
+            resumo.append({'arquivo': nome, 'linhas': linhas, 'mensagem': None})
+            base += linhas
+    
+    contagem = {'inseridos': 0, 'atualizados': 0, 'inalterados': 0}
+    if lotes:
+        grupos = agrupar(descartar_repetidos(tipo, lotes, erros))
+        contagem, erros = executar_escrita(gravar_lote, tipo, grupos, erros, modo, espera=None)
+    
+    erros_por_arquivo = [0] * len(resumo)
+    mensagens = []
+    for linha, mensagem in sorted(erros, key=lambda e: e[0]):
+        indice = arquivo_da_linha(bases, linha)
+        erros_por_arquivo[indice] += 1
+        mensagens.append(f'{resumo[indice]["arquivo"]}: Linha {linha - bases[indice]}: {mensagem}')
+    
+    resultado = relatorio(contagem, erros)
+    resultado['erros'] = [
+        f'{item["arquivo"]}: {item["mensagem"]}' for item in resumo if item['mensagem']
+    ] + mensagens
+    for item, quantidade in zip(resumo, erros_por_arquivo):
+        item['erros'] = quantidade
+    resultado['arquivos'] = resumo
+    return resultado
@@ -0,0 +1,648 @@
+"""Importação de planilhas em lote.
+
+Cada importação tem duas etapas: ``preparar_*`` valida o DataFrame com
+operações vetorizadas do pandas, sem acessar o banco, e ``gravar_*``
+consulta de uma vez as chaves já existentes e os lookups, cria os lookups
+que faltam em um único INSERT e insere as linhas aceitas em lotes
+(executemany; no PostgreSQL, COPY ... FROM STDIN). Os erros são mantidos
+por linha da planilha.
+
+O modo define o que acontece com linhas cuja chave (número de série ou TAG
+do ponto) já existe no banco: 'insert' as rejeita como erro, 'skip' as
+ignora e 'upsert' as atualiza com INSERT ... ON CONFLICT DO UPDATE em
+lotes, alterando só as colunas presentes na planilha e só nas linhas em
+que algum valor muda.
+
+Planilhas exportadas de pontos de medição trazem '_versao' e '_hash' (ver
+exportacao): as linhas com o hash da exportação são contadas como
+inalteradas sem consultar o banco; as alteradas são atualizações, desde
+que o registro ainda esteja na versão exportada (senão é um conflito).
+
+Arquivos enviados são lidos em partes de TAMANHO_PARTE linhas (openpyxl em
+modo somente leitura para .xlsx, read_csv em blocos para .csv), e cada
+parte é validada e gravada com commit próprio: a memória não cresce com o
+tamanho do arquivo e uma falha no fim dele não desfaz as partes já
+gravadas. Chaves repetidas em partes diferentes são tratadas como chaves
+já existentes no banco.
+"""
+import io
+import itertools
+import os
+import pandas as pd
+from sqlalchemy import insert, or_, select
+from sqlalchemy.dialects import postgresql, sqlite
+from src.models.database import (
+    db, Equipamento, PontoMedicao, Fabricante, TipoEquipamento, Polo,
+    ClassificacaoPontoMedicao, converter_data
+)
+from src.services.cache_configuracoes import incrementar_versao_configuracao
+from src.services.escritas import executar_escrita
+from src.services.exportacao import (
+    EXPORTACOES, SINCRONIZACAO, COLUNA_HASH, COLUNA_VERSAO, hash_linha
+)
+from src.services.uploads import UploadInvalido
+
+# Linhas por INSERT em lote e valores por cláusula IN
+TAMANHO_LOTE = 1000
+TAMANHO_CONSULTA = 500
+
+# Linhas por COPY no PostgreSQL
+TAMANHO_LOTE_COPY = 10000
+
+# Linhas lidas, validadas e gravadas (com commit) por vez na leitura em partes
+TAMANHO_PARTE = 20000
+
+MODOS_IMPORTACAO = ('insert', 'skip', 'upsert')
+MODO_PADRAO = 'insert'
+
+# Nomes de coluna aceitos na planilha de equipamentos
+COLUNAS_EQUIPAMENTO = {
+    'numero_serie': ['número de série', 'numero_serie', 'serial_number'],
+    'tag_equipamento': ['tag equipamento', 'tag_equipamento', 'tag'],
+    'nome_equipamento': ['nome equipamento', 'nome_equipamento', 'equipment_name'],
+    'fabricante': ['fabricante', 'marca', 'manufacturer'],
+    'tipo_equipamento': ['tipo equipamento', 'tipo_equipamento', 'equipment_type']
+}
+
+# (os segundos nomes são os cabeçalhos da exportação, para reimportar a planilha exportada)
+COLUNAS_PONTO_MEDICAO = {
+    'tag_ponto_medicao': ['tag_ponto_medicao', 'tag ponto medição'],
+    'nome_ponto_medicao': ['nome_ponto_medicao', 'nome ponto medição'],
+    'polo': ['polo'],
+    'classificacao': ['classificacao', 'classificação'],
+    'numero_serie_equipamento': ['numero_serie_equipamento', 'número série equipamento'],
+    'data_ultima_calibracao': ['data_ultima_calibracao', 'data última calibração'],
+    'data_proxima_calibracao': ['data_proxima_calibracao', 'data próxima calibração'],
+    'frequencia_calibracao_anp': ['frequencia_calibracao_anp', 'frequência calibração anp (dias)']
+}
+
+# Coluna de nome na planilha -> (modelo do lookup, chave estrangeira)
+LOOKUPS_EQUIPAMENTO = {
+    'fabricante': (Fabricante, 'fabricante_id'),
+    'tipo_equipamento': (TipoEquipamento, 'tipo_equipamento_id')
+}
+
+LOOKUPS_PONTO_MEDICAO = {
+    'polo': (Polo, 'polo_id'),
+    'classificacao': (ClassificacaoPontoMedicao, 'classificacao_id')
+}
+
+def extensao(nome):
+    """Extensão do arquivo em minúsculas ('.xlsx', '.csv', ...)"""
+    return os.path.splitext(nome)[1].lower()
+
+def ler_csv(arquivo, **opcoes):
+    """Ler CSV como texto (zeros à esquerda preservados), aceitando o BOM das exportações"""
+    return pd.read_csv(arquivo, dtype=str, encoding='utf-8-sig', **opcoes)
+
+def ler_planilha(arquivo, nome=None):
+    """Ler a planilha Excel (ou CSV) inteira com nomes de coluna normalizados"""
+    nome = nome or getattr(arquivo, 'filename', None) or str(arquivo)
+    if extensao(nome) == '.csv':
+        return normalizar_colunas(ler_csv(arquivo))
+    return normalizar_colunas(pd.read_excel(arquivo))
+
+def partes_xlsx(arquivo, tamanho, informar_total=None):
+    """Partes de uma planilha .xlsx lida com openpyxl em modo somente leitura"""
+    from openpyxl import load_workbook
+    
+    livro = load_workbook(arquivo, read_only=True, data_only=True)
+    try:
+        planilha = livro.active
+        if informar_total and planilha.max_row:
+            informar_total(planilha.max_row - 1)
+        linhas = planilha.iter_rows(values_only=True)
+        cabecalho = next(linhas, None)
+        if cabecalho is None:
+            return
+        colunas = [
+            f'unnamed: {posicao}' if nome is None else nome
+            for posicao, nome in enumerate(cabecalho)
+        ]
+        
+        inicio = 0
+        while True:
+            bloco = list(itertools.islice(linhas, tamanho))
+            if not bloco:
+                break
+            # Linhas do modo somente leitura podem vir com menos células que o cabeçalho
+            df = pd.DataFrame.from_records(
+                [(linha + (None,) * len(colunas))[:len(colunas)] for linha in bloco], columns=colunas,
+                index=pd.RangeIndex(inicio, inicio + len(bloco))
+            )
+            inicio += len(bloco)
+            # Linhas totalmente vazias (formatação até o fim da planilha) não são dados
+            df = df.dropna(how='all')
+            if len(df):
+                yield normalizar_colunas(df)
+    finally:
+        livro.close()
+
+def ler_partes(arquivo, nome, tamanho=TAMANHO_PARTE, informar_total=None):
+    """DataFrames de até 'tamanho' linhas, com colunas normalizadas e o índice na
+    posição da linha entre os dados (0 = linha 2 da planilha).
+    
+    informar_total(linhas) recebe o total de linhas quando ele é conhecido
+    sem ler o arquivo inteiro. Arquivos .xls (sem leitura em modo somente
+    leitura) são lidos inteiros e divididos.
+    """
+    tipo_arquivo = extensao(nome)
+    if tipo_arquivo == '.csv':
+        for df in ler_csv(arquivo, chunksize=tamanho):
+            yield normalizar_colunas(df)
+    elif tipo_arquivo == '.xls':
+        df = ler_planilha(arquivo, nome)
+        if informar_total:
+            informar_total(len(df))
+        for inicio in range(0, len(df), tamanho):
+            yield df.iloc[inicio:inicio + tamanho]
+    else:
+        yield from partes_xlsx(arquivo, tamanho, informar_total)
+
+def normalizar_colunas(df):
+    """Colunas em minúsculas e sem espaços nas bordas"""
+    df.columns = df.columns.astype(str).str.lower().str.strip()
+    return df
+
+def texto(serie):
+    """Valores como texto sem espaços nas bordas; ausentes e vazios viram None"""
+    resultado = pd.Series(None, index=serie.index, dtype=object)
+    presentes = serie.notna()
+    resultado[presentes] = serie[presentes].astype(str).str.strip()
+    return resultado.where(resultado != '', None)
+
+def coluna_presente(df, nomes):
+    """Primeiro dos nomes aceitos que está na planilha (ou None)"""
+    return next((nome for nome in nomes if nome in df.columns), None)
+
+def coluna(df, nomes, coalescer=False):
+    """Texto da primeira coluna presente entre os nomes aceitos.
+    
+    Com coalescer, cada linha usa o primeiro nome que tiver valor preenchido.
+    """
+    presentes = [nome for nome in nomes if nome in df.columns]
+    if not presentes:
+        return pd.Series(None, index=df.index, dtype=object)
+    
+    valores = texto(df[presentes[0]])
+    if coalescer:
+        for nome in presentes[1:]:
+            valores = valores.where(valores.notna(), texto(df[nome]))
+    return valores
+
+def datas(serie, mensagens):
+    """Converter datas (cada valor distinto uma vez); inválidas vão para mensagens"""
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie.dt.date.astype(object).where(serie.notna(), None), pd.Series(False, index=serie.index)
+    
+    convertidas = {}
+    for valor in serie.dropna().unique():
+        try:
+            convertidas[valor] = converter_data(valor)
+        except ValueError as e:
+            mensagens[valor] = str(e)
+    
+    invalidas = serie.isin(list(mensagens))
+    resultado = serie.map(convertidas).astype(object)
+    return resultado.where(serie.notna() & ~invalidas, None), invalidas
+
+def registrar(erros, linhas, mascara, mensagem, valores=None):
+    """Acrescentar (linha, mensagem) para as linhas marcadas na máscara"""
+    if not mascara.any():
+        return
+    if valores is None:
+        erros.extend((linha, mensagem) for linha in linhas[mascara])
+    else:
+        erros.extend(
+            (linha, mensagem.format(valor))
+            for linha, valor in zip(linhas[mascara], valores[mascara])
+        )
+
+def duplicados(serie):
+    """Valores preenchidos repetidos na planilha (a primeira ocorrência é mantida)"""
+    return serie.notna() & serie.duplicated()
+
+def preparar_equipamentos(df):
+    """Validar a planilha de equipamentos; retorna (dados aceitos, erros)"""
+    linhas = pd.Series(df.index + 2, index=df.index)
+    erros = []
+    
+    numero_serie = coluna(df, COLUNAS_EQUIPAMENTO['numero_serie'])
+    tag = coluna(df, COLUNAS_EQUIPAMENTO['tag_equipamento'])
+    nome = coluna(df, COLUNAS_EQUIPAMENTO['nome_equipamento'])
+    
+    sem_serie = numero_serie.isna()
+    registrar(erros, linhas, sem_serie, 'Número de série obrigatório')
+    
+    repetido = duplicados(numero_serie)
+    registrar(erros, linhas, repetido, 'Equipamento {} já existe', numero_serie)
+    
+    tag_repetida = duplicados(tag) & ~(sem_serie | repetido)
+    registrar(erros, linhas, tag_repetida, 'TAG {} já existe', tag)
+    
+    dados = pd.DataFrame({
+        '_linha': linhas,
+        'numero_serie': numero_serie,
+        'tag_equipamento': tag,
+        'nome_equipamento': nome.where(nome.notna(), 'Equipamento ' + numero_serie.fillna('')),
+        'fabricante': coluna(df, COLUNAS_EQUIPAMENTO['fabricante'], coalescer=True),
+        'tipo_equipamento': coluna(df, COLUNAS_EQUIPAMENTO['tipo_equipamento'], coalescer=True)
+    })
+    return dados[~(sem_serie | repetido | tag_repetida)], erros
+
+def preparar_pontos_medicao(df):
+    """Validar a planilha de pontos de medição; retorna (dados aceitos, erros)"""
+    linhas = pd.Series(df.index + 2, index=df.index)
+    erros = []
+    
+    tag = coluna(df, COLUNAS_PONTO_MEDICAO['tag_ponto_medicao'])
+    nome = coluna(df, COLUNAS_PONTO_MEDICAO['nome_ponto_medicao'])
+    
+    sem_tag = tag.isna()
+    registrar(erros, linhas, sem_tag, 'TAG do ponto obrigatória')
+    
+    repetido = duplicados(tag)
+    registrar(erros, linhas, repetido, 'Ponto {} já existe', tag)
+    rejeitado = sem_tag | repetido
+    
+    dados = pd.DataFrame({
+        '_linha': linhas,
+        'tag_ponto_medicao': tag,
+        'nome_ponto_medicao': nome.where(nome.notna(), 'Ponto ' + tag.fillna('')),
+        'polo': coluna(df, COLUNAS_PONTO_MEDICAO['polo']),
+        'classificacao': coluna(df, COLUNAS_PONTO_MEDICAO['classificacao']),
+        'numero_serie_equipamento': coluna(df, COLUNAS_PONTO_MEDICAO['numero_serie_equipamento'])
+    })
+    
+    for campo in ('data_ultima_calibracao', 'data_proxima_calibracao'):
+        nome_coluna = coluna_presente(df, COLUNAS_PONTO_MEDICAO[campo])
+        if nome_coluna is None:
+            dados[campo] = None
+            continue
+        mensagens = {}
+        dados[campo], invalidas = datas(df[nome_coluna], mensagens)
+        invalidas &= ~rejeitado
+        registrar(erros, linhas, invalidas, '{}', df[nome_coluna].map(mensagens))
+        rejeitado |= invalidas
+    
+    dados['frequencia_calibracao_anp'] = None
+    nome_coluna = coluna_presente(df, COLUNAS_PONTO_MEDICAO['frequencia_calibracao_anp'])
+    if nome_coluna is not None:
+        bruta = df[nome_coluna]
+        numeros = pd.to_numeric(bruta, errors='coerce')
+        invalidas = bruta.notna() & numeros.isna() & ~rejeitado
+        registrar(erros, linhas, invalidas, 'Frequência de calibração inválida: {}', bruta)
+        rejeitado |= invalidas
+        validas = numeros.notna()
+        dados.loc[validas, 'frequencia_calibracao_anp'] = [int(n) for n in numeros[validas]]
+    
+    # Planilha exportada: colunas de sincronização
+    if COLUNA_HASH in df.columns and COLUNA_VERSAO in df.columns:
+        dados[COLUNA_HASH] = texto(df[COLUNA_HASH])
+        dados[COLUNA_VERSAO] = pd.to_numeric(df[COLUNA_VERSAO], errors='coerce')
+    
+    return dados[~rejeitado], erros
+
+def em_partes(valores, tamanho):
+    """Dividir uma lista em partes de até 'tamanho' elementos"""
+    for inicio in range(0, len(valores), tamanho):
+        yield valores[inicio:inicio + tamanho]
+
+def chaves_existentes(coluna_chave, valores):
+    """Quais dos valores já existem na coluna (consultas IN em partes)"""
+    existentes = set()
+    for parte in em_partes(list(valores), TAMANHO_CONSULTA):
+        existentes.update(db.session.execute(
+            select(coluna_chave).where(coluna_chave.in_(parte))
+        ).scalars())
+    return existentes
+
+def resolver_lookups(dados, lookups):
+    """Trocar nomes de lookup pelos ids, criando os que faltam em um único INSERT"""
+    for campo, (modelo, chave_estrangeira) in lookups.items():
+        nomes = set(dados[campo].dropna())
+        ids = {}
+        if nomes:
+            ids = dict(db.session.execute(select(modelo.nome, modelo.id)).all())
+            faltantes = sorted(nomes - set(ids))
+            if faltantes:
+                db.session.execute(insert(modelo), [{'nome': nome} for nome in faltantes])
+                incrementar_versao_configuracao()
+                ids.update(db.session.execute(
+                    select(modelo.nome, modelo.id).where(modelo.nome.in_(faltantes))
+                ).all())
+        dados[chave_estrangeira] = pd.Series(
+            [ids.get(nome) for nome in dados[campo]], index=dados.index, dtype=object
+        )
+    return dados.drop(columns=list(lookups))
+
+def para_registros(dados):
+    """Linhas do DataFrame como dicionários, com ausentes como None"""
+    return dados.astype(object).where(dados.notna(), None).to_dict('records')
+
+def inserir_em_lotes(modelo, registros, progresso=None):
+    """Inserir os registros com executemany em lotes de TAMANHO_LOTE.
+    
+    progresso, se informado, recebe o total inserido após cada lote.
+    No PostgreSQL (psycopg2) os lotes vão por COPY.
+    """
+    if registros and db.session.get_bind().dialect.name == 'postgresql':
+        cursor = db.session.connection().connection.cursor()
+        try:
+            if hasattr(cursor, 'copy_expert'):
+                return copiar_em_lotes(cursor, modelo, registros, progresso)
+        finally:
+            cursor.close()
+    
+    inseridos = 0
+    for parte in em_partes(registros, TAMANHO_LOTE):
+        db.session.execute(insert(modelo), parte)
+        inseridos += len(parte)
+        if progresso:
+            progresso(inseridos)
+    return inseridos
+
+def valor_csv(valor):
+    """Valor no CSV do COPY: textos entre aspas, nulo como campo vazio sem aspas"""
+    if valor is None:
+        return ''
+    if isinstance(valor, str):
+        return '"' + valor.replace('"', '""') + '"'
+    return str(valor)
+
+def copiar_em_lotes(cursor, modelo, registros, progresso=None):
+    """Inserir os registros com COPY ... FROM STDIN (CSV) em lotes de TAMANHO_LOTE_COPY"""
+    campos = list(registros[0])
+    comando = (
+        f'COPY {modelo.__tablename__} ({", ".join(modelo.__table__.c[c].name for c in campos)}) '
+        'FROM STDIN WITH (FORMAT csv)'
+    )
+    inseridos = 0
+    for parte in em_partes(registros, TAMANHO_LOTE_COPY):
+        buffer = io.StringIO()
+        for registro in parte:
+            buffer.write(','.join(valor_csv(registro[c]) for c in campos) + '\n')
+        buffer.seek(0)
+        cursor.copy_expert(comando, buffer)
+        inseridos += len(parte)
+        if progresso:
+            progresso(inseridos)
+    return inseridos
+
+def insert_dialeto(modelo):
+    """INSERT com suporte a ON CONFLICT do dialeto do banco"""
+    if db.session.get_bind().dialect.name == 'postgresql':
+        return postgresql.insert(modelo)
+    return sqlite.insert(modelo)
+
+def upsert_em_lotes(modelo, coluna_chave, registros, campos, progresso=None):
+    """INSERT ... ON CONFLICT DO UPDATE em lotes de TAMANHO_LOTE; retorna a contagem.
+    
+    Só os campos informados são atualizados, e só nas linhas em que algum
+    deles muda; as chaves existentes de cada lote são consultadas antes
+    para separar inseridos de atualizados.
+    """
+    chave = coluna_chave.key
+    atualizaveis = [campo for campo in campos if campo != chave]
+    comando = insert_dialeto(modelo)
+    if atualizaveis:
+        alteracoes = {campo: comando.excluded[campo] for campo in atualizaveis}
+        if 'versao' in modelo.__table__.c:
+            alteracoes['versao'] = modelo.__table__.c.versao + 1
+        comando = comando.on_conflict_do_update(
+            index_elements=[coluna_chave],
+            set_=alteracoes,
+            where=or_(*[
+                modelo.__table__.c[campo].is_distinct_from(comando.excluded[campo])
+                for campo in atualizaveis
+            ])
+        )
+    else:
+        comando = comando.on_conflict_do_nothing(index_elements=[coluna_chave])
+    comando = comando.returning(coluna_chave)
+    
+    contagem = {'inseridos': 0, 'atualizados': 0, 'inalterados': 0}
+    processados = 0
+    for parte in em_partes(registros, TAMANHO_LOTE):
+        existentes = chaves_existentes(coluna_chave, [registro[chave] for registro in parte])
+        gravadas = set(db.session.execute(comando, parte).scalars())
+        
+        atualizadas = len(gravadas & existentes)
+        contagem['inseridos'] += len(gravadas) - atualizadas
+        contagem['atualizados'] += atualizadas
+        contagem['inalterados'] += len(existentes) - atualizadas
+        processados += len(parte)
+        if progresso:
+            progresso(processados)
+    return contagem
+
+def gravar_registros(modelo, coluna_chave, dados, modo, campos, progresso=None):
+    """Inserir (insert/skip) ou fazer o upsert das linhas aceitas; retorna a contagem"""
+    registros = para_registros(dados.drop(columns=[c for c in dados.columns if c.startswith('_')]))
+    if modo == 'upsert':
+        return upsert_em_lotes(modelo, coluna_chave, registros, campos, progresso)
+    return {'inseridos': inserir_em_lotes(modelo, registros, progresso), 'atualizados': 0, 'inalterados': 0}
+
+def descartar_existentes(dados, coluna_chave, campo, mensagem, erros):
+    """Remover linhas cuja chave já existe no banco, registrando o erro"""
+    existentes = chaves_existentes(coluna_chave, dados[campo].dropna())
+    if not existentes:
+        return dados
+    ja_existe = dados[campo].isin(existentes)
+    registrar(erros, dados['_linha'], ja_existe, mensagem, dados[campo])
+    return dados[~ja_existe]
+
+def separar_existentes(dados, coluna_chave, campo, mensagem, erros, modo):
+    """Remover linhas cuja chave já existe: com erro no modo 'insert', ignoradas no 'skip'.
+    
+    Retorna (dados, quantidade ignorada).
+    """
+    if modo != 'skip':
+        return descartar_existentes(dados, coluna_chave, campo, mensagem, erros), 0
+    existentes = chaves_existentes(coluna_chave, dados[campo].dropna())
+    ja_existe = dados[campo].isin(existentes)
+    return dados[~ja_existe], int(ja_existe.sum())
+
+def descartar_de_outros(dados, coluna, coluna_chave, campo, campo_chave, mensagem, erros):
+    """Remover linhas cujo valor único (campo) já pertence a outro registro do banco, registrando o erro"""
+    informados = dados[campo].notna()
+    donos = {}
+    for parte in em_partes(list(dados.loc[informados, campo].unique()), TAMANHO_CONSULTA):
+        donos.update(db.session.execute(select(coluna, coluna_chave).where(coluna.in_(parte))).all())
+    if not donos:
+        return dados
+    dono = dados[campo].map(donos)
+    de_outro = informados & dono.notna() & (dono != dados[campo_chave])
+    registrar(erros, dados['_linha'], de_outro, mensagem, dados[campo])
+    return dados[~de_outro]
+
+def descartar_sem_referencia(dados, coluna_chave, campo, mensagem, erros):
+    """Remover linhas que referenciam uma chave inexistente (chave estrangeira), registrando o erro"""
+    informados = dados[campo].notna()
+    if not informados.any():
+        return dados
+    existentes = chaves_existentes(coluna_chave, dados.loc[informados, campo].unique())
+    sem_referencia = informados & ~dados[campo].isin(existentes)
+    registrar(erros, dados['_linha'], sem_referencia, mensagem, dados[campo])
+    return dados[~sem_referencia]
+
+def gravar_equipamentos(dados, erros, modo, campos, progresso=None):
+    """Gravar equipamentos validados; retorna a contagem (inseridos, atualizados, inalterados)"""
+    ignorados = 0
+    if modo == 'upsert':
+        # A TAG pode continuar com o próprio equipamento, mas não pode ser de outro
+        dados = descartar_de_outros(
+            dados, Equipamento.tag_equipamento, Equipamento.numero_serie,
+            'tag_equipamento', 'numero_serie', 'TAG {} já existe', erros
+        )
+    else:
+        dados, ignorados = separar_existentes(
+            dados, Equipamento.numero_serie, 'numero_serie', 'Equipamento {} já existe', erros, modo
+        )
+        dados = descartar_existentes(
+            dados, Equipamento.tag_equipamento, 'tag_equipamento', 'TAG {} já existe', erros
+        )
+    dados = resolver_lookups(dados, LOOKUPS_EQUIPAMENTO)
+    contagem = gravar_registros(Equipamento, Equipamento.numero_serie, dados, modo, campos, progresso)
+    contagem['inalterados'] += ignorados
+    return contagem
+
+def separar_sincronizacao(dados, tipo, coluna_chave, campo, erros):
+    """Planilha exportada: separar as linhas exportadas e alteradas das novas; retorna
+    (alteradas, novas, quantidade inalterada).
+    
+    Linhas exportadas com o hash da exportação não mudaram e são descartadas.
+    Das alteradas, as de registros que mudaram de versão (ou foram excluídos)
+    depois da exportação são rejeitadas como conflito.
+    """
+    exportadas = dados[COLUNA_HASH].notna() & dados[COLUNA_VERSAO].notna()
+    campos_hash = [chave for chave, _, _ in EXPORTACOES[tipo][1]]
+    hashes = pd.Series([
+        hash_linha(valores)
+        for valores in dados.loc[exportadas, campos_hash].itertuples(index=False, name=None)
+    ], index=dados.index[exportadas], dtype=object)
+    inalteradas = exportadas & (dados[COLUNA_HASH] == hashes.reindex(dados.index))
+    alteradas = dados[exportadas & ~inalteradas]
+    
+    versoes = {}
+    for parte in em_partes(list(alteradas[campo]), TAMANHO_CONSULTA):
+        versoes.update(db.session.execute(
+            select(coluna_chave, SINCRONIZACAO[tipo]).where(coluna_chave.in_(parte))
+        ).all())
+    atual = alteradas[campo].map(versoes)
+    excluidas = atual.isna()
+    registrar(erros, alteradas['_linha'], excluidas,
+              'Conflito: {} excluído do banco desde a exportação', alteradas[campo])
+    alteradas_no_banco = ~excluidas & (atual != alteradas[COLUNA_VERSAO])
+    registrar(erros, alteradas['_linha'], alteradas_no_banco,
+              'Conflito: {} alterado no banco desde a exportação', alteradas[campo])
+    
+    return alteradas[~(excluidas | alteradas_no_banco)], dados[~exportadas], int(inalteradas.sum())
+
+def somar_contagens(contagem, parcial):
+    """Acumular a contagem parcial na contagem"""
+    for desfecho, quantidade in parcial.items():
+        contagem[desfecho] += quantidade
+    return contagem
+
+def gravar_pontos(dados, erros, modo, campos, progresso=None):
+    """Validar referências, resolver lookups e gravar os pontos; retorna a contagem"""
+    dados = descartar_sem_referencia(
+        dados, Equipamento.numero_serie, 'numero_serie_equipamento', 'Equipamento {} não encontrado', erros
+    )
+    dados = resolver_lookups(dados, LOOKUPS_PONTO_MEDICAO)
+    return gravar_registros(PontoMedicao, PontoMedicao.tag_ponto_medicao, dados, modo, campos, progresso)
+
+def gravar_pontos_medicao(dados, erros, modo, campos, progresso=None):
+    """Gravar pontos de medição validados; retorna a contagem (inseridos, atualizados, inalterados)"""
+    contagem = {'inseridos': 0, 'atualizados': 0, 'inalterados': 0}
+    sincronizadas = 0
+    if COLUNA_HASH in dados.columns:
+        alteradas, dados, contagem['inalterados'] = separar_sincronizacao(
+            dados, 'pontos_medicao', PontoMedicao.tag_ponto_medicao, 'tag_ponto_medicao', erros
+        )
+        # Linhas exportadas e alteradas na planilha são atualizações, qualquer que seja o modo
+        somar_contagens(contagem, gravar_pontos(alteradas, erros, 'upsert', campos, progresso))
+        sincronizadas = len(alteradas)
+    
+    ignorados = 0
+    if modo != 'upsert':
+        dados, ignorados = separar_existentes(
+            dados, PontoMedicao.tag_ponto_medicao, 'tag_ponto_medicao', 'Ponto {} já existe', erros, modo
+        )
+    contagem['inalterados'] += ignorados
+    restantes = (lambda gravados: progresso(sincronizadas + gravados)) if progresso else None
+    return somar_contagens(contagem, gravar_pontos(dados, erros, modo, campos, restantes))
+
+def mensagens_erros(erros):
+    """Mensagens 'Linha N: ...' em ordem de linha"""
+    return [f'Linha {linha}: {mensagem}' for linha, mensagem in sorted(erros, key=lambda e: e[0])]
+
+def relatorio(contagem, erros):
+    """Resultado da importação: contagem por desfecho e erros em ordem de linha"""
+    return {
+        'importados': contagem['inseridos'] + contagem['atualizados'],
+        'inseridos': contagem['inseridos'],
+        'atualizados': contagem['atualizados'],
+        'inalterados': contagem['inalterados'],
+        'erro': len(erros),
+        'erros': mensagens_erros(erros)
+    }
+
+def campos_planilha(tipo, df):
+    """Campos do banco que vêm de colunas presentes na planilha (os únicos alterados no upsert)"""
+    colunas, lookups = COLUNAS_IMPORTACAO[tipo]
+    return [
+        lookups[campo][1] if campo in lookups else campo
+        for campo, nomes in colunas.items()
+        if any(nome in df.columns for nome in nomes)
+    ]
+
+def gravar_importacao(tipo, dados, erros, modo=MODO_PADRAO, campos=None, progresso=None):
+    """Escrita da importação (fila de escritas); retorna (contagem, erros).
+    
+    A lista recebida não é alterada, para que a escrita possa ser refeita
+    se o commit em grupo falhar.
+    """
+    erros = list(erros)
+    gravar = IMPORTACOES[tipo][1]
+    return gravar(dados, erros, modo, campos, progresso), erros
+
+def partes_legiveis(arquivo, nome):
+    """ler_partes, com as falhas de leitura do arquivo levantadas como UploadInvalido"""
+    partes = ler_partes(arquivo, nome)
+    while True:
+        try:
+            df = next(partes)
+        except StopIteration:
+            return
+        except Exception as e:
+            raise UploadInvalido(f'Planilha ilegível: {e}') from e
+        yield df
+
+def importar_arquivo(tipo, arquivo, nome, modo=MODO_PADRAO):
+    """Ler o arquivo em partes, gravando cada uma com commit próprio; retorna o relatório
+    (UploadInvalido se o arquivo não é uma planilha legível)"""
+    contagem = {'inseridos': 0, 'atualizados': 0, 'inalterados': 0}
+    erros = []
+    preparar = IMPORTACOES[tipo][0]
+    for df in partes_legiveis(arquivo, nome):
+        dados, erros_parte = preparar(df)
+        parcial, erros_parte = executar_escrita(
+            gravar_importacao, tipo, dados, erros_parte, modo, campos_planilha(tipo, df), espera=None
+        )
+        somar_contagens(contagem, parcial)
+        erros.extend(erros_parte)
+    return relatorio(contagem, erros)
+
+# Tipo de importação -> (preparar, gravar)
+IMPORTACOES = {
+    'equipamentos': (preparar_equipamentos, gravar_equipamentos),
+    'pontos_medicao': (preparar_pontos_medicao, gravar_pontos_medicao)
+}
+
+# Tipo de importação -> (colunas aceitas, lookups)
+COLUNAS_IMPORTACAO = {
+    'equipamentos': (COLUNAS_EQUIPAMENTO, LOOKUPS_EQUIPAMENTO),
+    'pontos_medicao': (COLUNAS_PONTO_MEDICAO, LOOKUPS_PONTO_MEDICAO)
+}
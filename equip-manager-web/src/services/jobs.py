@@ -0,0 +1,347 @@
+"""Jobs de importação executados em segundo plano.
+
+O arquivo enviado é salvo em disco e processado por um pool de threads,
+cada uma com o próprio contexto da aplicação. O arquivo é lido em partes
+(ver importador.ler_partes) e cada parte é gravada junto com o checkpoint
+do job ('linhas_confirmadas') e os totais acumulados, na mesma transação.
+Se o job falha, as partes já gravadas ficam, o arquivo continua em disco e
+retomar_job() recomeça depois da última parte confirmada. O progresso
+dentro da parte em gravação fica em memória, para não disputar o banco
+com a transação da importação. Todas as gravações na tabela de jobs
+(criação, status e checkpoints) passam pela fila de escritas.
+
+Cada job guarda o processo que o executa ('executor', host:pid) e uma
+thread por processo renova 'atualizado_em' dos jobs dele a cada
+INTERVALO_SINAL segundos, independente das partes gravadas (uma parte
+lenta não apaga o sinal). Um job pendente ou em processamento é tratado
+como interrompido, e pode ser retomado, quando o processo executor não
+existe mais (mesma máquina) ou, de outra máquina, quando o sinal está
+parado há mais de TEMPO_SEM_SINAL.
+"""
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import update
+from src.models.database import db, JobImportacao
+from src.services.escritas import executar_escrita, inserir, alterar
+
+MAX_JOBS_SIMULTANEOS = 2
+
+# Mensagens de erro guardadas na tabela e exibidas durante o processamento
+MAX_ERROS_GRAVADOS = 1000
+MAX_ERROS_PARCIAIS = 10
+
+STATUS_FINAIS = ('concluido', 'erro')
+
+# Intervalo (s) entre as renovações do sinal de vida dos jobs de cada processo
+INTERVALO_SINAL = 60
+
+# Job em andamento sem sinal de vida por mais que isso é considerado interrompido
+TEMPO_SEM_SINAL = timedelta(minutes=10)
+
+_executor = ThreadPoolExecutor(max_workers=MAX_JOBS_SIMULTANEOS, thread_name_prefix='importacao')
+
+# Progresso dos jobs em execução neste processo (id -> dados)
+_progresso = {}
+_trava = threading.Lock()
+_sinal = None
+
+def atualizar_progresso(job_id, **dados):
+    """Registrar o progresso em memória de um job em execução"""
+    with _trava:
+        _progresso.setdefault(job_id, {}).update(dados)
+
+def reservar_progresso(job_id, **dados):
+    """Marcar o job como em execução neste processo; False se ele já está"""
+    with _trava:
+        if job_id in _progresso:
+            return False
+        _progresso[job_id] = dados
+        return True
+
+def descartar_progresso(job_id):
+    """Esquecer o progresso em memória do job"""
+    with _trava:
+        _progresso.pop(job_id, None)
+
+class JobNaoRetomavel(Exception):
+    """Job que não terminou em erro nem foi interrompido, ou cujo arquivo não está mais em disco"""
+
+def executor_atual():
+    """Identificação (host:pid) deste processo, gravada nos jobs que ele executa"""
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+def processo_vivo(executor):
+    """Se o processo executor existe; None se ele é de outra máquina (ou não dá para conferir)"""
+    host, _, pid = (executor or '').rpartition(':')
+    if os.name != 'posix' or host != socket.gethostname() or not pid.isdigit():
+        return None
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def interrompido(job):
+    """Se o job ficou em andamento e o executor morreu: processo encerrado (mesma máquina)
+    ou sinal de vida parado há mais de TEMPO_SEM_SINAL"""
+    if job.status in STATUS_FINAIS:
+        return False
+    with _trava:
+        if job.id in _progresso:
+            return False
+    if job.executor == executor_atual():
+        # Registrado por este processo, mas sem execução em andamento aqui
+        return True
+    
+    vivo = processo_vivo(job.executor)
+    if vivo is not None:
+        return not vivo
+    ultimo_sinal = job.atualizado_em or job.criado_em
+    return ultimo_sinal < datetime.now() - TEMPO_SEM_SINAL
+
+def renovar_sinal(ids):
+    """Escrita: renovar o sinal de vida dos jobs em andamento"""
+    db.session.execute(
+        update(JobImportacao)
+        .where(JobImportacao.id.in_(ids), JobImportacao.status.notin_(STATUS_FINAIS))
+        .values(atualizado_em=datetime.now())
+    )
+
+def renovar_sinais(app):
+    """Renovar o sinal de vida dos jobs pendentes ou em execução neste processo"""
+    with _trava:
+        ids = list(_progresso)
+    if not ids:
+        return
+    with app.app_context():
+        try:
+            executar_escrita(renovar_sinal, ids, espera=None)
+        except Exception as e:
+            app.logger.warning(f'Erro ao renovar o sinal dos jobs: {e}')
+
+def manter_sinal(app):
+    """Laço da thread de sinal de vida"""
+    while True:
+        time.sleep(INTERVALO_SINAL)
+        renovar_sinais(app)
+
+def iniciar_sinal(app):
+    """Iniciar a thread de sinal de vida do processo, se ainda não está rodando (não sobrevive ao fork)"""
+    global _sinal
+    with _trava:
+        if _sinal is None or not _sinal.is_alive():
+            _sinal = threading.Thread(target=manter_sinal, args=(app,), name='sinal-jobs', daemon=True)
+            _sinal.start()
+
+def retomavel(job):
+    """Se o job terminou em erro ou foi interrompido e o arquivo ainda está em disco"""
+    return ((job.status == 'erro' or interrompido(job))
+            and job.caminho is not None and os.path.exists(job.caminho))
+
+def marcar_retomada(job_id, status, atualizado_em):
+    """Escrita: voltar o job para 'pendente' se ele não mudou desde a leitura; retorna se voltou"""
+    sinal = (JobImportacao.atualizado_em.is_(None) if atualizado_em is None
+             else JobImportacao.atualizado_em == atualizado_em)
+    resultado = db.session.execute(
+        update(JobImportacao)
+        .where(JobImportacao.id == job_id, JobImportacao.status == status, sinal)
+        .values(status='pendente', executor=executor_atual())
+    )
+    return resultado.rowcount > 0
+
+def criar_job(tipo, arquivo, modo='insert', hash=None):
+    """Salvar o arquivo enviado, registrar o job e agendar a execução
+    (com o hash do arquivo, o resultado fica guardado para reenvios)"""
+    sufixo = os.path.splitext(arquivo.filename)[1]
+    descritor, caminho = tempfile.mkstemp(prefix='importacao_', suffix=sufixo)
+    with os.fdopen(descritor, 'wb') as destino:
+        arquivo.save(destino)
+    
+    # Em execução neste processo desde antes de existir na tabela (ver interrompido)
+    job_id = uuid.uuid4().hex
+    reservar_progresso(job_id, linhas_processadas=0)
+    try:
+        executar_escrita(inserir, JobImportacao, {
+            'id': job_id, 'tipo': tipo, 'modo': modo, 'arquivo': arquivo.filename, 'caminho': caminho,
+            'hash': hash, 'executor': executor_atual()
+        })
+    except Exception:
+        descartar_progresso(job_id)
+        raise
+    
+    app = current_app._get_current_object()
+    iniciar_sinal(app)
+    _executor.submit(executar_job, app, job_id)
+    return job_id
+
+def retomar_job(job_id):
+    """Reagendar um job que terminou em erro ou foi interrompido a partir do checkpoint
+    (linhas já confirmadas); retorna o id, ou None se o job não existe"""
+    job = db.session.get(JobImportacao, job_id)
+    if job is None:
+        return None
+    if not retomavel(job):
+        raise JobNaoRetomavel(
+            'Só jobs com erro ou interrompidos e com o arquivo ainda salvo podem ser retomados'
+        )
+    # Outra requisição (ou outro worker) pode ter retomado o job desde a leitura
+    if not reservar_progresso(job.id, linhas_processadas=job.linhas_confirmadas):
+        raise JobNaoRetomavel('Job já retomado')
+    try:
+        retomado = executar_escrita(marcar_retomada, job.id, job.status, job.atualizado_em)
+    except Exception:
+        descartar_progresso(job.id)
+        raise
+    if not retomado:
+        descartar_progresso(job.id)
+        raise JobNaoRetomavel('Job já retomado')
+    
+    app = current_app._get_current_object()
+    iniciar_sinal(app)
+    _executor.submit(executar_job, app, job.id)
+    return job.id
+
+def gravar_parte(job_id, tipo, dados, erros, modo, campos, confirmadas, progresso=None):
+    """Escrita: gravar uma parte do arquivo e avançar o checkpoint e os totais do job
+    na mesma transação; retorna (contagem, erros)"""
+    from src.services.importador import gravar_importacao, mensagens_erros
+    
+    contagem, erros = gravar_importacao(tipo, dados, erros, modo, campos, progresso)
+    job = db.session.get(JobImportacao, job_id)
+    job.linhas_confirmadas = confirmadas
+    job.linhas_processadas = confirmadas
+    job.importados += contagem['inseridos'] + contagem['atualizados']
+    job.atualizados += contagem['atualizados']
+    job.inalterados += contagem['inalterados']
+    job.total_erros += len(erros)
+    
+    gravados = json.loads(job.erros) if job.erros else []
+    if erros and len(gravados) < MAX_ERROS_GRAVADOS:
+        gravados += mensagens_erros(erros)[:MAX_ERROS_GRAVADOS - len(gravados)]
+        job.erros = json.dumps(gravados, ensure_ascii=False)
+    return contagem, erros
+
+def executar_job(app, job_id):
+    """Executar a importação do job em partes, a partir do checkpoint (roda em uma thread do pool);
+    com o hash do arquivo gravado no job, o resultado fica guardado para reenvios"""
+    from src.services.importador import IMPORTACOES, ler_partes, campos_planilha
+    from src.services.uploads import registrar_arquivo
+    
+    with app.app_context():
+        try:
+            job = db.session.get(JobImportacao, job_id)
+            tipo, modo, caminho, confirmadas = job.tipo, job.modo, job.caminho, job.linhas_confirmadas
+            # Sem transação de leitura aberta durante a importação
+            db.session.close()
+            executar_escrita(alterar, JobImportacao, job_id, {
+                'status': 'processando', 'mensagem': None, 'iniciado_em': datetime.now(), 'concluido_em': None,
+                'linhas_no_inicio': confirmadas
+            }, espera=None)
+            
+            preparar = IMPORTACOES[tipo][0]
+            lidas = confirmadas
+            partes = ler_partes(
+                caminho, caminho, informar_total=lambda total: atualizar_progresso(job_id, total_linhas=total)
+            )
+            for df in partes:
+                lidas = int(df.index[-1]) + 1
+                # Partes gravadas antes da interrupção
+                df = df[df.index >= confirmadas]
+                if df.empty:
+                    continue
+                
+                dados, erros = preparar(df)
+                inicio = int(df.index[0])
+                
+                def progresso(gravados):
+                    atualizar_progresso(job_id, linhas_processadas=inicio + len(erros) + gravados)
+                
+                executar_escrita(
+                    gravar_parte, job_id, tipo, dados, erros, modo, campos_planilha(tipo, df), lidas,
+                    progresso, espera=None
+                )
+                atualizar_progresso(job_id, linhas_processadas=lidas)
+            
+            # Totais gravados pela thread escritora, lidos em uma transação nova
+            db.session.close()
+            job = db.session.get(JobImportacao, job_id)
+            if job.hash:
+                registrar_arquivo(job.hash, job.tipo, job.modo, job.arquivo, {
+                    'importados': job.importados,
+                    'inseridos': job.importados - job.atualizados,
+                    'atualizados': job.atualizados,
+                    'inalterados': job.inalterados,
+                    'erro': job.total_erros,
+                    'erros': json.loads(job.erros) if job.erros else []
+                })
+            
+            executar_escrita(alterar, JobImportacao, job_id, {
+                'status': 'concluido', 'total_linhas': lidas, 'linhas_processadas': lidas,
+                'caminho': None, 'concluido_em': datetime.now()
+            }, espera=None)
+            os.remove(caminho)
+        
+        except Exception as e:
+            # O arquivo fica em disco para a retomada a partir do checkpoint
+            db.session.rollback()
+            executar_escrita(alterar, JobImportacao, job_id, {
+                'status': 'erro', 'mensagem': str(e), 'concluido_em': datetime.now()
+            }, espera=None)
+        
+        finally:
+            descartar_progresso(job_id)
+
+def consultar_job(job_id):
+    """Status do job: progresso em memória se estiver rodando, senão o resumo gravado"""
+    job = db.session.get(JobImportacao, job_id)
+    if job is None:
+        return None
+    
+    dados = {
+        'id': job.id,
+        'tipo': job.tipo,
+        'modo': job.modo,
+        'arquivo': job.arquivo,
+        'status': job.status,
+        'total_linhas': job.total_linhas,
+        'linhas_processadas': job.linhas_processadas,
+        'linhas_confirmadas': job.linhas_confirmadas,
+        'importados': job.importados,
+        'atualizados': job.atualizados,
+        'inalterados': job.inalterados,
+        'total_erros': job.total_erros,
+        'erros': json.loads(job.erros) if job.erros else [],
+        'mensagem': job.mensagem,
+        'criado_em': job.criado_em,
+        'iniciado_em': job.iniciado_em,
+        'concluido_em': job.concluido_em,
+        'retomavel': retomavel(job)
+    }
+    
+    with _trava:
+        atual = dict(_progresso.get(job_id, {}))
+    if atual and job.status not in STATUS_FINAIS:
+        # Totais e erros das partes já confirmadas vêm da tabela
+        dados['total_linhas'] = atual.get('total_linhas')
+        dados['linhas_processadas'] = max(atual.get('linhas_processadas', 0), job.linhas_confirmadas)
+        dados['erros'] = dados['erros'][:MAX_ERROS_PARCIAIS]
+    
+    dados['linhas_por_segundo'] = None
+    if job.iniciado_em:
+        decorrido = ((job.concluido_em or datetime.now()) - job.iniciado_em).total_seconds()
+        if decorrido > 0:
+            # Só as linhas desta execução: as confirmadas antes da retomada não contam
+            processadas = dados['linhas_processadas'] - (job.linhas_no_inicio or 0)
+            dados['linhas_por_segundo'] = round(processadas / decorrido, 1)
+    
+    return dados
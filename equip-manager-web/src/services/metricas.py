@@ -0,0 +1,233 @@
+"""Métricas por endpoint (latência, SQL e bytes) no formato do Prometheus.
+
+Ganchos before_request/after_request medem cada requisição e os eventos
+before/after_cursor_execute do SQLAlchemy somam, na própria requisição
+(flask.g), o número de comandos SQL e o tempo gasto no banco. Os valores
+são acumulados em memória por (método, endpoint, status) e publicados em
+/metrics. Respostas em fluxo (exportações, SSE) têm os bytes contados à
+medida que são enviados.
+
+Os números são do processo: com vários workers, cada um expõe os seus e
+o Prometheus deve coletar todos (ou somá-los por instância).
+
+Também são publicados a memória residente do processo, o tempo de
+criação da aplicação (TEMPO_INICIALIZACAO), para acompanhar o custo de
+cada worker e do cold start, e os contadores da fila de escritas.
+
+Com SERVER_TIMING=1 no ambiente, cada resposta leva também o cabeçalho
+Server-Timing com o tempo total e o tempo de banco, visível no DevTools.
+"""
+import bisect
+import os
+import threading
+import time
+from flask import Response, current_app, g, has_request_context, request
+from sqlalchemy import event
+from src.models.database import db
+
+# Limites (segundos) dos buckets do histograma de latência
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+TIPO_CONTEUDO = 'text/plain; version=0.0.4; charset=utf-8'
+
+class MetricasEndpoint:
+    """Valores acumulados de um (método, endpoint, status)"""
+    
+    __slots__ = ('buckets', 'requisicoes', 'segundos', 'consultas_sql', 'segundos_sql', 'bytes')
+    
+    def __init__(self):
+        self.buckets = [0] * len(BUCKETS_LATENCIA)
+        self.requisicoes = 0
+        self.segundos = 0.0
+        self.consultas_sql = 0
+        self.segundos_sql = 0.0
+        self.bytes = 0
+
+_metricas = {}
+_trava = threading.Lock()
+
+def metricas_endpoint(chave):
+    """Métricas da chave, criadas na primeira requisição (chamar com a trava)"""
+    metricas = _metricas.get(chave)
+    if metricas is None:
+        metricas = _metricas[chave] = MetricasEndpoint()
+    return metricas
+
+def registrar_requisicao(chave, segundos, consultas_sql, segundos_sql, tamanho):
+    """Acumular uma requisição concluída"""
+    posicao = bisect.bisect_left(BUCKETS_LATENCIA, segundos)
+    with _trava:
+        metricas = metricas_endpoint(chave)
+        if posicao < len(metricas.buckets):
+            metricas.buckets[posicao] += 1
+        metricas.requisicoes += 1
+        metricas.segundos += segundos
+        metricas.consultas_sql += consultas_sql
+        metricas.segundos_sql += segundos_sql
+        metricas.bytes += tamanho
+
+def registrar_bytes(chave, tamanho):
+    """Somar os bytes enviados por uma resposta em fluxo"""
+    with _trava:
+        metricas_endpoint(chave).bytes += tamanho
+
+def contar_bytes(iteravel, chave):
+    """Repassar os blocos da resposta em fluxo contando os bytes enviados"""
+    total = 0
+    try:
+        for bloco in iteravel:
+            total += len(bloco)
+            yield bloco
+    finally:
+        registrar_bytes(chave, total)
+        fechar = getattr(iteravel, 'close', None)
+        if fechar is not None:
+            fechar()
+
+def antes_do_comando(conn, cursor, statement, parameters, context, executemany):
+    """Marcar o início do comando SQL executado durante uma requisição"""
+    if context is not None and has_request_context() and 'metricas_inicio' in g:
+        context.metricas_inicio = time.perf_counter()
+
+def depois_do_comando(conn, cursor, statement, parameters, context, executemany):
+    """Somar o comando SQL e o tempo gasto às métricas da requisição"""
+    inicio = getattr(context, 'metricas_inicio', None)
+    if inicio is not None and 'metricas_inicio' in g:
+        g.metricas_sql_segundos += time.perf_counter() - inicio
+        g.metricas_sql_consultas += 1
+
+def iniciar_medicao():
+    """Zerar as medições da requisição (before_request)"""
+    g.metricas_inicio = time.perf_counter()
+    g.metricas_sql_consultas = 0
+    g.metricas_sql_segundos = 0.0
+
+def finalizar_medicao(response):
+    """Registrar as medições da requisição e o Server-Timing (after_request)"""
+    inicio = g.pop('metricas_inicio', None)
+    if inicio is None:
+        return response
+    
+    segundos = time.perf_counter() - inicio
+    consultas_sql = g.metricas_sql_consultas
+    segundos_sql = g.metricas_sql_segundos
+    chave = (request.method, request.endpoint or 'nao_encontrado', response.status_code)
+    
+    tamanho = response.content_length
+    if tamanho is None and response.is_streamed and not response.direct_passthrough:
+        response.response = contar_bytes(response.response, chave)
+    tamanho = tamanho or 0
+    
+    registrar_requisicao(chave, segundos, consultas_sql, segundos_sql, tamanho)
+    
+    if current_app.config.get('SERVER_TIMING'):
+        response.headers['Server-Timing'] = (
+            f'app;dur={segundos * 1000:.1f}, '
+            f'db;dur={segundos_sql * 1000:.1f};desc="{consultas_sql} consultas"'
+        )
+    return response
+
+def rotulos(metodo, endpoint, status):
+    """Rótulos da série no formato do Prometheus"""
+    return f'method="{metodo}",endpoint="{endpoint}",status="{status}"'
+
+def texto_prometheus():
+    """Todas as métricas no formato de exposição em texto do Prometheus"""
+    with _trava:
+        itens = sorted(
+            (chave, list(m.buckets), m.requisicoes, m.segundos, m.consultas_sql, m.segundos_sql, m.bytes)
+            for chave, m in _metricas.items()
+        )
+    
+    latencia = [
+        '# HELP http_request_duration_seconds Latência das requisições por endpoint',
+        '# TYPE http_request_duration_seconds histogram'
+    ]
+    consultas = [
+        '# HELP http_request_sql_queries_total Comandos SQL executados pelas requisições',
+        '# TYPE http_request_sql_queries_total counter'
+    ]
+    tempo_sql = [
+        '# HELP http_request_sql_duration_seconds_total Tempo gasto no banco pelas requisições',
+        '# TYPE http_request_sql_duration_seconds_total counter'
+    ]
+    tamanhos = [
+        '# HELP http_response_size_bytes_total Bytes enviados nas respostas',
+        '# TYPE http_response_size_bytes_total counter'
+    ]
+    
+    for chave, buckets, requisicoes, segundos, consultas_sql, segundos_sql, tamanho in itens:
+        base = rotulos(*chave)
+        acumulado = 0
+        for limite, quantidade in zip(BUCKETS_LATENCIA, buckets):
+            acumulado += quantidade
+            latencia.append(f'http_request_duration_seconds_bucket{{{base},le="{limite}"}} {acumulado}')
+        latencia.append(f'http_request_duration_seconds_bucket{{{base},le="+Inf"}} {requisicoes}')
+        latencia.append(f'http_request_duration_seconds_sum{{{base}}} {segundos:.6f}')
+        latencia.append(f'http_request_duration_seconds_count{{{base}}} {requisicoes}')
+        consultas.append(f'http_request_sql_queries_total{{{base}}} {consultas_sql}')
+        tempo_sql.append(f'http_request_sql_duration_seconds_total{{{base}}} {segundos_sql:.6f}')
+        tamanhos.append(f'http_response_size_bytes_total{{{base}}} {tamanho}')
+    
+    return '\n'.join(latencia + consultas + tempo_sql + tamanhos) + '\n'
+
+def memoria_residente():
+    """Memória residente (RSS) do processo em bytes, ou None se indisponível"""
+    try:
+        with open('/proc/self/statm') as arquivo:
+            return int(arquivo.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    # Sem /proc, o pico de RSS é a melhor aproximação (KiB no Linux, bytes no macOS)
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico if os.uname().sysname == 'Darwin' else pico * 1024
+
+def texto_processo(tempo_inicializacao, fila_escrita=None):
+    """Métricas do processo (memória, tempo de criação da aplicação e fila de escritas)"""
+    linhas = []
+    memoria = memoria_residente()
+    if memoria is not None:
+        linhas += [
+            '# HELP process_resident_memory_bytes Memória residente do processo',
+            '# TYPE process_resident_memory_bytes gauge',
+            f'process_resident_memory_bytes {memoria}'
+        ]
+    if tempo_inicializacao is not None:
+        linhas += [
+            '# HELP app_startup_seconds Tempo de criação da aplicação no processo',
+            '# TYPE app_startup_seconds gauge',
+            f'app_startup_seconds {tempo_inicializacao:.6f}'
+        ]
+    if fila_escrita is not None:
+        linhas += [
+            '# HELP db_write_batches_total Commits em grupo feitos pela fila de escritas',
+            '# TYPE db_write_batches_total counter',
+            f'db_write_batches_total {fila_escrita.lotes}',
+            '# HELP db_writes_total Escritas executadas pela fila de escritas',
+            '# TYPE db_writes_total counter',
+            f'db_writes_total {fila_escrita.escritas}',
+            '# HELP db_write_queue_size Escritas aguardando na fila',
+            '# TYPE db_write_queue_size gauge',
+            f'db_write_queue_size {fila_escrita.fila.qsize()}'
+        ]
+    return '\n'.join(linhas) + '\n' if linhas else ''
+
+def instalar_metricas(app):
+    """Registrar os ganchos de medição, os eventos do SQLAlchemy e a rota /metrics"""
+    app.before_request(iniciar_medicao)
+    app.after_request(finalizar_medicao)
+    
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', antes_do_comando)
+        event.listen(db.engine, 'after_cursor_execute', depois_do_comando)
+    
+    @app.route('/metrics')
+    def metrics():
+        texto = texto_prometheus() + texto_processo(
+            current_app.config.get('TEMPO_INICIALIZACAO'), current_app.extensions.get('fila_escrita')
+        )
+        return Response(texto, content_type=TIPO_CONTEUDO)
@@ -0,0 +1,130 @@
+"""Paginação por offset (page/per_page) ou por cursor (keyset).
+
+O modo cursor é ativado pelo parâmetro ``cursor`` (vazio na primeira
+página) e ordena por uma chave estável, de modo que qualquer página custa
+o mesmo que a primeira. A contagem total é controlada por ``count``:
+``true`` (exata), ``false`` (omitida) ou ``estimativa`` (total da tabela
+mantido em 'contadores', sem considerar filtros).
+
+``per_page`` é limitado a 1..MAX_POR_PAGINA.
+"""
+import base64
+import json
+from datetime import date
+from flask import request
+from sqlalchemy import and_, or_
+from src.models.database import db, Contador
+
+POR_PAGINA_PADRAO = 20
+MAX_POR_PAGINA = 500
+
+class CursorInvalido(ValueError):
+    """Cursor recebido não pôde ser decodificado"""
+
+def codificar_cursor(valores):
+    """Gerar cursor opaco a partir dos valores da chave de ordenação"""
+    dados = json.dumps(valores, separators=(',', ':'), default=str)
+    return base64.urlsafe_b64encode(dados.encode('utf-8')).decode('ascii').rstrip('=')
+
+def valor_cursor(valor, coluna):
+    """Valor do cursor convertido para o tipo da coluna da chave; CursorInvalido se não corresponder"""
+    if valor is None and coluna.nullable:
+        return None
+    
+    # TypeDecorator (ex.: Data) informa o tipo pela coluna de base
+    tipo = getattr(coluna.type, 'impl_instance', coluna.type).python_type
+    if tipo is date:
+        if isinstance(valor, str):
+            try:
+                return date.fromisoformat(valor)
+            except ValueError:
+                pass
+    elif tipo is int:
+        if isinstance(valor, int) and not isinstance(valor, bool):
+            return valor
+    elif isinstance(valor, tipo):
+        return valor
+    raise CursorInvalido('Cursor inválido')
+
+def decodificar_cursor(cursor, chaves):
+    """Recuperar os valores da chave de ordenação a partir do cursor, nos tipos das colunas"""
+    try:
+        dados = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        valores = json.loads(dados)
+    except ValueError:
+        raise CursorInvalido('Cursor inválido')
+    
+    if not isinstance(valores, list) or len(valores) != len(chaves):
+        raise CursorInvalido('Cursor inválido')
+    
+    return [valor_cursor(valor, coluna) for valor, (_, coluna, _) in zip(valores, chaves)]
+
+def condicao_apos(chaves, valores):
+    """Condição para linhas posteriores à posição (valores) na ordem das chaves"""
+    condicoes = []
+    for i, (_, coluna, descendente) in enumerate(chaves):
+        iguais = [chaves[j][1] == valores[j] for j in range(i)]
+        posterior = coluna < valores[i] if descendente else coluna > valores[i]
+        condicoes.append(and_(*iguais, posterior))
+    return or_(*condicoes)
+
+def total_estimado(tabela):
+    """Total de registros da tabela segundo 'contadores'"""
+    contador = db.session.get(Contador, tabela)
+    return contador.valor if contador else None
+
+def paginar(query, chaves, tabela):
+    """Paginar a consulta conforme os parâmetros da requisição.
+    
+    chaves: lista de (rótulo, coluna, descendente) usada no modo cursor;
+    o rótulo deve existir nas linhas retornadas pela consulta.
+    """
+    per_page = min(max(request.args.get('per_page', POR_PAGINA_PADRAO, type=int), 1), MAX_POR_PAGINA)
+    contagem = request.args.get('count', '').lower()
+    
+    if 'cursor' in request.args:
+        cursor = request.args.get('cursor')
+        filtrada = query.order_by(None)
+        
+        query = filtrada.order_by(
+            *[coluna.desc() if descendente else coluna.asc() for _, coluna, descendente in chaves]
+        )
+        if cursor:
+            valores = decodificar_cursor(cursor, chaves)
+            query = query.filter(condicao_apos(chaves, valores))
+        
+        # Uma linha extra indica se existe próxima página
+        itens = query.limit(per_page + 1).all()
+        proxima = None
+        if len(itens) > per_page:
+            itens = itens[:per_page]
+            proxima = codificar_cursor([getattr(itens[-1], rotulo) for rotulo, _, _ in chaves])
+        
+        pagina = {
+            'itens': itens,
+            'next_cursor': proxima,
+            'per_page': per_page
+        }
+        if contagem == 'true':
+            pagina['total'] = filtrada.count()
+        
+    else:
+        page = request.args.get('page', 1, type=int)
+        
+        paginados = query.paginate(
+            page=page, per_page=per_page, error_out=False,
+            count=contagem not in ('false', 'estimativa')
+        )
+        
+        pagina = {
+            'itens': paginados.items,
+            'total': paginados.total,
+            'pages': paginados.pages,
+            'current_page': page,
+            'per_page': per_page
+        }
+    
+    if contagem == 'estimativa':
+        pagina['total_estimado'] = total_estimado(tabela)
+    
+    return pagina
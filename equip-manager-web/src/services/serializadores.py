@@ -0,0 +1,173 @@
+"""Projeções de colunas usadas para serializar listagens e detalhes.
+
+Cada consulta seleciona apenas as colunas necessárias, já com junções
+externas às tabelas de lookup, e cada linha vira um dicionário direto do
+resultado, sem carregar relacionamentos (uma consulta por requisição).
+"""
+from src.models.database import (
+    db, Equipamento, PontoMedicao, Certificado, Fabricante, Modelo,
+    TipoEquipamento, Unidade, CriterioAceitacao, Polo,
+    ClassificacaoPontoMedicao, StatusCertificadoIncerteza, Instalacao
+)
+
+# Equipamentos
+COLUNAS_EQUIPAMENTO = {
+    'numero_serie': Equipamento.numero_serie,
+    'tag_equipamento': Equipamento.tag_equipamento,
+    'nome_equipamento': Equipamento.nome_equipamento,
+    'fabricante': Fabricante.nome,
+    'modelo': Modelo.nome,
+    'tipo_equipamento': TipoEquipamento.nome,
+    'unidade': Unidade.nome,
+    'resolucao': Equipamento.resolucao,
+    'faixa_minima_equipamento': Equipamento.faixa_minima_equipamento,
+    'faixa_maxima_equipamento': Equipamento.faixa_maxima_equipamento,
+    'faixa_minima_pam': Equipamento.faixa_minima_pam,
+    'faixa_maxima_pam': Equipamento.faixa_maxima_pam,
+    'faixa_minima_calibrada': Equipamento.faixa_minima_calibrada,
+    'faixa_maxima_calibrada': Equipamento.faixa_maxima_calibrada,
+    'condicoes_ambientais': Equipamento.condicoes_ambientais,
+    'erro_maximo_admissivel': Equipamento.erro_maximo_admissivel,
+    'criterio_aceitacao': CriterioAceitacao.nome,
+    'software_versao': Equipamento.software_versao
+}
+
+COLUNAS_EQUIPAMENTO_DETALHE = {
+    **COLUNAS_EQUIPAMENTO,
+    'fabricante_id': Equipamento.fabricante_id,
+    'modelo_id': Equipamento.modelo_id,
+    'tipo_equipamento_id': Equipamento.tipo_equipamento_id,
+    'unidade_id': Equipamento.unidade_id,
+    'criterio_aceitacao_id': Equipamento.criterio_aceitacao_id
+}
+
+JUNCOES_EQUIPAMENTO = [
+    (Fabricante, Equipamento.fabricante_id == Fabricante.id),
+    (Modelo, Equipamento.modelo_id == Modelo.id),
+    (TipoEquipamento, Equipamento.tipo_equipamento_id == TipoEquipamento.id),
+    (Unidade, Equipamento.unidade_id == Unidade.id),
+    (CriterioAceitacao, Equipamento.criterio_aceitacao_id == CriterioAceitacao.id)
+]
+
+# Pontos de medição
+COLUNAS_PONTO_MEDICAO = {
+    'id': PontoMedicao.id,
+    'nome_ponto_medicao': PontoMedicao.nome_ponto_medicao,
+    'tag_ponto_medicao': PontoMedicao.tag_ponto_medicao,
+    'polo': Polo.nome,
+    'classificacao': ClassificacaoPontoMedicao.nome,
+    'numero_serie_equipamento': PontoMedicao.numero_serie_equipamento,
+    'equipamento_nome': Equipamento.nome_equipamento,
+    'certificado_calibracao_vigente': PontoMedicao.certificado_calibracao_vigente,
+    'data_ultima_calibracao': PontoMedicao.data_ultima_calibracao,
+    'data_proxima_calibracao': PontoMedicao.data_proxima_calibracao,
+    'frequencia_calibracao_anp': PontoMedicao.frequencia_calibracao_anp,
+    'data_retirada': PontoMedicao.data_retirada,
+    'data_recebimento_uso': PontoMedicao.data_recebimento_uso,
+    'controle_vencimento': PontoMedicao.controle_vencimento,
+    'solicitacao_calibracao': PontoMedicao.solicitacao_calibracao
+}
+
+COLUNAS_PONTO_MEDICAO_DETALHE = {
+    **COLUNAS_PONTO_MEDICAO,
+    'polo_id': PontoMedicao.polo_id,
+    'classificacao_id': PontoMedicao.classificacao_id
+}
+
+# Formato resumido usado em alertas e pontos críticos
+COLUNAS_PONTO_ALERTA = {
+    'id': PontoMedicao.id,
+    'tag_ponto_medicao': PontoMedicao.tag_ponto_medicao,
+    'nome_ponto_medicao': PontoMedicao.nome_ponto_medicao,
+    'data_proxima_calibracao': PontoMedicao.data_proxima_calibracao,
+    'numero_serie_equipamento': PontoMedicao.numero_serie_equipamento,
+    'equipamento_nome': Equipamento.nome_equipamento,
+    'polo': Polo.nome
+}
+
+JUNCOES_PONTO_MEDICAO = [
+    (Polo, PontoMedicao.polo_id == Polo.id),
+    (ClassificacaoPontoMedicao, PontoMedicao.classificacao_id == ClassificacaoPontoMedicao.id),
+    (Equipamento, PontoMedicao.numero_serie_equipamento == Equipamento.numero_serie)
+]
+
+JUNCOES_PONTO_ALERTA = [
+    (Polo, PontoMedicao.polo_id == Polo.id),
+    (Equipamento, PontoMedicao.numero_serie_equipamento == Equipamento.numero_serie)
+]
+
+# Certificados
+COLUNAS_CERTIFICADO = {
+    'id': Certificado.id,
+    'numero_serie_equipamento': Certificado.numero_serie_equipamento,
+    'equipamento_nome': Equipamento.nome_equipamento,
+    'numero_certificado': Certificado.numero_certificado,
+    'revisao_certificado': Certificado.revisao_certificado,
+    'data_certificado': Certificado.data_certificado,
+    'status_certificado': StatusCertificadoIncerteza.nome,
+    'caminho_arquivo': Certificado.caminho_arquivo
+}
+
+COLUNAS_CERTIFICADO_DETALHE = {
+    **COLUNAS_CERTIFICADO,
+    'status_certificado_id': Certificado.status_certificado_id
+}
+
+JUNCOES_CERTIFICADO = [
+    (Equipamento, Certificado.numero_serie_equipamento == Equipamento.numero_serie),
+    (StatusCertificadoIncerteza, Certificado.status_certificado_id == StatusCertificadoIncerteza.id)
+]
+
+# Instalações
+COLUNAS_INSTALACAO = {
+    'id': Instalacao.id,
+    'nome': Instalacao.nome,
+    'polo_id': Instalacao.polo_id,
+    'polo': Polo.nome
+}
+
+JUNCOES_INSTALACAO = [
+    (Polo, Instalacao.polo_id == Polo.id)
+]
+
+def projetar(modelo, colunas, juncoes=()):
+    """Montar consulta com colunas rotuladas e junções externas a partir do modelo"""
+    query = db.session.query(
+        *[coluna.label(chave) for chave, coluna in colunas.items()]
+    ).select_from(modelo)
+    
+    for alvo, condicao in juncoes:
+        query = query.outerjoin(alvo, condicao)
+    
+    return query
+
+def consulta_equipamentos(detalhe=False):
+    """Consulta de equipamentos com nomes dos lookups"""
+    colunas = COLUNAS_EQUIPAMENTO_DETALHE if detalhe else COLUNAS_EQUIPAMENTO
+    return projetar(Equipamento, colunas, JUNCOES_EQUIPAMENTO)
+
+def consulta_pontos_medicao(detalhe=False):
+    """Consulta de pontos de medição com polo, classificação e equipamento"""
+    colunas = COLUNAS_PONTO_MEDICAO_DETALHE if detalhe else COLUNAS_PONTO_MEDICAO
+    return projetar(PontoMedicao, colunas, JUNCOES_PONTO_MEDICAO)
+
+def consulta_pontos_alerta():
+    """Consulta resumida de pontos de medição para alertas de calibração"""
+    return projetar(PontoMedicao, COLUNAS_PONTO_ALERTA, JUNCOES_PONTO_ALERTA)
+
+def consulta_certificados(detalhe=False):
+    """Consulta de certificados com equipamento e status"""
+    colunas = COLUNAS_CERTIFICADO_DETALHE if detalhe else COLUNAS_CERTIFICADO
+    return projetar(Certificado, colunas, JUNCOES_CERTIFICADO)
+
+def consulta_instalacoes():
+    """Consulta de instalações com o nome do polo"""
+    return projetar(Instalacao, COLUNAS_INSTALACAO, JUNCOES_INSTALACAO)
+
+def para_dict(linha):
+    """Converter uma linha de resultado em dicionário"""
+    return dict(linha._mapping)
+
+def para_dicts(linhas):
+    """Converter linhas de resultado em lista de dicionários"""
+    return [dict(linha._mapping) for linha in linhas]
@@ -0,0 +1,92 @@
+"""Arquivos enviados para importação: gravação em disco, hash e resultados já obtidos.
+
+Os arquivos do multipart vão direto para um arquivo temporário em disco (o
+padrão do Werkzeug mantém em memória os menores que 500 KB) e o SHA-256 do
+conteúdo é calculado à medida que os blocos chegam, sem reler o arquivo.
+
+A tabela 'arquivos_importados' guarda, por hash, tipo e modo, o relatório
+da última importação do arquivo. Um reenvio do mesmo arquivo recebe esse
+relatório sem ler a planilha, a menos que a reimportação seja forçada.
+"""
+import hashlib
+import json
+import tempfile
+from datetime import datetime
+from flask import Request
+from src.models.database import db, ArquivoImportado
+from src.services.escritas import executar_escrita
+from src.services.jobs import MAX_ERROS_GRAVADOS
+
+# Bytes lidos por vez ao calcular o hash de um arquivo já recebido
+TAMANHO_BLOCO_HASH = 1024 * 1024
+
+class UploadInvalido(ValueError):
+    """Envio sem planilhas aceitas ou com ZIP ilegível"""
+
+class ArquivoRecebido:
+    """Arquivo temporário em disco que calcula o SHA-256 do que é escrito nele"""
+    
+    def __init__(self):
+        self.arquivo = tempfile.TemporaryFile('w+b', prefix='upload_')
+        self.hash = hashlib.sha256()
+    
+    def write(self, dados):
+        self.hash.update(dados)
+        return self.arquivo.write(dados)
+    
+    def hexdigest(self):
+        return self.hash.hexdigest()
+    
+    def __iter__(self):
+        return iter(self.arquivo)
+    
+    def __getattr__(self, nome):
+        return getattr(self.arquivo, nome)
+
+class RequisicaoUpload(Request):
+    """Requisição que grava os arquivos enviados em ArquivoRecebido"""
+    
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return ArquivoRecebido()
+
+def instalar_uploads(app):
+    """Gravar os arquivos enviados em disco, com hash, em todas as requisições"""
+    app.request_class = RequisicaoUpload
+
+def hash_upload(arquivo):
+    """SHA-256 do arquivo enviado (FileStorage); relê o conteúdo só se não veio por ArquivoRecebido"""
+    stream = arquivo.stream
+    if isinstance(stream, ArquivoRecebido):
+        return stream.hexdigest()
+    
+    hash = hashlib.sha256()
+    posicao = stream.tell()
+    stream.seek(0)
+    for bloco in iter(lambda: stream.read(TAMANHO_BLOCO_HASH), b''):
+        hash.update(bloco)
+    stream.seek(posicao)
+    return hash.hexdigest()
+
+def resultado_anterior(hash, tipo, modo):
+    """Relatório da última importação do arquivo (com 'importado_em') ou None"""
+    registro = db.session.get(ArquivoImportado, (hash, tipo, modo))
+    if registro is None:
+        return None
+    
+    resultado = json.loads(registro.resultado)
+    resultado['importado_em'] = registro.importado_em
+    return resultado
+
+def gravar_arquivo(hash, tipo, modo, nome, resultado):
+    """Escrita: guardar (ou substituir) o relatório da importação do arquivo"""
+    db.session.merge(ArquivoImportado(
+        hash=hash, tipo=tipo, modo=modo, arquivo=nome, resultado=resultado,
+        importado_em=datetime.now()
+    ))
+
+def registrar_arquivo(hash, tipo, modo, nome, resultado):
+    """Guardar o relatório da importação do arquivo pela fila de escritas"""
+    resultado = dict(resultado, erros=resultado['erros'][:MAX_ERROS_GRAVADOS])
+    executar_escrita(
+        gravar_arquivo, hash, tipo, modo, nome, json.dumps(resultado, ensure_ascii=False)
+    )
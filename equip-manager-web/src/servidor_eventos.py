@@ -0,0 +1,185 @@
+"""Servidor do canal de eventos (SSE), em um processo à parte dos workers.
+
+    python -m src.servidor_eventos        # porta EVENTOS_PORTA (padrão 5001)
+
+O gunicorn sobe este processo junto com o master (ver gunicorn.conf.py) e a
+rota /api/eventos/stream da aplicação redireciona o navegador para ele.
+
+Cada conexão SSE fica aberta enquanto o dashboard está na tela. Aqui elas
+são corrotinas de um único laço asyncio, sem thread por conexão: uma
+conexão ociosa custa só o socket e a fila dela. Uma tarefa lê a outbox
+'eventos' a cada INTERVALO_LEITURA segundos e entrega as notificações às
+filas; as consultas rodam em uma única thread auxiliar, com o SQLAlchemy
+da aplicação, para não bloquear o laço.
+"""
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+from src.services.eventos import (
+    INTERVALO_LEITURA, INTERVALO_HEARTBEAT, INTERVALO_LIMPEZA, TAMANHO_FILA,
+    Contadores, formatar_mensagem, ultimo_evento, notificacoes, mensagens_pendentes, aparar_outbox
+)
+
+CAMINHO_STREAM = '/api/eventos/stream'
+
+# Segundos para o cliente enviar os cabeçalhos da requisição
+ESPERA_CABECALHOS = 10
+
+CABECALHOS_CORS = (
+    'Access-Control-Allow-Origin: *\r\n'
+    'Access-Control-Allow-Headers: Last-Event-ID, Cache-Control\r\n'
+    'Access-Control-Allow-Methods: GET, OPTIONS\r\n'
+)
+
+def resposta(status, cabecalhos='', corpo=''):
+    """Resposta HTTP/1.1 completa (fora do fluxo SSE)"""
+    corpo = corpo.encode('utf-8')
+    return (
+        f'HTTP/1.1 {status}\r\n{CABECALHOS_CORS}{cabecalhos}'
+        f'Content-Length: {len(corpo)}\r\nConnection: close\r\n\r\n'
+    ).encode('latin-1') + corpo
+
+def ler_requisicao(dados):
+    """Método, alvo e cabeçalhos (nomes em minúsculas) de uma requisição HTTP"""
+    linhas = dados.decode('latin-1').split('\r\n')
+    metodo, alvo, _ = (linhas[0].split(' ') + ['', ''])[:3]
+    cabecalhos = {}
+    for linha in linhas[1:]:
+        nome, _, valor = linha.partition(':')
+        if valor:
+            cabecalhos[nome.strip().lower()] = valor.strip()
+    return metodo, alvo, cabecalhos
+
+class ServidorEventos:
+    """Assinantes do canal (uma asyncio.Queue por conexão) e a tarefa que lê a outbox"""
+    
+    def __init__(self, app):
+        self.app = app
+        self.assinantes = set()
+        self.tarefa = None
+        # Uma só thread para o banco: a sessão do SQLAlchemy nunca é compartilhada
+        self.banco = ThreadPoolExecutor(max_workers=1, thread_name_prefix='eventos-banco')
+    
+    async def no_banco(self, funcao, *args):
+        """Executar a função na thread do banco, dentro do contexto da aplicação"""
+        def executar():
+            with self.app.app_context():
+                return funcao(*args)
+        
+        return await asyncio.get_running_loop().run_in_executor(self.banco, executar)
+    
+    def entregar(self, mensagens):
+        """Entregar mensagens a todos os assinantes; filas cheias recebem 'resync'"""
+        for fila in list(self.assinantes):
+            try:
+                for mensagem in mensagens:
+                    fila.put_nowait(mensagem)
+            except asyncio.QueueFull:
+                # Assinante lento: descartar o que está pendente e pedir recarga
+                while not fila.empty():
+                    fila.get_nowait()
+                fila.put_nowait(formatar_mensagem('resync', {}))
+    
+    async def publicar(self):
+        """Laço de leitura da outbox: distribuir as notificações e apará-la periodicamente"""
+        laco = asyncio.get_running_loop()
+        contadores = Contadores()
+        ultimo = None
+        proxima_limpeza = 0
+        while True:
+            await asyncio.sleep(INTERVALO_LEITURA)
+            try:
+                if laco.time() >= proxima_limpeza:
+                    proxima_limpeza = laco.time() + INTERVALO_LIMPEZA
+                    await self.no_banco(aparar_outbox)
+                
+                if not self.assinantes:
+                    ultimo = None
+                    continue
+                if ultimo is None:
+                    ultimo = await self.no_banco(ultimo_evento)
+                    continue
+                
+                mensagens, ultimo = await self.no_banco(notificacoes, ultimo, contadores)
+                if mensagens:
+                    self.entregar(mensagens)
+            except Exception as e:
+                self.app.logger.warning(f'Erro ao publicar eventos: {e}')
+    
+    async def atender(self, leitor, escritor):
+        """Atender uma conexão: validar a requisição e manter o fluxo SSE até o cliente sair"""
+        try:
+            try:
+                dados = await asyncio.wait_for(leitor.readuntil(b'\r\n\r\n'), ESPERA_CABECALHOS)
+            except (TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+                return
+            
+            metodo, alvo, cabecalhos = ler_requisicao(dados)
+            url = urlsplit(alvo)
+            if metodo == 'OPTIONS':
+                escritor.write(resposta('204 No Content'))
+                return
+            if metodo != 'GET' or url.path != CAMINHO_STREAM:
+                escritor.write(resposta('404 Not Found'))
+                return
+            
+            ultimo_id = cabecalhos.get('last-event-id') or parse_qs(url.query).get('ultimo', [None])[0]
+            iniciais = []
+            if ultimo_id:
+                try:
+                    iniciais = await self.no_banco(mensagens_pendentes, int(ultimo_id))
+                except ValueError:
+                    escritor.write(resposta('400 Bad Request', corpo='Last-Event-ID inválido'))
+                    return
+            
+            fila = asyncio.Queue(maxsize=TAMANHO_FILA)
+            self.assinantes.add(fila)
+            try:
+                escritor.write((
+                    f'HTTP/1.1 200 OK\r\n{CABECALHOS_CORS}'
+                    'Content-Type: text/event-stream; charset=utf-8\r\n'
+                    'Cache-Control: no-cache\r\nX-Accel-Buffering: no\r\nConnection: close\r\n\r\n'
+                    f'retry: {int(INTERVALO_HEARTBEAT * 1000)}\n\n'
+                ).encode('latin-1'))
+                for mensagem in iniciais:
+                    escritor.write(mensagem.encode('utf-8'))
+                await escritor.drain()
+                
+                while True:
+                    try:
+                        mensagem = await asyncio.wait_for(fila.get(), INTERVALO_HEARTBEAT)
+                    except TimeoutError:
+                        mensagem = ': ping\n\n'
+                    escritor.write(mensagem.encode('utf-8'))
+                    await escritor.drain()
+            finally:
+                self.assinantes.discard(fila)
+        except (ConnectionError, OSError):
+            # Cliente desconectou: percebido na próxima escrita (no máximo um heartbeat depois)
+            pass
+        finally:
+            escritor.close()
+    
+    async def iniciar(self, host, porta):
+        """Abrir o socket e iniciar a leitura da outbox; retorna o asyncio.Server"""
+        servidor = await asyncio.start_server(self.atender, host, porta)
+        self.tarefa = asyncio.create_task(self.publicar())
+        return servidor
+    
+    async def servir(self, host, porta):
+        """Atender até o processo ser encerrado"""
+        servidor = await self.iniciar(host, porta)
+        self.app.logger.info(f'Canal de eventos em {host}:{porta}{CAMINHO_STREAM}')
+        async with servidor:
+            await servidor.serve_forever()
+
+def main():
+    from src.main import create_app
+    
+    app = create_app()
+    host = os.environ.get('EVENTOS_HOST', '0.0.0.0')
+    asyncio.run(ServidorEventos(app).servir(host, app.config['EVENTOS_PORTA']))
+
+if __name__ == '__main__':
+    main()
@@ -98,6 +98,10 @@ const DashboardAPI = {
         return API.get(`/api/dashboard/pontos-criticos?dias=${dias}`);
     },
 
+    async getBundle(dias = 30) {
+        return API.get(`/api/dashboard/bundle?dias=${dias}`);
+    },
+
     async getIndicadoresPerformance() {
         return API.get('/api/dashboard/indicadores-performance');
     }
@@ -2,6 +2,11 @@
 window.Dashboard = {
     charts: {},
     data: {},
+    events: null,
+    refreshTimer: null,
+
+    // Charts and lists follow live changes at most this often; counters update at once
+    liveReloadDelay: 2 * 60 * 1000,
 
     async init() {
         try {
@@ -9,26 +14,77 @@ window.Dashboard = {
             this.renderStats();
             this.renderCharts();
             this.renderCriticalPoints();
+            this.connectEvents();
         } catch (error) {
             handleError(error, 'initializing dashboard');
         }
     },
 
+    // Live updates pushed by the server (falls back to polling if unavailable)
+    connectEvents() {
+        if (this.events || !window.EventSource) return;
+
+        this.events = new EventSource(`${API_BASE_URL}/api/eventos/stream`);
+        this.events.addEventListener('mudanca', (e) => this.applyChange(JSON.parse(e.data)));
+        this.events.addEventListener('lote', (e) => this.applyChange(JSON.parse(e.data)));
+        this.events.addEventListener('resync', () => this.scheduleRefresh());
+        this.events.onerror = () => {
+            // The events server being down closes the stream for good:
+            // fall back to polling and try the stream again on the next poll
+            if (this.events && this.events.readyState === EventSource.CLOSED) {
+                this.events = null;
+            }
+        };
+    },
+
+    isLive() {
+        return this.events !== null && this.events.readyState !== EventSource.CLOSED;
+    },
+
+    applyChange(evento) {
+        const { contadores } = evento;
+        const { resumo } = this.data;
+        if (!resumo || !contadores) return;
+
+        // Patch the counters in place; charts and lists wait for the slow background reload
+        resumo.totais.equipamentos = contadores.equipamentos;
+        resumo.totais.pontos_medicao = contadores.pontos_medicao;
+        resumo.totais.certificados = contadores.certificados;
+        resumo.alertas_calibracao.vencidos = contadores.vencidos;
+        resumo.alertas_calibracao.proximos_vencimento = contadores.proximos_vencimento;
+        resumo.alertas_calibracao.total_alertas = contadores.vencidos + contadores.proximos_vencimento;
+
+        if (window.app && window.app.getCurrentSection() === 'dashboard') {
+            this.renderStats();
+
+            // Keep an already pending reload instead of pushing it back on every change
+            if (!this.refreshTimer) {
+                this.scheduleRefresh(this.liveReloadDelay);
+            }
+        }
+    },
+
+    scheduleRefresh(delay = 5000) {
+        // Debounce bursts of changes into a single silent reload
+        clearTimeout(this.refreshTimer);
+        this.refreshTimer = setTimeout(() => {
+            this.refreshTimer = null;
+            if (window.app && window.app.getCurrentSection() === 'dashboard') {
+                this.refresh(true);
+            }
+        }, delay);
+    },
+
     async loadData() {
         try {
-            // Load all dashboard data in parallel
-            const [resumo, estatisticas, cronograma, pontosCriticos] = await Promise.all([
-                DashboardAPI.getResumo(),
-                DashboardAPI.getEstatisticasEquipamentos(),
-                DashboardAPI.getCronogramaCalibracoes(),
-                DashboardAPI.getPontosCriticos(30)
-            ]);
+            // Load all dashboard data in a single request (revalidated via ETag)
+            const bundle = await DashboardAPI.getBundle(30);
 
             this.data = {
-                resumo,
-                estatisticas,
-                cronograma,
-                pontosCriticos
+                resumo: bundle.resumo,
+                estatisticas: bundle.estatisticas,
+                cronograma: bundle.cronograma,
+                pontosCriticos: bundle.pontos_criticos
             };
         } catch (error) {
             console.error('Error loading dashboard data:', error);
@@ -307,7 +363,7 @@ window.Dashboard = {
         return colors;
     },
 
-    async refresh() {
+    async refresh(silent = false) {
         try {
             await this.loadData();
             this.renderStats();
@@ -319,7 +375,9 @@ window.Dashboard = {
                 window.app.refreshNotifications();
             }
             
-            showToast('Dashboard atualizado com sucesso', 'success');
+            if (!silent) {
+                showToast('Dashboard atualizado com sucesso', 'success');
+            }
         } catch (error) {
             handleError(error, 'refreshing dashboard');
         }
@@ -335,10 +393,11 @@ window.refreshCriticalPoints = async function() {
     }
 };
 
-// Auto-refresh dashboard every 5 minutes
+// Auto-refresh dashboard every 5 minutes when live updates are not connected
 setInterval(() => {
-    if (window.app && window.app.getCurrentSection() === 'dashboard') {
+    if (window.app && window.app.getCurrentSection() === 'dashboard' && !window.Dashboard.isLive()) {
         window.Dashboard.refresh();
+        window.Dashboard.connectEvents();
     }
 }, 5 * 60 * 1000);
 
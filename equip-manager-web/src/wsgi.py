@@ -0,0 +1,13 @@
+"""Ponto de entrada WSGI de produção.
+
+    flask --app src.wsgi init-db          # uma vez por banco e a cada deploy
+    gunicorn src.wsgi:app                 # Linux (configuração em gunicorn.conf.py)
+    waitress-serve --threads=8 src.wsgi:app   # Windows
+
+A criação da aplicação não toca no esquema nem nos dados iniciais, para
+que cada worker suba rápido e nenhum deles rode DDL ao mesmo tempo que
+os outros: isso é feito pelo comando init-db.
+"""
+from src.main import create_app
+
+app = create_app()
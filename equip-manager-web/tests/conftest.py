@@ -0,0 +1,107 @@
+"""Fixtures dos testes: aplicação com banco temporário e dados sintéticos.
+
+Os testes rodam no SQLite (arquivo temporário) e, com TEST_POSTGRES_URL
+definido, também no PostgreSQL apontado por ela. O esquema public desse
+banco é apagado e recriado: use um banco só para testes.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+import pytest
+from sqlalchemy import create_engine, event, text
+from src.main import create_app, inicializar_banco
+from src.models.database import db
+from src.services.jobs import STATUS_FINAIS
+
+POSTGRES_URL = os.environ.get('TEST_POSTGRES_URL')
+
+# Quantidades dos dados sintéticos: poucas linhas, mas todos os relacionamentos preenchidos
+TOTAIS_TESTE = {
+    'equipamentos': 150,
+    'pontos_medicao': 300,
+    'certificados': 400,
+    'testes_pocos': 20,
+    'analises_quimicas': 40,
+    'incertezas': 20
+}
+
+BANCOS = [
+    'sqlite',
+    pytest.param('postgresql', marks=pytest.mark.skipif(
+        not POSTGRES_URL, reason='TEST_POSTGRES_URL não definida'
+    ))
+]
+
+def limpar_postgresql(uri):
+    """Recriar o esquema public do banco de testes"""
+    engine = create_engine(uri)
+    with engine.begin() as conexao:
+        conexao.execute(text('DROP SCHEMA public CASCADE'))
+        conexao.execute(text('CREATE SCHEMA public'))
+    engine.dispose()
+
+@pytest.fixture(scope='session', params=BANCOS)
+def app(request, tmp_path_factory):
+    """Aplicação em TESTING com o esquema criado e os dados sintéticos de TOTAIS_TESTE"""
+    from src.services.dados_sinteticos import gerar_dados
+    
+    if request.param == 'sqlite':
+        uri = 'sqlite:///' + str(tmp_path_factory.mktemp('banco') / 'app.db')
+    else:
+        uri = POSTGRES_URL
+        limpar_postgresql(uri)
+    
+    with pytest.MonkeyPatch.context() as ambiente:
+        ambiente.setenv('DATABASE_URL', uri)
+        aplicacao = create_app()
+    aplicacao.config['TESTING'] = True
+    
+    with aplicacao.app_context():
+        inicializar_banco()
+        gerar_dados(TOTAIS_TESTE)
+    
+    yield aplicacao
+    
+    with aplicacao.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def contexto(app):
+    """Contexto da aplicação para consultar o banco dentro do teste"""
+    with app.app_context():
+        yield
+        db.session.remove()
+
+@contextmanager
+def comandos_sql(app):
+    """Lista dos comandos SQL executados no bloco (em qualquer thread, menos a do servidor
+    de eventos, que consulta a outbox no próprio ritmo)"""
+    comandos = []
+    
+    def registrar(conn, cursor, statement, parameters, context, executemany):
+        if not threading.current_thread().name.startswith('eventos-banco'):
+            comandos.append(statement)
+    
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', registrar)
+    try:
+        yield comandos
+    finally:
+        event.remove(engine, 'before_cursor_execute', registrar)
+
+def esperar_job(client, job_id, limite=30):
+    """Aguardar o job terminar, para não deixar escritas rodando nos testes seguintes"""
+    fim = time.monotonic() + limite
+    while time.monotonic() < fim:
+        job = client.get(f'/api/importacao/jobs/{job_id}').get_json()
+        if job['status'] in STATUS_FINAIS:
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f'Job {job_id} não terminou em {limite} s')
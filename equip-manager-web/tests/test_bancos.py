@@ -0,0 +1,112 @@
+"""Recursos que dependem do banco, rodados no SQLite e (com TEST_POSTGRES_URL) no PostgreSQL:
+gatilhos de contadores, importação (inserção por COPY no PostgreSQL e upsert) e exportação em fluxo"""
+import io
+import json
+import uuid
+import openpyxl
+import pytest
+from sqlalchemy import func, select
+from src.models.database import db, Contador, Equipamento, TABELAS_CONTADAS
+
+def contadores():
+    """Valores de 'contadores' para as tabelas contadas"""
+    return dict(db.session.execute(
+        select(Contador.chave, Contador.valor).where(Contador.chave.in_(TABELAS_CONTADAS))
+    ).all())
+
+def totais_reais():
+    """count(*) de cada tabela contada"""
+    return {
+        tabela: db.session.execute(select(func.count()).select_from(db.metadata.tables[tabela])).scalar()
+        for tabela in TABELAS_CONTADAS
+    }
+
+def csv_equipamentos(prefixo, quantidade, nome='Equipamento'):
+    """Planilha CSV com 'quantidade' equipamentos de números de série com o prefixo"""
+    linhas = ['numero_serie,tag_equipamento,nome_equipamento']
+    linhas += [f'{prefixo}-{i},{prefixo}-TAG-{i},{nome} {i}' for i in range(quantidade)]
+    return io.BytesIO(('\n'.join(linhas) + '\n').encode('utf-8'))
+
+def importar(client, arquivo, modo):
+    """Importação síncrona da planilha (sem o resultado guardado de envios anteriores)"""
+    resposta = client.post(
+        f'/api/importacao/equipamentos?modo={modo}&forcar=true',
+        data={'file': (arquivo, 'equipamentos.csv')}, content_type='multipart/form-data'
+    )
+    assert resposta.status_code == 200, resposta.get_json()
+    return resposta.get_json()
+
+@pytest.fixture
+def prefixo():
+    return f'BD-{uuid.uuid4().hex[:8]}'
+
+def test_contadores_seguem_insercoes_e_exclusoes(client, contexto, prefixo):
+    antes = contadores()
+    
+    resposta = client.post('/api/equipamentos/', json={'numero_serie': prefixo, 'nome_equipamento': 'Contado'})
+    assert resposta.status_code == 201
+    db.session.rollback()
+    assert contadores()['equipamentos'] == antes['equipamentos'] + 1
+    
+    assert client.delete(f'/api/equipamentos/{prefixo}').status_code == 200
+    db.session.rollback()
+    assert contadores() == antes
+    assert contadores() == totais_reais()
+
+def test_importacao_insere_e_atualiza_contadores(client, contexto, prefixo):
+    antes = contadores()
+    
+    # No PostgreSQL as linhas novas vão por COPY; os gatilhos por comando contam todas de uma vez
+    resultado = importar(client, csv_equipamentos(prefixo, 250), 'insert')
+    assert resultado['equipamentos_inseridos'] == 250
+    assert resultado['equipamentos_erro'] == 0
+    
+    db.session.rollback()
+    assert contadores()['equipamentos'] == antes['equipamentos'] + 250
+    assert contadores() == totais_reais()
+    
+    # Reimportar a mesma planilha no insert só gera erros de duplicidade
+    resultado = importar(client, csv_equipamentos(prefixo, 250), 'insert')
+    assert resultado['equipamentos_inseridos'] == 0
+    assert resultado['equipamentos_erro'] == 250
+
+def test_upsert_atualiza_so_o_que_mudou(client, contexto, prefixo):
+    importar(client, csv_equipamentos(prefixo, 100), 'insert')
+    
+    # Metade com nome novo, metade igual, mais 10 linhas novas
+    arquivo = io.BytesIO(
+        csv_equipamentos(prefixo, 50, 'Renomeado').getvalue()
+        + b''.join(csv_equipamentos(prefixo, 110).getvalue().splitlines(keepends=True)[51:])
+    )
+    resultado = importar(client, arquivo, 'upsert')
+    assert resultado['equipamentos_atualizados'] == 50
+    assert resultado['equipamentos_inalterados'] == 50
+    assert resultado['equipamentos_inseridos'] == 10
+    
+    db.session.rollback()
+    nome = db.session.execute(
+        select(Equipamento.nome_equipamento).where(Equipamento.numero_serie == f'{prefixo}-0')
+    ).scalar()
+    assert nome == 'Renomeado 0'
+    assert contadores() == totais_reais()
+
+@pytest.mark.parametrize('formato', ['csv', 'jsonl', 'xlsx'])
+def test_exportacao_em_fluxo_traz_todas_as_linhas(client, contexto, formato):
+    total = totais_reais()['equipamentos']
+    
+    resposta = client.get(f'/api/importacao/exportar-equipamentos?formato={formato}', buffered=False)
+    assert resposta.status_code == 200
+    assert resposta.is_streamed
+    conteudo = b''.join(resposta.response)
+    resposta.close()
+    
+    if formato == 'csv':
+        linhas = conteudo.decode('utf-8-sig').splitlines()
+        assert len(linhas) == total + 1
+    elif formato == 'jsonl':
+        registros = [json.loads(linha) for linha in conteudo.decode('utf-8').splitlines()]
+        assert len(registros) == total
+        assert all(registro['numero_serie'] for registro in registros)
+    else:
+        planilha = openpyxl.load_workbook(io.BytesIO(conteudo), read_only=True).active
+        assert sum(1 for _ in planilha.iter_rows()) == total + 1
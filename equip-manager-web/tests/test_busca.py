@@ -0,0 +1,67 @@
+"""Busca textual (parâmetro search): FTS5 no SQLite e LIKE quando o FTS5 não está disponível"""
+import uuid
+import pytest
+from sqlalchemy import text
+from src.models.database import db
+from src.services import busca
+
+@pytest.fixture(scope='module')
+def marcador(app):
+    """Equipamentos com um marcador único no número de série e no nome"""
+    marcador = uuid.uuid4().hex[:8].upper()
+    client = app.test_client()
+    for numero_serie, nome in (
+        (f'BUSCA-{marcador}-01', f'Medidor alfa {marcador}'),
+        (f'BUSCA-{marcador}-02', f'Medidor beta {marcador}'),
+        (f'OUTRO-{marcador}-03', f'Transmissor alfa {marcador}')
+    ):
+        resposta = client.post('/api/equipamentos/', json={'numero_serie': numero_serie, 'nome_equipamento': nome})
+        assert resposta.status_code == 201
+    return marcador
+
+def buscar(client, termo):
+    resposta = client.get('/api/equipamentos/', query_string={'search': termo, 'per_page': 100})
+    assert resposta.status_code == 200, resposta.get_json()
+    return sorted(equipamento['numero_serie'] for equipamento in resposta.get_json()['equipamentos'])
+
+@pytest.fixture
+def fts(app):
+    with app.app_context():
+        if not busca.busca_textual_disponivel():
+            pytest.skip('FTS5 indisponível neste banco')
+
+def test_prefixo_do_numero_de_serie(client, marcador, fts):
+    assert buscar(client, f'BUSCA-{marcador[:4]}') == [f'BUSCA-{marcador}-01', f'BUSCA-{marcador}-02']
+
+def test_todos_os_termos_precisam_aparecer(client, marcador, fts):
+    assert buscar(client, f'alfa {marcador}') == [f'BUSCA-{marcador}-01', f'OUTRO-{marcador}-03']
+    assert buscar(client, f'medidor alfa {marcador}') == [f'BUSCA-{marcador}-01']
+
+@pytest.mark.parametrize('termo', ['"', 'alfa" OR "beta', 'NOT', '(alfa', 'nome_equipamento:alfa', '*', 'a AND'])
+def test_caracteres_especiais_nao_quebram_a_consulta(client, marcador, fts, termo):
+    buscar(client, f'{termo} {marcador}')
+
+def test_like_quando_fts5_indisponivel(client, marcador, monkeypatch):
+    monkeypatch.setattr(busca, '_disponivel', False)
+    # Trecho do meio do número de série: só o LIKE '%termo%' encontra
+    assert buscar(client, f'{marcador[2:]}-0') == [
+        f'BUSCA-{marcador}-01', f'BUSCA-{marcador}-02', f'OUTRO-{marcador}-03'
+    ]
+    assert buscar(client, 'termo que não existe') == []
+
+def test_init_db_reconstroi_o_indice(app, client, marcador, fts, contexto):
+    # Índice fora de sincronia, como após um VACUUM que renumera o rowid de 'equipamentos'
+    db.session.execute(text("INSERT INTO equipamentos_fts(equipamentos_fts) VALUES ('delete-all')"))
+    db.session.commit()
+    assert buscar(client, f'BUSCA-{marcador}') == []
+    
+    resultado = app.test_cli_runner().invoke(args=['init-db', '--reconstruir-busca'])
+    assert resultado.exit_code == 0, resultado.output
+    assert 'reconstruídos' in resultado.output
+    assert buscar(client, f'BUSCA-{marcador}') == [f'BUSCA-{marcador}-01', f'BUSCA-{marcador}-02']
+
+def test_migrar_datas_com_vacuum_mantem_a_busca(app, client, marcador, fts):
+    resultado = app.test_cli_runner().invoke(args=['migrar-datas', '--vacuum'])
+    assert resultado.exit_code == 0, resultado.output
+    assert 'Banco compactado' in resultado.output
+    assert buscar(client, f'BUSCA-{marcador}') == [f'BUSCA-{marcador}-01', f'BUSCA-{marcador}-02']
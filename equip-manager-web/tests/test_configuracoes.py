@@ -0,0 +1,43 @@
+"""Cache das listas de configuração: ETag forte, 304 e invalidação nas alterações"""
+import hashlib
+import uuid
+from src.models.database import db
+from src.services.cache_configuracoes import versao_configuracao
+from tests.conftest import comandos_sql
+
+URL = '/api/configuracoes/fabricantes'
+
+def test_etag_forte_do_corpo(client):
+    resposta = client.get(URL)
+    assert resposta.status_code == 200
+    
+    etag, fraco = resposta.get_etag()
+    assert not fraco
+    assert etag == hashlib.sha256(resposta.get_data()).hexdigest()[:32]
+    assert resposta.headers['Cache-Control'] == 'no-cache'
+
+def test_if_none_match_responde_304_lendo_so_a_versao(app, client):
+    etag = client.get(URL).get_etag()[0]
+    
+    with comandos_sql(app) as comandos:
+        resposta = client.get(URL, headers={'If-None-Match': f'"{etag}"'})
+    assert resposta.status_code == 304
+    assert resposta.get_data() == b''
+    assert resposta.get_etag()[0] == etag
+    assert len(comandos) == 1
+
+def test_alteracao_incrementa_versao_e_invalida_o_cache(app, client, contexto):
+    etag = client.get(URL).get_etag()[0]
+    versao = versao_configuracao()
+    
+    nome = f'Fabricante {uuid.uuid4().hex[:8]}'
+    assert client.post(URL, json={'nome': nome}).status_code == 201
+    
+    db.session.rollback()
+    assert versao_configuracao() == versao + 1
+    
+    # O ETag antigo não vale mais: corpo novo, com o fabricante criado
+    resposta = client.get(URL, headers={'If-None-Match': f'"{etag}"'})
+    assert resposta.status_code == 200
+    assert resposta.get_etag()[0] != etag
+    assert nome in [fabricante['nome'] for fabricante in resposta.get_json()]
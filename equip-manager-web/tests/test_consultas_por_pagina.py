@@ -0,0 +1,50 @@
+"""Listas serializadas por projeção: o número de comandos SQL não depende do tamanho da página"""
+import pytest
+from tests.conftest import comandos_sql
+
+LISTAS = [
+    '/api/equipamentos/',
+    '/api/pontos-medicao/',
+    '/api/certificados/',
+    '/api/dashboard/pontos-criticos',
+    '/api/pontos-medicao/alertas-calibracao'
+]
+
+# Endpoints de alerta sem paginação: o volume varia pela janela de dias
+ALERTAS = ['/api/dashboard/pontos-criticos', '/api/pontos-medicao/alertas-calibracao']
+
+def contar(app, client, url):
+    """Comandos SQL de uma requisição (que deve responder 200)"""
+    with comandos_sql(app) as comandos:
+        resposta = client.get(url)
+    assert resposta.status_code == 200, resposta.get_json()
+    return len(comandos), resposta.get_json()
+
+@pytest.mark.parametrize('url', LISTAS)
+def test_mesmo_numero_de_comandos_para_qualquer_per_page(app, client, url):
+    # Primeira requisição aquece caches de configuração e conexões
+    contar(app, client, f'{url}?per_page=2')
+    
+    pequena, _ = contar(app, client, f'{url}?per_page=2')
+    grande, _ = contar(app, client, f'{url}?per_page=100')
+    assert pequena == grande
+
+@pytest.mark.parametrize('url', ['/api/equipamentos/', '/api/pontos-medicao/', '/api/certificados/'])
+def test_pagina_maior_traz_mais_itens(app, client, url):
+    _, pequena = contar(app, client, f'{url}?per_page=2')
+    _, grande = contar(app, client, f'{url}?per_page=100')
+    chave = next(chave for chave, valor in grande.items() if isinstance(valor, list))
+    assert len(pequena[chave]) == 2
+    assert len(grande[chave]) == 100
+
+@pytest.mark.parametrize('url', ALERTAS)
+def test_mesmo_numero_de_comandos_para_qualquer_quantidade_de_alertas(app, client, url):
+    contar(app, client, f'{url}?dias=1')
+    
+    poucos, janela_curta = contar(app, client, f'{url}?dias=1')
+    muitos, janela_longa = contar(app, client, f'{url}?dias=3650')
+    assert total_proximos(janela_longa) > total_proximos(janela_curta)
+    assert poucos == muitos
+
+def total_proximos(resposta):
+    return resposta.get('resumo', resposta)['total_proximos']
@@ -0,0 +1,40 @@
+"""Dados sintéticos: numeração das chaves depois de exclusões entre as execuções"""
+import random
+import pytest
+from sqlalchemy import delete, func, insert, select
+from src.models.database import db, Equipamento, Fabricante
+from src.services import dados_sinteticos
+from src.services.dados_sinteticos import PREFIXO, completar_lookups, proximo_numero
+
+@pytest.fixture
+def equipamentos_avulsos(contexto):
+    """Chaves sintéticas além da numeração gerada (uma delas com letras no lugar do número)"""
+    chaves = [f'{PREFIXO}-00009999', f'{PREFIXO}-ABCDEFGH']
+    db.session.execute(insert(Equipamento), [{'numero_serie': chave, 'nome_equipamento': 'Avulso'} for chave in chaves])
+    db.session.commit()
+    yield chaves
+    db.session.execute(delete(Equipamento).where(Equipamento.numero_serie.in_(chaves)))
+    db.session.commit()
+
+def test_proximo_numero_segue_o_maior_sufixo(equipamentos_avulsos):
+    # A contagem das chaves 'SIN-%' daria um número já usado
+    assert proximo_numero(Equipamento.numero_serie) == 10000
+
+def test_lookups_completados_depois_do_maior_sufixo(contexto, monkeypatch):
+    prefixo = f'{PREFIXO} {Fabricante.__tablename__} '
+    existentes = db.session.execute(select(func.count()).select_from(Fabricante)).scalar()
+    # Um fabricante sintético excluído deixa um buraco antes do último número
+    db.session.execute(insert(Fabricante), [{'nome': f'{prefixo}{numero}'} for numero in (901, 902)])
+    db.session.execute(delete(Fabricante).where(Fabricante.nome == f'{prefixo}901'))
+    db.session.commit()
+    
+    monkeypatch.setattr(dados_sinteticos, 'CARDINALIDADES', {Fabricante: existentes + 3})
+    try:
+        completar_lookups(random.Random(0))
+        nomes = db.session.execute(
+            select(Fabricante.nome).where(Fabricante.nome.like(f'{prefixo}9__')).order_by(Fabricante.nome)
+        ).scalars().all()
+        assert nomes == [f'{prefixo}{numero}' for numero in (902, 903, 904)]
+    finally:
+        db.session.execute(delete(Fabricante).where(Fabricante.nome.like(f'{prefixo}9__')))
+        db.session.commit()
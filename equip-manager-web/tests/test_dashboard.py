@@ -0,0 +1,60 @@
+"""Bundle do dashboard: ETag pela versão dos dados, cache limitado e montagem consistente"""
+import itertools
+import uuid
+import pytest
+from src.routes import dashboard
+
+URL = '/api/dashboard/bundle'
+
+@pytest.fixture
+def cache_vazio(monkeypatch):
+    monkeypatch.setattr(dashboard, '_bundles', type(dashboard._bundles)())
+    return dashboard._bundles
+
+def test_if_none_match_responde_304(client):
+    etag = client.get(URL).get_etag()[0]
+    
+    resposta = client.get(URL, headers={'If-None-Match': f'"{etag}"'})
+    assert resposta.status_code == 304
+    assert resposta.get_data() == b''
+
+def test_alteracao_de_dados_gera_corpo_novo(client):
+    primeira = client.get(URL)
+    etag = primeira.get_etag()[0]
+    total = primeira.get_json()['resumo']['totais']['equipamentos']
+    
+    numero_serie = f'BUNDLE-{uuid.uuid4().hex[:8]}'
+    assert client.post('/api/equipamentos/', json={'numero_serie': numero_serie, 'nome_equipamento': 'Novo'}).status_code == 201
+    
+    resposta = client.get(URL, headers={'If-None-Match': f'"{etag}"'})
+    assert resposta.status_code == 200
+    assert resposta.get_etag()[0] != etag
+    assert resposta.get_json()['resumo']['totais']['equipamentos'] == total + 1
+
+def test_cache_guarda_no_maximo_o_limite_de_bundles(client, cache_vazio, monkeypatch):
+    monkeypatch.setattr(dashboard, 'MAX_BUNDLES_EM_CACHE', 2)
+    for ano in (2020, 2021, 2022):
+        assert client.get(f'{URL}?ano={ano}').status_code == 200
+    
+    # O mais antigo sai primeiro
+    assert len(cache_vazio) == 2
+    assert [chave.split(':')[3] for chave in cache_vazio] == ['2021', '2022']
+
+def test_montagem_refeita_quando_a_versao_muda_no_meio(client, cache_vazio, monkeypatch):
+    # Versão lida antes e depois de cada montagem: muda durante a primeira, estável na segunda
+    versoes = iter([(1, 0), (2, 0), (2, 0)])
+    monkeypatch.setattr(dashboard, 'versoes_dados', lambda: next(versoes))
+    
+    resposta = client.get(URL)
+    assert resposta.status_code == 200
+    assert resposta.get_etag()[0] == dashboard.chave_bundle((2, 0), resposta.get_json()['cronograma']['ano'], 30)[1]
+    assert [chave.split(':')[0] for chave in cache_vazio] == ['2']
+
+def test_dados_em_alteracao_continua_respondem_sem_cache(client, cache_vazio, monkeypatch):
+    versoes = itertools.count()
+    monkeypatch.setattr(dashboard, 'versoes_dados', lambda: (next(versoes), 0))
+    
+    resposta = client.get(URL)
+    assert resposta.status_code == 200
+    assert resposta.get_etag() == (None, None)
+    assert not cache_vazio
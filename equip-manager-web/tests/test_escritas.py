@@ -0,0 +1,53 @@
+"""Fila de escritas: escritas que excedem a espera do chamador"""
+import threading
+import pytest
+from src.models.database import db, Fabricante
+from src.services import escritas
+from src.services.escritas import executar_escrita, EscritaCancelada, EscritaPendente
+
+@pytest.fixture
+def escritora_ocupada(app, contexto):
+    """Thread escritora presa em uma escrita até o fim do teste"""
+    if 'fila_escrita' not in app.extensions:
+        pytest.skip('Sem fila de escritas neste banco')
+    
+    iniciada, liberar = threading.Event(), threading.Event()
+    
+    def demorada():
+        iniciada.set()
+        liberar.wait(10)
+    
+    futuro = app.extensions['fila_escrita'].enviar(demorada, ())
+    iniciada.wait(5)
+    yield liberar
+    liberar.set()
+    futuro.result(10)
+
+def test_escrita_ainda_na_fila_e_cancelada(escritora_ocupada):
+    gravadas = []
+    with pytest.raises(EscritaCancelada):
+        executar_escrita(gravadas.append, 1, espera=0.1)
+    
+    escritora_ocupada.set()
+    executar_escrita(lambda: None)
+    assert gravadas == []
+
+def test_escrita_em_execucao_fica_pendente(app, contexto):
+    if 'fila_escrita' not in app.extensions:
+        pytest.skip('Sem fila de escritas neste banco')
+    
+    liberar = threading.Event()
+    with pytest.raises(EscritaPendente):
+        executar_escrita(liberar.wait, 10, espera=0.1)
+    liberar.set()
+
+def test_rota_responde_503_com_o_status_da_escrita(client, escritora_ocupada, monkeypatch):
+    monkeypatch.setattr(escritas.executar_escrita, '__kwdefaults__', {'espera': 0.1})
+    
+    resposta = client.post('/api/configuracoes/fabricantes', json={'nome': 'Fabricante na fila'})
+    assert resposta.status_code == 503
+    assert resposta.get_json()['status'] == 'cancelada'
+    
+    escritora_ocupada.set()
+    executar_escrita(lambda: None)
+    assert db.session.query(Fabricante).filter_by(nome='Fabricante na fila').count() == 0
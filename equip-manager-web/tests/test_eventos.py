@@ -0,0 +1,126 @@
+"""Canal de eventos (SSE): servidor asyncio à parte, redirecionamento da rota e contadores"""
+import asyncio
+import socket
+import threading
+import time
+import uuid
+import pytest
+from src.services import eventos
+from src.servidor_eventos import ServidorEventos, CAMINHO_STREAM
+
+@pytest.fixture(scope='module')
+def servidor(app):
+    """Servidor de eventos em uma porta livre, com o laço asyncio em uma thread do teste"""
+    laco = asyncio.new_event_loop()
+    servidor_eventos = ServidorEventos(app)
+    servidor = laco.run_until_complete(servidor_eventos.iniciar('127.0.0.1', 0))
+    thread = threading.Thread(target=laco.run_forever, daemon=True)
+    thread.start()
+    servidor_eventos.porta = servidor.sockets[0].getsockname()[1]
+    yield servidor_eventos
+    
+    laco.call_soon_threadsafe(laco.stop)
+    thread.join(timeout=5)
+    # Encerrar a leitura da outbox e as conexões restantes antes de fechar o laço
+    servidor.close()
+    tarefas = asyncio.all_tasks(laco)
+    for tarefa in tarefas:
+        tarefa.cancel()
+    laco.run_until_complete(asyncio.gather(*tarefas, return_exceptions=True))
+    laco.close()
+    servidor_eventos.banco.shutdown(wait=True)
+
+def conectar(servidor, consulta=''):
+    """Abrir o fluxo SSE e retornar o socket depois dos cabeçalhos e do 'retry'"""
+    conexao = socket.create_connection(('127.0.0.1', servidor.porta), timeout=5)
+    conexao.sendall(f'GET {CAMINHO_STREAM}{consulta} HTTP/1.1\r\nHost: teste\r\n\r\n'.encode())
+    recebido = b''
+    while b'retry:' not in recebido:
+        recebido += conexao.recv(4096)
+    assert recebido.startswith(b'HTTP/1.1 200')
+    assert b'text/event-stream' in recebido
+    return conexao
+
+def esperar_assinantes(servidor, quantidade, limite=5):
+    fim = time.monotonic() + limite
+    while len(servidor.assinantes) != quantidade and time.monotonic() < fim:
+        time.sleep(0.05)
+    return len(servidor.assinantes)
+
+def test_conexoes_ociosas_nao_ocupam_threads(servidor):
+    threads = threading.active_count()
+    conexoes = [conectar(servidor) for _ in range(200)]
+    try:
+        assert esperar_assinantes(servidor, 200) == 200
+        # Nenhuma thread por conexão e nenhum limite: todas atendidas pelo mesmo laço
+        assert threading.active_count() == threads
+    finally:
+        for conexao in conexoes:
+            conexao.close()
+
+def test_alteracao_chega_aos_assinantes(servidor, client):
+    conexao = conectar(servidor)
+    try:
+        # O leitor da outbox toma o último evento como ponto de partida no ciclo seguinte
+        time.sleep(eventos.INTERVALO_LEITURA * 2.5)
+        numero_serie = f'SSE-{uuid.uuid4().hex[:8]}'
+        resposta = client.post('/api/equipamentos/', json={'numero_serie': numero_serie, 'nome_equipamento': 'Ao vivo'})
+        assert resposta.status_code == 201
+        
+        recebido = b''
+        fim = time.monotonic() + 10
+        while numero_serie.encode() not in recebido and time.monotonic() < fim:
+            recebido += conexao.recv(4096)
+        assert b'event: mudanca' in recebido
+        assert numero_serie.encode() in recebido
+        assert b'"contadores"' in recebido
+    finally:
+        conexao.close()
+
+def test_reconexao_com_ultimo_evento_recebe_pendentes(servidor, client, contexto):
+    ultimo = eventos.ultimo_evento()
+    numero_serie = f'SSE-{uuid.uuid4().hex[:8]}'
+    client.post('/api/equipamentos/', json={'numero_serie': numero_serie, 'nome_equipamento': 'Perdido'})
+    
+    conexao = conectar(servidor, f'?ultimo={ultimo}')
+    try:
+        recebido = b''
+        fim = time.monotonic() + 5
+        while numero_serie.encode() not in recebido and time.monotonic() < fim:
+            recebido += conexao.recv(4096)
+        assert numero_serie.encode() in recebido
+    finally:
+        conexao.close()
+
+def test_rota_redireciona_ao_servidor_de_eventos(client):
+    resposta = client.get('/api/eventos/stream', headers={'Last-Event-ID': '42'})
+    assert resposta.status_code == 307
+    assert resposta.headers['Location'] == f'http://localhost:5001{CAMINHO_STREAM}?ultimo=42'
+
+def test_alertas_recontados_so_com_pontos_alterados(contexto, monkeypatch):
+    chamadas = []
+    original = eventos.alertas_calibracao
+    monkeypatch.setattr(eventos, 'alertas_calibracao', lambda hoje: chamadas.append(hoje) or original(hoje))
+    
+    contadores = eventos.Contadores()
+    primeiro = contadores.atuais({'equipamentos'})
+    contadores.atuais({'equipamentos', 'certificados'})
+    assert len(chamadas) == 1
+    contadores.atuais({'pontos_medicao'})
+    assert len(chamadas) == 2
+    
+    from src.models.database import db, PontoMedicao
+    from src.services.calibracao import contagem_por_status
+    status = contagem_por_status(db.session.query(PontoMedicao.id))
+    assert primeiro['vencidos'] == status['vencido']
+    assert primeiro['proximos_vencimento'] == status['proximo_vencimento']
+
+def test_outbox_aparada(app, contexto, monkeypatch):
+    from src.models.database import db, Evento
+    
+    monkeypatch.setattr(eventos, 'MAX_EVENTOS_RETIDOS', 5)
+    eventos.aparar_outbox()
+    
+    ids = db.session.query(Evento.id).order_by(Evento.id).all()
+    assert len(ids) == 5
+    assert ids[-1][0] == eventos.ultimo_evento()
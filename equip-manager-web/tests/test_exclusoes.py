@@ -0,0 +1,37 @@
+"""Exclusões recusadas quando há registros dependentes (EXISTS, sem carregar relacionamentos)"""
+import uuid
+from src.models.database import db, Equipamento, Fabricante, PontoMedicao
+from src.services.escritas import executar_escrita, inserir
+
+def test_equipamento_com_ponto_de_medicao_nao_e_excluido(app, client):
+    numero_serie = f'EXC-{uuid.uuid4().hex[:8]}'
+    with app.app_context():
+        executar_escrita(inserir, Equipamento, {'numero_serie': numero_serie, 'nome_equipamento': 'Com ponto'})
+        executar_escrita(inserir, PontoMedicao, {
+            'tag_ponto_medicao': f'{numero_serie}-PM', 'nome_ponto_medicao': 'Dependente',
+            'numero_serie_equipamento': numero_serie
+        })
+    
+    assert client.delete(f'/api/equipamentos/{numero_serie}').status_code == 400
+    assert client.get(f'/api/equipamentos/{numero_serie}').status_code == 200
+
+def test_equipamento_sem_dependentes_e_excluido(app, client):
+    numero_serie = f'EXC-{uuid.uuid4().hex[:8]}'
+    with app.app_context():
+        executar_escrita(inserir, Equipamento, {'numero_serie': numero_serie, 'nome_equipamento': 'Sozinho'})
+    
+    assert client.delete(f'/api/equipamentos/{numero_serie}').status_code == 200
+    assert client.get(f'/api/equipamentos/{numero_serie}').status_code == 404
+
+def test_fabricante_em_uso_nao_e_excluido(app, client):
+    with app.app_context():
+        fabricante_id = executar_escrita(inserir, Fabricante, {'nome': f'Fabricante {uuid.uuid4().hex[:8]}'})
+        executar_escrita(inserir, Equipamento, {
+            'numero_serie': f'EXC-{uuid.uuid4().hex[:8]}', 'nome_equipamento': 'Do fabricante',
+            'fabricante_id': fabricante_id
+        })
+        livre_id = executar_escrita(inserir, Fabricante, {'nome': f'Fabricante {uuid.uuid4().hex[:8]}'})
+        db.session.remove()
+    
+    assert client.delete(f'/api/configuracoes/fabricantes/{fabricante_id}').status_code == 400
+    assert client.delete(f'/api/configuracoes/fabricantes/{livre_id}').status_code == 200
@@ -0,0 +1,57 @@
+"""Importação de uma planilha: reenvio do mesmo arquivo e arquivos ilegíveis"""
+import io
+import uuid
+import pytest
+from src.services import importador
+
+def enviar(client, conteudo, consulta='', nome='equipamentos.csv'):
+    return client.post(
+        f'/api/importacao/equipamentos{consulta}', data={'file': (io.BytesIO(conteudo), nome)},
+        content_type='multipart/form-data'
+    )
+
+@pytest.fixture
+def importacoes(monkeypatch):
+    """Lista que recebe um item a cada leitura de planilha pela importação síncrona"""
+    chamadas = []
+    original = importador.importar_arquivo
+    
+    def contar(*args, **kwargs):
+        chamadas.append(args)
+        return original(*args, **kwargs)
+    
+    monkeypatch.setattr(importador, 'importar_arquivo', contar)
+    return chamadas
+
+def test_reenvio_devolve_o_resultado_guardado_sem_reprocessar(client, importacoes):
+    conteudo = f'numero_serie,nome_equipamento\nREENVIO-{uuid.uuid4().hex[:8]},Enviado duas vezes\n'.encode()
+    
+    primeira = enviar(client, conteudo)
+    assert primeira.status_code == 200
+    assert primeira.get_json()['equipamentos_inseridos'] == 1
+    assert len(importacoes) == 1
+    
+    segunda = enviar(client, conteudo, nome='copia.csv')
+    assert segunda.status_code == 200
+    dados = segunda.get_json()
+    assert dados['duplicado'] is True
+    assert dados['importado_em']
+    assert dados['equipamentos_inseridos'] == 1
+    assert len(importacoes) == 1
+
+def test_reenvio_forcado_reprocessa(client, importacoes):
+    conteudo = f'numero_serie,nome_equipamento\nFORCADO-{uuid.uuid4().hex[:8]},Enviado duas vezes\n'.encode()
+    assert enviar(client, conteudo).status_code == 200
+    
+    forcada = enviar(client, conteudo, '?forcar=true')
+    assert forcada.status_code == 200
+    dados = forcada.get_json()
+    assert 'duplicado' not in dados
+    # Processado de novo: a linha agora é duplicada no modo insert
+    assert dados['equipamentos_erro'] == 1
+    assert len(importacoes) == 2
+
+def test_planilha_ilegivel_e_recusada(client):
+    resposta = enviar(client, b'isto nao e uma planilha', nome='equipamentos.xlsx')
+    assert resposta.status_code == 400
+    assert resposta.get_json()['error'].startswith('Planilha ilegível')
@@ -0,0 +1,76 @@
+"""Importação em lote: limites dos ZIPs, planilhas ilegíveis, pool quebrado e fila de escritas ocupada"""
+import io
+import uuid
+import zipfile
+import pytest
+from src.services import importacao_lote
+from src.services.escritas import EscritaCancelada
+
+def zip_com(arquivos):
+    """ZIP em memória com os arquivos {nome: conteúdo}"""
+    saida = io.BytesIO()
+    with zipfile.ZipFile(saida, 'w', zipfile.ZIP_DEFLATED) as pacote:
+        for nome, conteudo in arquivos.items():
+            pacote.writestr(nome, conteudo)
+    saida.seek(0)
+    return saida
+
+def enviar(client, pacote, nome='planilhas.zip'):
+    return client.post(
+        '/api/importacao/equipamentos/lote', data={'files': (pacote, nome)},
+        content_type='multipart/form-data'
+    )
+
+def test_zip_com_entradas_demais_e_recusado(app, client, monkeypatch):
+    monkeypatch.setitem(app.config, 'MAX_MEMBROS_ZIP', 3)
+    resposta = enviar(client, zip_com({f'leia-me-{i}.txt': 'x' for i in range(4)}))
+    assert resposta.status_code == 400
+    assert 'mais de 3 arquivos' in resposta.get_json()['error']
+
+def test_zip_grande_demais_descompactado_e_recusado(app, client, monkeypatch):
+    monkeypatch.setitem(app.config, 'MAX_TAMANHO_ZIP', 10000)
+    # Comprime para poucos bytes, mas descompactado passa do limite
+    resposta = enviar(client, zip_com({'a.csv': 'numero_serie,nome_equipamento\n' + 'x' * 20000}))
+    assert resposta.status_code == 400
+    assert 'descompactadas' in resposta.get_json()['error']
+
+@pytest.mark.parametrize('conteudo', [b'isto nao e uma planilha\n', bytes(range(256))])
+def test_planilha_ilegivel_aparece_no_relatorio(client, conteudo):
+    resposta = enviar(client, zip_com({
+        'a.csv': 'numero_serie,nome_equipamento\nLOTE-ILEGIVEL-1,Equipamento do lote\n',
+        'c.csv': conteudo
+    }))
+    assert resposta.status_code == 200, resposta.get_json()
+    
+    dados = resposta.get_json()
+    arquivos = {item['arquivo']: item for item in dados['arquivos']}
+    assert arquivos['planilhas.zip/c.csv']['mensagem'].startswith('Planilha ilegível')
+    assert any(erro.startswith('planilhas.zip/c.csv: Planilha ilegível') for erro in dados['erros'])
+    assert arquivos['planilhas.zip/a.csv']['mensagem'] is None
+
+def planilha(prefixo):
+    return zip_com({'a.csv': f'numero_serie,nome_equipamento\n{prefixo}-1,Equipamento do lote\n'})
+
+def test_pool_quebrado_e_recriado(client):
+    prefixo = f'LOTE-{uuid.uuid4().hex[:8]}'
+    assert enviar(client, planilha(f'{prefixo}-A')).status_code == 200
+    
+    # Um processo do pool morre entre dois envios: o pool fica quebrado
+    quebrado = importacao_lote._pool
+    for processo in list(quebrado._processes.values()):
+        processo.kill()
+        processo.join()
+    
+    resposta = enviar(client, planilha(f'{prefixo}-B'))
+    assert resposta.status_code == 200, resposta.get_json()
+    assert resposta.get_json()['equipamentos_inseridos'] == 1
+    assert importacao_lote._pool is not quebrado
+
+def test_fila_de_escritas_ocupada_responde_503(client, monkeypatch):
+    def ocupada(*args, **kwargs):
+        raise EscritaCancelada('Fila de escritas ocupada: nada foi gravado, tente novamente')
+    
+    monkeypatch.setattr(importacao_lote, 'executar_escrita', ocupada)
+    resposta = enviar(client, planilha(f'LOTE-{uuid.uuid4().hex[:8]}'))
+    assert resposta.status_code == 503
+    assert resposta.get_json()['status'] == 'cancelada'
@@ -0,0 +1,113 @@
+"""Jobs de importação: retomada de jobs com erro ou interrompidos"""
+import os
+import socket
+import subprocess
+import sys
+import uuid
+from datetime import datetime, timedelta
+import pytest
+from src.models.database import db, JobImportacao
+from src.services import jobs
+from src.services.escritas import executar_escrita, inserir, alterar
+from src.services.jobs import TEMPO_SEM_SINAL
+from src.services.uploads import resultado_anterior
+from tests.conftest import esperar_job
+
+@pytest.fixture
+def criar_job(app, tmp_path):
+    """Registrar um job de importação de um CSV com uma linha, no status e com o sinal, o executor e o hash informados"""
+    
+    def criar(status, atualizado_em, executor=None, hash=None):
+        job_id = uuid.uuid4().hex
+        arquivo = tmp_path / f'{job_id}.csv'
+        arquivo.write_text(f'numero_serie,nome_equipamento\nJOB-{job_id[:8]},Importado pelo job\n', encoding='utf-8')
+        with app.app_context():
+            executar_escrita(inserir, JobImportacao, {
+                'id': job_id, 'tipo': 'equipamentos', 'modo': 'insert', 'arquivo': arquivo.name,
+                'caminho': str(arquivo), 'status': status, 'atualizado_em': atualizado_em,
+                'executor': executor, 'hash': hash
+            })
+        return job_id
+    
+    return criar
+
+@pytest.mark.parametrize('status', ['pendente', 'processando'])
+def test_job_sem_sinal_e_retomado(client, criar_job, status):
+    job_id = criar_job(status, datetime.now() - TEMPO_SEM_SINAL - timedelta(minutes=1))
+    assert client.get(f'/api/importacao/jobs/{job_id}').get_json()['retomavel']
+    
+    assert client.post(f'/api/importacao/jobs/{job_id}/retomar').status_code == 202
+    job = esperar_job(client, job_id)
+    assert job['status'] == 'concluido'
+    assert job['importados'] == 1
+
+def test_job_em_andamento_com_sinal_recente_nao_e_retomado(client, criar_job):
+    job_id = criar_job('processando', datetime.now())
+    assert not client.get(f'/api/importacao/jobs/{job_id}').get_json()['retomavel']
+    assert client.post(f'/api/importacao/jobs/{job_id}/retomar').status_code == 409
+
+def test_job_so_e_retomado_uma_vez(client, criar_job):
+    job_id = criar_job('erro', datetime.now())
+    assert client.post(f'/api/importacao/jobs/{job_id}/retomar').status_code == 202
+    assert client.post(f'/api/importacao/jobs/{job_id}/retomar').status_code == 409
+    assert esperar_job(client, job_id)['status'] == 'concluido'
+
+def test_job_de_processo_encerrado_e_retomado_mesmo_com_sinal_recente(client, criar_job):
+    # Pid de um processo que já terminou, nesta máquina
+    encerrado = subprocess.Popen([sys.executable, '-c', 'pass'])
+    encerrado.wait()
+    job_id = criar_job('processando', datetime.now(), executor=f'{socket.gethostname()}:{encerrado.pid}')
+    
+    assert client.get(f'/api/importacao/jobs/{job_id}').get_json()['retomavel']
+    assert client.post(f'/api/importacao/jobs/{job_id}/retomar').status_code == 202
+    assert esperar_job(client, job_id)['status'] == 'concluido'
+
+def test_job_de_processo_vivo_nao_e_retomado_mesmo_com_sinal_parado(client, criar_job):
+    # Parte lenta em outro worker: o executor ainda existe
+    antigo = datetime.now() - TEMPO_SEM_SINAL - timedelta(minutes=1)
+    job_id = criar_job('processando', antigo, executor=f'{socket.gethostname()}:{os.getppid()}')
+    
+    assert not client.get(f'/api/importacao/jobs/{job_id}').get_json()['retomavel']
+    assert client.post(f'/api/importacao/jobs/{job_id}/retomar').status_code == 409
+
+def test_sinal_renovado_sem_gravar_partes(app, client, criar_job):
+    antigo = datetime.now() - TEMPO_SEM_SINAL - timedelta(minutes=1)
+    job_id = criar_job('processando', antigo, executor='outra-maquina:1')
+    
+    # Job em execução neste processo (parte em andamento): o sinal é renovado mesmo assim
+    jobs.reservar_progresso(job_id, linhas_processadas=0)
+    try:
+        jobs.renovar_sinais(app)
+    finally:
+        jobs.descartar_progresso(job_id)
+    
+    with app.app_context():
+        job = db.session.get(JobImportacao, job_id)
+        assert job.atualizado_em > datetime.now() - timedelta(minutes=1)
+        assert not jobs.interrompido(job)
+        db.session.remove()
+
+def test_job_retomado_guarda_o_resultado_do_arquivo(client, criar_job):
+    job_id = criar_job('erro', datetime.now(), hash='a' * 64)
+    assert client.post(f'/api/importacao/jobs/{job_id}/retomar').status_code == 202
+    job = esperar_job(client, job_id)
+    assert job['status'] == 'concluido'
+    
+    # O hash gravado na criação do job chega ao registro usado para detectar reenvios
+    with client.application.app_context():
+        resultado = resultado_anterior('a' * 64, 'equipamentos', 'insert')
+        db.session.remove()
+    assert resultado is not None
+    assert resultado['importados'] == 1
+
+def test_velocidade_conta_so_as_linhas_desde_a_retomada(app, client, criar_job):
+    job_id = criar_job('processando', datetime.now())
+    agora = datetime.now()
+    with app.app_context():
+        # Retomado há 10 s a partir de 1000 linhas confirmadas, com 500 processadas desde então
+        executar_escrita(alterar, JobImportacao, job_id, {
+            'status': 'concluido', 'linhas_confirmadas': 1500, 'linhas_processadas': 1500, 'linhas_no_inicio': 1000,
+            'iniciado_em': agora - timedelta(seconds=10), 'concluido_em': agora
+        })
+    
+    assert client.get(f'/api/importacao/jobs/{job_id}').get_json()['linhas_por_segundo'] == 50.0
@@ -0,0 +1,72 @@
+"""Métricas por endpoint em /metrics (Prometheus) e o cabeçalho Server-Timing"""
+import re
+import pytest
+from src.models.database import db, Equipamento
+from src.services.metricas import BUCKETS_LATENCIA, TIPO_CONTEUDO
+from tests.conftest import comandos_sql
+
+SERIE = re.compile(r'^(\w+)\{(.*)\} (\S+)$')
+
+def series(client):
+    """Valores publicados em /metrics: (nome, rótulos) -> valor"""
+    resposta = client.get('/metrics')
+    assert resposta.status_code == 200
+    assert resposta.content_type == TIPO_CONTEUDO
+    valores = {}
+    for linha in resposta.get_data(as_text=True).splitlines():
+        encontrada = SERIE.match(linha)
+        if encontrada:
+            nome, rotulos, valor = encontrada.groups()
+            valores[nome, rotulos] = float(valor)
+    return valores
+
+def rotulos(endpoint, metodo='GET', status=200, **extras):
+    texto = f'method="{metodo}",endpoint="{endpoint}",status="{status}"'
+    return texto + ''.join(f',{nome}="{valor}"' for nome, valor in extras.items())
+
+@pytest.fixture
+def numero_serie(contexto):
+    return db.session.query(Equipamento.numero_serie).order_by(Equipamento.numero_serie).limit(1).scalar()
+
+def test_histograma_e_comandos_sql_por_endpoint(app, client, numero_serie):
+    base = rotulos('equipamentos.obter_equipamento')
+    antes = series(client)
+    
+    with comandos_sql(app) as comandos:
+        assert client.get(f'/api/equipamentos/{numero_serie}').status_code == 200
+    depois = series(client)
+    
+    def diferenca(nome, rotulos_serie=base):
+        return depois[nome, rotulos_serie] - antes.get((nome, rotulos_serie), 0)
+    
+    assert diferenca('http_request_duration_seconds_count') == 1
+    assert diferenca('http_request_duration_seconds_bucket', rotulos(
+        'equipamentos.obter_equipamento', le='+Inf'
+    )) == 1
+    assert diferenca('http_request_duration_seconds_sum') > 0
+    # Buckets acumulados: cada limite conta ao menos as requisições do anterior
+    buckets = [depois['http_request_duration_seconds_bucket', f'{base},le="{limite}"'] for limite in BUCKETS_LATENCIA]
+    assert buckets == sorted(buckets)
+    
+    assert comandos
+    assert diferenca('http_request_sql_queries_total') == len(comandos)
+    assert diferenca('http_response_size_bytes_total') > 0
+
+def test_bytes_das_respostas_em_fluxo(client):
+    base = rotulos('importacao.exportar_equipamentos')
+    antes = series(client).get(('http_response_size_bytes_total', base), 0)
+    
+    resposta = client.get('/api/importacao/exportar-equipamentos?formato=csv')
+    assert resposta.status_code == 200
+    tamanho = len(resposta.get_data())
+    
+    assert series(client)['http_response_size_bytes_total', base] - antes == tamanho
+
+def test_server_timing_so_quando_habilitado(app, client, numero_serie, monkeypatch):
+    url = f'/api/equipamentos/{numero_serie}'
+    monkeypatch.setitem(app.config, 'SERVER_TIMING', False)
+    assert 'Server-Timing' not in client.get(url).headers
+    
+    monkeypatch.setitem(app.config, 'SERVER_TIMING', True)
+    cabecalho = client.get(url).headers['Server-Timing']
+    assert re.fullmatch(r'app;dur=\d+\.\d, db;dur=\d+\.\d;desc="[1-9]\d* consultas"', cabecalho)
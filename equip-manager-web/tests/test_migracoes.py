@@ -0,0 +1,100 @@
+"""Migração de bancos legados: colunas novas, datas em texto e índices das consultas críticas"""
+import uuid
+import pytest
+from sqlalchemy import Column, Integer, MetaData, String, Table, text
+from src.models.database import db, definicao_coluna
+from src.models.migracoes import migrar_datas, verificar_planos_consulta
+
+@pytest.fixture
+def sqlite(app):
+    with app.app_context():
+        if db.engine.dialect.name != 'sqlite':
+            pytest.skip('migrar-datas só se aplica ao SQLite')
+        yield
+        db.session.remove()
+
+@pytest.fixture
+def ponto_legado(sqlite):
+    """Ponto de medição gravado por uma versão antiga, com datas em texto livre"""
+    tag = f'MIG-{uuid.uuid4().hex[:8]}'
+    db.session.execute(text(
+        'INSERT INTO pontos_medicao (tag_ponto_medicao, nome_ponto_medicao, versao, '
+        'data_proxima_calibracao, data_ultima_calibracao, data_retirada) '
+        "VALUES (:tag, 'Legado', 1, '31/12/2030', '2024-01-15 00:00:00', 'sem data')"
+    ), {'tag': tag})
+    db.session.commit()
+    yield tag
+    db.session.execute(text('DELETE FROM pontos_medicao WHERE tag_ponto_medicao = :tag'), {'tag': tag})
+    db.session.commit()
+
+def datas_do_ponto(tag):
+    return db.session.execute(text(
+        'SELECT data_proxima_calibracao, data_ultima_calibracao, data_retirada '
+        'FROM pontos_medicao WHERE tag_ponto_medicao = :tag'
+    ), {'tag': tag}).one()
+
+def test_datas_normalizadas_e_invalidas_anuladas(ponto_legado):
+    relatorio = migrar_datas()
+    
+    assert not relatorio['rejeitados']
+    assert relatorio['normalizados'] >= 2
+    assert any("'sem data'" in descricao for descricao in relatorio['anulados'])
+    assert tuple(datas_do_ponto(ponto_legado)) == ('2030-12-31', '2024-01-15', None)
+
+def test_data_invalida_em_coluna_obrigatoria_cancela_a_migracao(ponto_legado):
+    numero_serie = db.session.execute(text('SELECT numero_serie FROM equipamentos LIMIT 1')).scalar()
+    db.session.execute(text(
+        "INSERT INTO certificados (numero_serie_equipamento, numero_certificado, data_certificado) "
+        "VALUES (:numero_serie, 'MIG-CERT', 'nunca')"
+    ), {'numero_serie': numero_serie})
+    db.session.commit()
+    try:
+        relatorio = migrar_datas()
+        assert any("'nunca'" in descricao for descricao in relatorio['rejeitados'])
+        # Nada foi gravado, nem as datas que seriam normalizadas
+        assert datas_do_ponto(ponto_legado)[0] == '31/12/2030'
+    finally:
+        db.session.execute(text("DELETE FROM certificados WHERE numero_certificado = 'MIG-CERT'"))
+        db.session.commit()
+
+def test_indices_ausentes_criados_e_usados_pelas_consultas(sqlite):
+    db.session.execute(text('DROP INDEX ix_pontos_medicao_data_proxima_calibracao'))
+    db.session.commit()
+    assert not all(usa_indice for _, _, _, usa_indice in verificar_planos_consulta())
+    
+    relatorio = migrar_datas()
+    assert 'ix_pontos_medicao_data_proxima_calibracao' in relatorio['indices_criados']
+    
+    for nome, indice, plano, usa_indice in verificar_planos_consulta():
+        assert usa_indice, f'{nome}: esperado {indice}, plano {plano}'
+
+def test_default_da_coluna_nova_compilado_pelo_dialeto(sqlite):
+    tabela = Table(
+        'coluna_nova', MetaData(),
+        Column('texto', String(10), nullable=False, server_default='insert'),
+        Column('numero', Integer, nullable=False, server_default=text('0')),
+        Column('momento', String(30), server_default=text('CURRENT_TIMESTAMP'))
+    )
+    assert definicao_coluna(tabela.c.texto) == "texto VARCHAR(10) DEFAULT 'insert' NOT NULL"
+    assert definicao_coluna(tabela.c.numero) == 'numero INTEGER DEFAULT 0 NOT NULL'
+    assert definicao_coluna(tabela.c.momento) == 'momento VARCHAR(30) DEFAULT CURRENT_TIMESTAMP'
+
+def test_coluna_ausente_acrescentada_com_o_default(sqlite):
+    from src.models.database import adicionar_colunas_ausentes
+    
+    db.session.execute(text('ALTER TABLE jobs_importacao DROP COLUMN linhas_no_inicio'))
+    db.session.execute(text(
+        "INSERT INTO jobs_importacao (id, tipo, modo, status, linhas_processadas, linhas_confirmadas, importados, "
+        "atualizados, inalterados, total_erros, criado_em) "
+        "VALUES ('migracao', 'equipamentos', 'insert', 'erro', 0, 0, 0, 0, 0, 0, CURRENT_TIMESTAMP)"
+    ))
+    db.session.commit()
+    try:
+        assert adicionar_colunas_ausentes() == ['jobs_importacao.linhas_no_inicio']
+        valor = db.session.execute(text(
+            "SELECT linhas_no_inicio, typeof(linhas_no_inicio) FROM jobs_importacao WHERE id = 'migracao'"
+        )).one()
+        assert tuple(valor) == (0, 'integer')
+    finally:
+        db.session.execute(text("DELETE FROM jobs_importacao WHERE id = 'migracao'"))
+        db.session.commit()
@@ -0,0 +1,142 @@
+"""Orçamento de consultas: todas as rotas com @orcamento_consultas rodam em TESTING,
+onde um N+1 (ou qualquer comando acima do orçamento) levanta ConsultasExcessivas"""
+import pytest
+from src.models.database import db, Equipamento, PontoMedicao, Certificado, JobImportacao
+from src.services.consultas import ConsultasExcessivas
+from src.services.escritas import executar_escrita, inserir
+from tests.conftest import esperar_job
+
+PREFIXO = 'ORC'
+
+# Requisição de cada rota com orçamento: endpoint -> (método, url, json) a partir dos registros
+REQUISICOES = {
+    'equipamentos.listar_equipamentos': lambda r: ('GET', '/api/equipamentos/?per_page=50', None),
+    'equipamentos.criar_equipamento': lambda r: ('POST', '/api/equipamentos/', {
+        'numero_serie': f'{PREFIXO}-EQ-NOVO', 'nome_equipamento': 'Criado no teste',
+        'tag_equipamento': f'{PREFIXO}-TAG-NOVO', 'fabricante_id': r['fabricante_id']
+    }),
+    'equipamentos.obter_equipamento': lambda r: ('GET', f'/api/equipamentos/{r["equipamento"]}', None),
+    'equipamentos.atualizar_equipamento': lambda r: ('PUT', f'/api/equipamentos/{r["equipamento"]}', {
+        'nome_equipamento': 'Alterado no teste', 'tag_equipamento': f'{PREFIXO}-TAG-ALTERADA'
+    }),
+    'equipamentos.deletar_equipamento': lambda r: ('DELETE', f'/api/equipamentos/{r["equipamento_removido"]}', None),
+    'equipamentos.estatisticas_equipamentos': lambda r: ('GET', '/api/equipamentos/estatisticas', None),
+    'pontos_medicao.listar_pontos_medicao': lambda r: ('GET', '/api/pontos-medicao/?per_page=50', None),
+    'pontos_medicao.criar_ponto_medicao': lambda r: ('POST', '/api/pontos-medicao/', {
+        'tag_ponto_medicao': f'{PREFIXO}-PM-NOVO', 'nome_ponto_medicao': 'Criado no teste',
+        'numero_serie_equipamento': r['equipamento'], 'data_proxima_calibracao': '2030-01-01'
+    }),
+    'pontos_medicao.obter_ponto_medicao': lambda r: ('GET', f'/api/pontos-medicao/{r["ponto"]}', None),
+    'pontos_medicao.atualizar_ponto_medicao': lambda r: ('PUT', f'/api/pontos-medicao/{r["ponto"]}', {
+        'nome_ponto_medicao': 'Alterado no teste', 'numero_serie_equipamento': r['equipamento']
+    }),
+    'pontos_medicao.deletar_ponto_medicao': lambda r: ('DELETE', f'/api/pontos-medicao/{r["ponto_removido"]}', None),
+    'pontos_medicao.alertas_calibracao': lambda r: ('GET', '/api/pontos-medicao/alertas-calibracao?dias=3650', None),
+    'certificados.listar_certificados': lambda r: ('GET', '/api/certificados/?per_page=50', None),
+    'certificados.criar_certificado': lambda r: ('POST', '/api/certificados/', {
+        'numero_serie_equipamento': r['equipamento'], 'numero_certificado': f'{PREFIXO}-CERT-NOVO',
+        'data_certificado': '2024-05-01'
+    }),
+    'certificados.obter_certificado': lambda r: ('GET', f'/api/certificados/{r["certificado"]}', None),
+    'certificados.atualizar_certificado': lambda r: ('PUT', f'/api/certificados/{r["certificado"]}', {
+        'revisao_certificado': '1'
+    }),
+    'certificados.deletar_certificado': lambda r: ('DELETE', f'/api/certificados/{r["certificado_removido"]}', None),
+    'certificados.certificados_por_equipamento': lambda r: (
+        'GET', f'/api/certificados/equipamento/{r["equipamento"]}', None
+    ),
+    'configuracoes.listar_fabricantes': lambda r: ('GET', '/api/configuracoes/fabricantes', None),
+    'configuracoes.listar_tipos_equipamento': lambda r: ('GET', '/api/configuracoes/tipos-equipamento', None),
+    'configuracoes.listar_polos': lambda r: ('GET', '/api/configuracoes/polos', None),
+    'configuracoes.listar_instalacoes': lambda r: ('GET', '/api/configuracoes/instalacoes', None),
+    'configuracoes.listar_unidades': lambda r: ('GET', '/api/configuracoes/unidades', None),
+    'configuracoes.listar_classificacoes_ponto_medicao': lambda r: (
+        'GET', '/api/configuracoes/classificacoes-ponto-medicao', None
+    ),
+    'configuracoes.listar_naturezas_teste_analise': lambda r: ('GET', '/api/configuracoes/naturezas-teste-analise', None),
+    'configuracoes.listar_status': lambda r: ('GET', '/api/configuracoes/status', None),
+    'configuracoes.listar_criterios_aceitacao': lambda r: ('GET', '/api/configuracoes/criterios-aceitacao', None),
+    'configuracoes.obter_todas_configuracoes': lambda r: ('GET', '/api/configuracoes/todas', None),
+    'dashboard.resumo_geral': lambda r: ('GET', '/api/dashboard/resumo', None),
+    'dashboard.estatisticas_equipamentos': lambda r: ('GET', '/api/dashboard/estatisticas-equipamentos', None),
+    'dashboard.cronograma_calibracoes': lambda r: ('GET', '/api/dashboard/cronograma-calibracoes', None),
+    'dashboard.pontos_criticos': lambda r: ('GET', '/api/dashboard/pontos-criticos?dias=3650', None),
+    'dashboard.bundle': lambda r: ('GET', '/api/dashboard/bundle', None),
+    'dashboard.ultimas_atividades': lambda r: ('GET', '/api/dashboard/ultimas-atividades', None),
+    'dashboard.indicadores_performance': lambda r: ('GET', '/api/dashboard/indicadores-performance', None),
+    'importacao.status_job': lambda r: ('GET', f'/api/importacao/jobs/{r["job"]}', None),
+    'importacao.retomar_job_importacao': lambda r: ('POST', f'/api/importacao/jobs/{r["job"]}/retomar', None),
+    'importacao.exportar_equipamentos': lambda r: ('GET', '/api/importacao/exportar-equipamentos?formato=csv', None),
+    'importacao.exportar_pontos_medicao': lambda r: ('GET', '/api/importacao/exportar-pontos-medicao?formato=csv', None),
+    'importacao.template_equipamentos': lambda r: ('GET', '/api/importacao/template-equipamentos', None),
+    'importacao.template_pontos_medicao': lambda r: ('GET', '/api/importacao/template-pontos-medicao', None),
+}
+
+@pytest.fixture(scope='module')
+def registros(app, tmp_path_factory):
+    """Registros usados pelas rotas de detalhe, alteração e exclusão (e um job que terminou em erro)"""
+    from src.models.database import Fabricante
+    
+    arquivo = tmp_path_factory.mktemp('job') / 'equipamentos.csv'
+    arquivo.write_text(f'numero_serie,nome_equipamento\n{PREFIXO}-EQ-JOB,Importado pelo job\n', encoding='utf-8')
+    
+    with app.app_context():
+        registros = {'fabricante_id': db.session.query(Fabricante.id).limit(1).scalar()}
+        for chave in ('equipamento', 'equipamento_removido'):
+            registros[chave] = f'{PREFIXO}-{chave}'
+            executar_escrita(inserir, Equipamento, {
+                'numero_serie': registros[chave], 'nome_equipamento': chave,
+                'fabricante_id': registros['fabricante_id']
+            })
+        for chave in ('ponto', 'ponto_removido'):
+            registros[chave] = executar_escrita(inserir, PontoMedicao, {
+                'tag_ponto_medicao': f'{PREFIXO}-{chave}', 'nome_ponto_medicao': chave,
+                'numero_serie_equipamento': registros['equipamento']
+            })
+        for chave in ('certificado', 'certificado_removido'):
+            registros[chave] = executar_escrita(inserir, Certificado, {
+                'numero_serie_equipamento': registros['equipamento'], 'numero_certificado': f'{PREFIXO}-{chave}',
+                'data_certificado': '2024-01-01'
+            })
+        registros['job'] = f'{PREFIXO.lower()}{"0" * 29}'
+        executar_escrita(inserir, JobImportacao, {
+            'id': registros['job'], 'tipo': 'equipamentos', 'modo': 'insert', 'arquivo': arquivo.name,
+            'caminho': str(arquivo), 'status': 'erro', 'mensagem': 'Interrompido no teste'
+        })
+        db.session.remove()
+    return registros
+
+def test_todas_as_rotas_com_orcamento_estao_cobertas(app):
+    com_orcamento = {
+        endpoint for endpoint, visao in app.view_functions.items()
+        if getattr(visao, 'orcamento_consultas', None) is not None
+    }
+    assert com_orcamento == set(REQUISICOES)
+
+@pytest.mark.parametrize('endpoint', REQUISICOES)
+def test_rota_dentro_do_orcamento(client, registros, endpoint):
+    metodo, url, dados = REQUISICOES[endpoint](registros)
+    
+    # Um comando além do orçamento levanta ConsultasExcessivas no after_request
+    resposta = client.open(url, method=metodo, json=dados)
+    assert resposta.status_code < 400, resposta.get_data(as_text=True)
+    resposta.get_data()
+    
+    if endpoint == 'importacao.retomar_job_importacao':
+        assert esperar_job(client, registros['job'])['status'] == 'concluido'
+
+def test_n_mais_um_acima_do_orcamento_falha(app, client, registros, monkeypatch):
+    endpoint = 'equipamentos.obter_equipamento'
+    original = app.view_functions[endpoint]
+    
+    def com_n_mais_um(numero_serie):
+        # Uma consulta por certificado, como um relacionamento carregado preguiçosamente em laço
+        for (certificado_id,) in db.session.query(Certificado.id).limit(5).all():
+            db.session.get(Certificado, certificado_id)
+        return original(numero_serie)
+    
+    com_n_mais_um.orcamento_consultas = original.orcamento_consultas
+    monkeypatch.setitem(app.view_functions, endpoint, com_n_mais_um)
+    
+    with pytest.raises(ConsultasExcessivas):
+        client.get(f'/api/equipamentos/{registros["equipamento"]}')
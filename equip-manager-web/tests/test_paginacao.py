@@ -0,0 +1,58 @@
+"""Paginação: per_page fora dos limites e cursores adulterados"""
+import base64
+import json
+import pytest
+
+LISTAS = ['/api/equipamentos/', '/api/pontos-medicao/', '/api/certificados/']
+
+def cursor(valores):
+    return base64.urlsafe_b64encode(json.dumps(valores).encode()).decode().rstrip('=')
+
+@pytest.mark.parametrize('url', LISTAS)
+@pytest.mark.parametrize('per_page', [0, -1])
+def test_per_page_menor_que_um_vira_um(client, url, per_page):
+    for modo in ('cursor=&', ''):
+        resposta = client.get(f'{url}?{modo}per_page={per_page}')
+        assert resposta.status_code == 200, resposta.get_json()
+        assert resposta.get_json()['per_page'] == 1
+
+@pytest.mark.parametrize('url', LISTAS)
+def test_per_page_limitado_ao_maximo(client, url):
+    from src.services.paginacao import MAX_POR_PAGINA
+    resposta = client.get(f'{url}?cursor=&per_page={MAX_POR_PAGINA + 1}')
+    assert resposta.get_json()['per_page'] == MAX_POR_PAGINA
+
+@pytest.mark.parametrize('url, valores', [
+    ('/api/certificados/', [{'a': 1}, 1]),
+    ('/api/certificados/', ['2024-13-45', 1]),
+    ('/api/certificados/', ['2024-01-01', '1']),
+    ('/api/certificados/', ['2024-01-01', True]),
+    ('/api/pontos-medicao/', ['1']),
+    ('/api/pontos-medicao/', [None]),
+    ('/api/pontos-medicao/', [1, 2]),
+])
+def test_cursor_com_tipo_errado_responde_400(client, url, valores):
+    resposta = client.get(f'{url}?cursor={cursor(valores)}')
+    assert resposta.status_code == 400
+    assert resposta.get_json()['error'] == 'Cursor inválido'
+
+@pytest.mark.parametrize('url', LISTAS)
+def test_cursor_percorre_as_paginas_sem_repetir(client, url):
+    vistos = []
+    proximo = ''
+    for _ in range(3):
+        dados = client.get(f'{url}?cursor={proximo}&per_page=7').get_json()
+        itens = next(valor for valor in dados.values() if isinstance(valor, list))
+        vistos.extend(tuple(sorted(item.items())) for item in itens)
+        proximo = dados['next_cursor']
+    assert len(vistos) == 21 == len(set(vistos))
+
+@pytest.mark.parametrize('parametros, com_contagem', [
+    ('', True),
+    ('count=false', False),
+    ('cursor=', False),
+    ('cursor=&count=true', True),
+])
+def test_contagem_por_status_dos_pontos(client, parametros, com_contagem):
+    dados = client.get(f'/api/pontos-medicao/?{parametros}').get_json()
+    assert ('contagem_status' in dados) == com_contagem
@@ -0,0 +1,71 @@
+"""Exportação e reimportação de pontos de medição: colunas '_versao' e '_hash'"""
+import csv
+import io
+from sqlalchemy import select
+from src.models.database import db, PontoMedicao
+
+def exportar_pontos(client):
+    """Linhas (dicionários por cabeçalho) do CSV exportado"""
+    resposta = client.get('/api/importacao/exportar-pontos-medicao?formato=csv')
+    assert resposta.status_code == 200
+    return list(csv.DictReader(io.StringIO(resposta.get_data().decode('utf-8-sig'))))
+
+def reimportar_pontos(client, linhas):
+    """Reenviar as linhas como CSV (importação síncrona, sem o resultado guardado de envios anteriores)"""
+    saida = io.StringIO()
+    escritor = csv.DictWriter(saida, fieldnames=list(linhas[0]))
+    escritor.writeheader()
+    escritor.writerows(linhas)
+    resposta = client.post(
+        '/api/importacao/pontos-medicao?forcar=true',
+        data={'file': (io.BytesIO(saida.getvalue().encode('utf-8')), 'pontos.csv')},
+        content_type='multipart/form-data'
+    )
+    assert resposta.status_code == 200, resposta.get_json()
+    return resposta.get_json()
+
+def versoes():
+    """TAG -> versão de todos os pontos"""
+    db.session.rollback()
+    return dict(db.session.execute(select(PontoMedicao.tag_ponto_medicao, PontoMedicao.versao)).all())
+
+def test_reimportacao_grava_so_as_linhas_alteradas(client, contexto):
+    linhas = exportar_pontos(client)
+    assert {'_versao', '_hash'} <= set(linhas[0])
+    
+    # k linhas alteradas só na planilha e 2 alteradas na planilha e também no banco depois da exportação
+    alteradas, conflitantes = linhas[:3], linhas[3:5]
+    for linha in alteradas + conflitantes:
+        linha['Nome Ponto Medição'] = f"{linha['Nome Ponto Medição']} (revisado)"
+    for linha in conflitantes:
+        ponto_id = db.session.execute(
+            select(PontoMedicao.id).where(PontoMedicao.tag_ponto_medicao == linha['TAG Ponto Medição'])
+        ).scalar()
+        resposta = client.put(f'/api/pontos-medicao/{ponto_id}', json={'nome_ponto_medicao': 'Alterado no banco'})
+        assert resposta.status_code == 200, resposta.get_json()
+    
+    antes = versoes()
+    resultado = reimportar_pontos(client, linhas)
+    
+    assert resultado['pontos_atualizados'] == len(alteradas)
+    assert resultado['pontos_inalterados'] == len(linhas) - len(alteradas) - len(conflitantes)
+    assert resultado['pontos_inseridos'] == 0
+    assert resultado['pontos_erro'] == len(conflitantes)
+    for linha in conflitantes:
+        assert any(
+            f"Conflito: {linha['TAG Ponto Medição']} alterado no banco" in erro for erro in resultado['erros']
+        )
+    
+    # Só as k linhas alteradas foram gravadas
+    depois = versoes()
+    gravadas = {tag for tag, versao in depois.items() if versao != antes[tag]}
+    assert gravadas == {linha['TAG Ponto Medição'] for linha in alteradas}
+    
+    nomes = dict(db.session.execute(
+        select(PontoMedicao.tag_ponto_medicao, PontoMedicao.nome_ponto_medicao)
+        .where(PontoMedicao.tag_ponto_medicao.in_([linha['TAG Ponto Medição'] for linha in alteradas + conflitantes]))
+    ).all())
+    for linha in alteradas:
+        assert nomes[linha['TAG Ponto Medição']] == linha['Nome Ponto Medição']
+    for linha in conflitantes:
+        assert nomes[linha['TAG Ponto Medição']] == 'Alterado no banco'